@@ -0,0 +1,119 @@
+"""
+Benchmark: chamadas externas simultâneas como a /simulacao faz ao Open-Meteo.
+
+- antes: requests.get avulso (conexão nova por chamada) em um threadpool do
+  tamanho do threadpool padrão do FastAPI/anyio (40 threads);
+- depois: cliente httpx async compartilhado (keep-alive + limite por host).
+
+O "Open-Meteo" aqui é um servidor HTTP/1.1 local com latência artificial, para
+o resultado não depender da rede (sem TLS: em produção o ganho do keep-alive é
+maior, pois cada conexão nova também paga o handshake TLS).
+
+Uso:
+    python benchmarks/bench_cliente_http.py --requisicoes 2000 --concorrencia 50 200 --latencia-ms 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from cliente_http import ClienteHTTP
+
+CORPO = json.dumps({"daily": {
+    "time": ["2024-01-15"], "shortwave_radiation_sum": [22.4],
+    "temperature_2m_max": [31.2], "weather_code": [2]
+}}).encode()
+
+
+def subir_servidor(latencia_s):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # permite keep-alive
+
+        def do_GET(self):
+            time.sleep(latencia_s)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(CORPO)))
+            self.end_headers()
+            self.wfile.write(CORPO)
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer.request_queue_size = 1024
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}/v1/archive"
+
+
+def rodar_antes(url, n, concorrencia):
+    def uma(_):
+        t0 = time.perf_counter()
+        r = requests.get(url, params={"latitude": -10.9, "longitude": -37.0}, timeout=5)
+        r.json()
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(concorrencia, 40)) as pool:
+        latencias = list(pool.map(uma, range(n)))
+    return time.perf_counter() - t0, latencias
+
+
+async def _rodar_depois(url, n, concorrencia):
+    cliente = ClienteHTTP(max_conexoes=concorrencia, max_keepalive=concorrencia, max_por_host=concorrencia)
+    await cliente.iniciar()
+
+    vagas = asyncio.Semaphore(concorrencia)  # mesma concorrência do threadpool; latência medida sem a fila
+
+    async def uma():
+        async with vagas:
+            t0 = time.perf_counter()
+            r = await cliente.get(url, params={"latitude": -10.9, "longitude": -37.0}, timeout=5)
+            r.json()
+            return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    latencias = await asyncio.gather(*(uma() for _ in range(n)))
+    total = time.perf_counter() - t0
+    await cliente.fechar()
+    return total, latencias
+
+
+def rodar_depois(url, n, concorrencia):
+    return asyncio.run(_rodar_depois(url, n, concorrencia))
+
+
+def resumo(nome, n, total, latencias):
+    lat = np.array(latencias) * 1000
+    print(f"  {nome:<32} {n / total:9.1f} req/s | p50 {np.percentile(lat, 50):7.1f} ms | "
+          f"p99 {np.percentile(lat, 99):7.1f} ms")
+    return n / total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requisicoes", type=int, default=2000)
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--latencia-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    servidor, url = subir_servidor(args.latencia_ms / 1000)
+    try:
+        for c in args.concorrencia:
+            print(f"{args.requisicoes} requisições, {c} simultâneas, upstream com {args.latencia_ms:.0f} ms:")
+            antes = resumo("requests.get + threadpool (40)", args.requisicoes, *rodar_antes(url, args.requisicoes, c))
+            depois = resumo("httpx async compartilhado", args.requisicoes, *rodar_depois(url, args.requisicoes, c))
+            print(f"  ganho de vazão: {depois / antes:.1f}x")
+    finally:
+        servidor.shutdown()
@@ -0,0 +1,197 @@
+"""
+Benchmark das etapas do ETL contra BDGDs sintéticos em várias escalas.
+
+Para cada escala gera (ou reaproveita) um BDGD com benchmarks/gerar_bdgd_sintetico.py
+e roda as etapas num processo novo, com todos os caminhos apontados para uma
+pasta temporária (snapshot, territórios, mercado, limite da cidade):
+
+    snapshot       gerar_snapshot (GDB -> Parquet/GeoParquet)
+    subestacoes    carregar_subestacoes
+    territorios    processar_voronoi.main (sem o PNG)
+    mercado        analisar_mercado
+    cubo           gerar_cubo
+    migracao       migrar_gdb_para_sql (só com --database-url / DATABASE_URL)
+
+Mede tempo e pico de RSS acumulado de cada etapa e grava tudo em JSON.
+
+Uso:
+    python benchmarks/bench_etl.py --escalas 1 10 100
+    python benchmarks/bench_etl.py --escalas 10 --formato gpkg --database-url postgresql://...
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+DIR_BENCH = os.path.dirname(os.path.abspath(__file__))
+DIR_RAIZ = os.path.dirname(DIR_BENCH)
+DIR_RESULTADOS = os.path.join(DIR_BENCH, "resultados")
+ETAPAS = ["snapshot", "subestacoes", "territorios", "mercado", "cubo", "migracao"]
+
+
+def _pico_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def executar_etapas(path_bdgd, path_limite, pasta, etapas):
+    """Roda no processo filho: o config precisa ser importado com o ambiente já apontado para a pasta."""
+    os.environ.update({
+        "FILE_GDB": path_bdgd,
+        "FILE_GEOJSON": os.path.join(pasta, "territorios.geojson"),
+        "FILE_MERCADO": os.path.join(pasta, "mercado.json"),
+        "DIR_SNAPSHOT": os.path.join(pasta, "snapshot"),
+        "ARQUIVO_LIMITE_CIDADE": path_limite,
+        "CIDADE_ALVO": f"Sintetica {os.path.basename(path_bdgd)}",
+        "MODO_OFFLINE": "1",
+    })
+    sys.path.insert(0, os.path.join(DIR_RAIZ, "src"))
+
+    from config import PATH_GDB, PATH_GEOJSON, PATH_JSON_MERCADO
+    from etl.snapshot_bdgd import gerar_snapshot
+    from etl.carregador_aneel import carregar_subestacoes
+    from etl.cubo_consumo import gerar_cubo
+    from modelos import processar_voronoi
+    from modelos.analise_mercado import analisar_mercado
+
+    def migracao():
+        from etl.migracao_db import migrar_gdb_para_sql
+        migrar_gdb_para_sql()
+
+    funcoes = {
+        "snapshot": lambda: gerar_snapshot(PATH_GDB, forcar=True),
+        "subestacoes": carregar_subestacoes,
+        "territorios": lambda: processar_voronoi.main(gerar_imagem=False),
+        "mercado": lambda: analisar_mercado(path_voronoi=PATH_GEOJSON, path_saida=PATH_JSON_MERCADO),
+        "cubo": lambda: gerar_cubo(PATH_GDB),
+        "migracao": migracao,
+    }
+
+    resultados = {}
+    for etapa in etapas:
+        print(f"\n⏱️ Etapa: {etapa}")
+        t0 = time.perf_counter()
+        erro = None
+        try:
+            funcoes[etapa]()
+        except SystemExit as e:
+            erro = f"sys.exit({e.code})"
+        except Exception as e:
+            erro = f"{type(e).__name__}: {e}"
+        resultados[etapa] = {
+            "segundos": round(time.perf_counter() - t0, 3),
+            "pico_rss_mb": _pico_rss_mb(),
+            "erro": erro,
+        }
+        if erro:
+            print(f"❌ {etapa}: {erro}")
+    return resultados
+
+
+def medir_escala(escala, args, pasta_base):
+    from gerar_bdgd_sintetico import gerar_bdgd
+
+    pasta = os.path.join(pasta_base, f"escala_{escala:g}")
+    dir_bdgd = args.dados or os.path.join(pasta, "bdgd")
+    os.makedirs(pasta, exist_ok=True)
+
+    t0 = time.perf_counter()
+    try:
+        path_bdgd, path_limite, qtd = gerar_bdgd(dir_bdgd, escala, args.formato, args.seed)
+    except FileExistsError as e:
+        # --dados reaproveita BDGDs já gerados (a geração de 100x é cara)
+        path_bdgd = str(e).split(": ", 1)[1]
+        with open(os.path.splitext(path_bdgd)[0] + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        path_limite, qtd = os.path.join(dir_bdgd, meta["limite"]), meta["contagens"]
+    geracao = round(time.perf_counter() - t0, 2)
+
+    saida_filho = os.path.join(pasta, "etapas.json")
+    env = os.environ.copy()
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+    comando = [sys.executable, os.path.abspath(__file__), "--_filho", path_bdgd, path_limite, pasta, saida_filho,
+               "--etapas", *args.etapas]
+    subprocess.run(comando, cwd=DIR_RAIZ, env=env, check=False)
+
+    with open(saida_filho, encoding="utf-8") as f:
+        etapas = json.load(f)
+    return {"escala": escala, "contagens": qtd, "bdgd": os.path.basename(path_bdgd),
+            "tamanho_mb": round(_tamanho(path_bdgd) / 1e6, 1), "geracao_s": geracao, "etapas": etapas}
+
+
+def _tamanho(caminho):
+    if os.path.isfile(caminho):
+        return os.path.getsize(caminho)
+    return sum(os.path.getsize(os.path.join(r, a)) for r, _, arquivos in os.walk(caminho) for a in arquivos)
+
+
+def imprimir(resultados):
+    etapas = [e for e in ETAPAS if any(e in r["etapas"] for r in resultados)]
+    print(f"\n{'escala':>7} {'UCs':>10} " + " ".join(f"{e:>12}" for e in etapas) + f" {'pico RSS':>9}")
+    for r in resultados:
+        celulas = []
+        for e in etapas:
+            info = r["etapas"].get(e)
+            celulas.append("-" if info is None else ("erro" if info["erro"] else f"{info['segundos']:.1f}s"))
+        pico = max(i["pico_rss_mb"] for i in r["etapas"].values()) if r["etapas"] else 0
+        print(f"{r['escala']:>7g} {r['contagens']['consumidores']:>10} " + " ".join(f"{c:>12}" for c in celulas)
+              + f" {pico:>7.0f}MB")
+
+
+def commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DIR_RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "desconhecido"
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--_filho":
+        path_bdgd, path_limite, pasta, saida = sys.argv[2:6]
+        etapas = sys.argv[sys.argv.index("--etapas") + 1:]
+        resultados = executar_etapas(path_bdgd, path_limite, pasta, etapas)
+        with open(saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escalas", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=None)
+    parser.add_argument("--formato", choices=["gdb", "gpkg"], default="gdb")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dados", default=None, help="pasta para guardar/reaproveitar os BDGDs gerados")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--manter", action="store_true", help="não apaga a pasta temporária")
+    parser.add_argument("--saida", default=None)
+    args = parser.parse_args()
+
+    if args.etapas is None:
+        args.etapas = [e for e in ETAPAS if e != "migracao" or args.database_url]
+
+    sys.path.insert(0, DIR_BENCH)
+    pasta_base = tempfile.mkdtemp(prefix="gridscope_etl_")
+    try:
+        resultados = [medir_escala(escala, args, pasta_base) for escala in args.escalas]
+    finally:
+        if not args.manter:
+            shutil.rmtree(pasta_base, ignore_errors=True)
+
+    imprimir(resultados)
+    saida = {"commit": commit_atual(), "inicio": datetime.now().isoformat(timespec="seconds"),
+             "formato": args.formato, "seed": args.seed, "resultados": resultados}
+    caminho = args.saida or os.path.join(DIR_RESULTADOS, f"etl_{saida['commit']}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(saida, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultado salvo em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
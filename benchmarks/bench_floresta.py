@@ -0,0 +1,84 @@
+"""
+Benchmark: floresta vetorizada (src/ai/floresta_vetorizada.py) x model.predict
+do scikit-learn, pontuando anos inteiros (8760 h) de N subestações.
+
+Cada cenário mede o sklearn com o n_jobs do modelo treinado e com n_jobs=1,
+e a floresta vetorizada; confere que as predições são bit a bit iguais ao
+sklearn com n_jobs=1 (referência de ordem de soma determinística) e mostra a
+diferença máxima contra o sklearn paralelo. Também mede chamadas pequenas de
+24 linhas (uma curva do /predict/duck-curve).
+
+Usa o modelo treinado em src/ai/modelo_consumo.pkl.
+
+Uso:
+    python benchmarks/bench_floresta.py --subestacoes 1 10 100 300
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from ai.carregador_modelo import carregar_modelo
+from ai.floresta_vetorizada import (
+    FlorestaVetorizada, achatar_floresta, matriz_ano, dnas_aleatorios, predizer_sequencial
+)
+
+
+def cronometrar(funcao, repeticoes=1):
+    melhor, resultado = float("inf"), None
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor, resultado
+
+
+def rodar(n, modelo, floresta):
+    X = matriz_ano(dnas_aleatorios(n, seed=n))
+    X_np = X.to_numpy()
+
+    t_paralelo, ref_paralela = cronometrar(lambda: modelo.predict(X))
+    t_seq, ref_seq = cronometrar(lambda: predizer_sequencial(modelo, X))
+    t_vet, obtido = cronometrar(lambda: floresta.prever(X_np))
+
+    identica = np.array_equal(obtido, ref_seq)
+    dif_paralelo = float(np.abs(obtido - ref_paralela).max())
+    print(f"{n:>5} subestações ({len(X):>9} linhas) | sklearn n_jobs={modelo.n_jobs}: {t_paralelo:7.2f}s | "
+          f"n_jobs=1: {t_seq:7.2f}s | vetorizada: {t_vet:7.2f}s | "
+          f"speedup: {t_paralelo / t_vet:5.1f}x / {t_seq / t_vet:5.1f}x | "
+          f"bit a bit: {'✅' if identica else '❌'} | dif. vs paralelo: {dif_paralelo:.1e}")
+    return identica
+
+
+def rodar_curva_unica(modelo, floresta, repeticoes=200):
+    X = matriz_ano(dnas_aleatorios(1)).iloc[:24]
+    t_sk, _ = cronometrar(lambda: modelo.predict(X), repeticoes)
+    t_vet, _ = cronometrar(lambda: floresta.prever(X), repeticoes)
+    print(f"curva de 24 h | sklearn: {t_sk * 1000:7.2f} ms | vetorizada: {t_vet * 1000:7.2f} ms | "
+          f"speedup: {t_sk / t_vet:5.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subestacoes", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    modelo = carregar_modelo()
+    if modelo is None:
+        print("❌ Sem modelo treinado: rode src/ai/train_model.py antes.")
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    arrays = achatar_floresta(modelo)
+    floresta = FlorestaVetorizada(arrays, max(e.tree_.max_depth for e in modelo.estimators_),
+                                  list(getattr(modelo, "feature_names_in_", [])) or None)
+    print(f"🌲 Exportação: {time.perf_counter() - t0:.2f}s, {len(arrays['feature'])} nós, "
+          f"{sum(a.nbytes for a in arrays.values()) / 1e6:.1f} MB")
+
+    rodar_curva_unica(modelo, floresta)
+    todas_identicas = all([rodar(n, modelo, floresta) for n in args.subestacoes])
+    sys.exit(0 if todas_identicas else 1)
@@ -0,0 +1,151 @@
+"""
+Benchmark: relatório de mercado vetorizado x loop original por subestação.
+
+Uso:
+    python benchmarks/bench_relatorio_mercado.py --consumidores 1000000 --subestacoes 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import box
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from modelos.relatorio_mercado import gerar_relatorio, nivel_criticidade, CLASSES_RELATORIO
+
+
+def gerar_dados_sinteticos(n_consumidores, n_subestacoes, n_gd, seed=42):
+    rng = np.random.default_rng(seed)
+    ids = np.array([str(100000 + i) for i in range(n_subestacoes)])
+    nomes = np.array([f"SUBESTACAO {i:04d}" for i in range(n_subestacoes)])
+    tipos = np.array(CLASSES_RELATORIO + ['Outros'])
+    pesos_tipos = [0.70, 0.15, 0.04, 0.03, 0.03, 0.05]
+
+    idx_cons = rng.integers(0, n_subestacoes, n_consumidores)
+    df_cons = pd.DataFrame({
+        'ID_SUBESTACAO': ids[idx_cons],
+        'NOME_SUBESTACAO': nomes[idx_cons],
+        'CONSUMO_ANUAL': rng.gamma(2.0, 900.0, n_consumidores),
+        'TIPO': rng.choice(tipos, n_consumidores, p=pesos_tipos)
+    })
+
+    idx_gd = rng.integers(0, n_subestacoes, n_gd)
+    df_gd = pd.DataFrame({
+        'ID_SUBESTACAO': ids[idx_gd],
+        'NOME_SUBESTACAO': nomes[idx_gd],
+        'POT_INST': rng.gamma(1.5, 4.0, n_gd),
+        'TIPO': rng.choice(tipos, n_gd, p=pesos_tipos)
+    })
+
+    lado = int(np.ceil(np.sqrt(n_subestacoes)))
+    geoms = [box((i % lado) * 1000, (i // lado) * 1000, (i % lado + 1) * 1000, (i // lado + 1) * 1000)
+             for i in range(n_subestacoes)]
+    gdf_voronoi = gpd.GeoDataFrame({'COD_ID': ids, 'NOM': nomes}, geometry=geoms, crs="EPSG:31984")
+    return df_cons, df_gd, gdf_voronoi
+
+
+def gerar_relatorio_legado(df_cons_final, df_gd_final, gdf_voronoi):
+    """
+    Implementação original de analise_mercado (um filtro booleano por subestação
+    e por classe), mantida aqui como referência de tempo e de resultado.
+    """
+    relatorio = []
+
+    ids_cons = set(df_cons_final['ID_SUBESTACAO'].unique()) if not df_cons_final.empty else set()
+    ids_gd = set(df_gd_final['ID_SUBESTACAO'].unique()) if not df_gd_final.empty else set()
+    ids_unicos = sorted(list([x for x in (ids_cons | ids_gd) if str(x) != 'nan']))
+
+    for sub_id in ids_unicos:
+        d_cons = df_cons_final[df_cons_final['ID_SUBESTACAO'] == sub_id] if not df_cons_final.empty else pd.DataFrame()
+        d_gd = df_gd_final[df_gd_final['ID_SUBESTACAO'] == sub_id] if not df_gd_final.empty else pd.DataFrame()
+
+        nome = "Desconhecido"
+        if not d_cons.empty: nome = d_cons.iloc[0]['NOME_SUBESTACAO']
+        elif not d_gd.empty: nome = d_gd.iloc[0]['NOME_SUBESTACAO']
+
+        geom_dict = None
+        try:
+            row = gdf_voronoi[gdf_voronoi['COD_ID'] == sub_id]
+            if not row.empty: geom_dict = json.loads(row.iloc[0].geometry.json)
+        except: pass
+
+        consumo = d_cons['CONSUMO_ANUAL'].sum() if not d_cons.empty else 0
+        potencia = d_gd['POT_INST'].sum() if not d_gd.empty else 0
+
+        stats = {
+            "subestacao": f"{nome} (ID: {sub_id})",
+            "id_tecnico": str(sub_id),
+            "metricas_rede": {
+                "total_clientes": len(d_cons),
+                "consumo_anual_mwh": float(round(consumo/1000, 2)),
+                "nivel_criticidade_gd": nivel_criticidade(potencia)
+            },
+            "geracao_distribuida": {
+                "total_unidades": len(d_gd),
+                "potencia_total_kw": float(round(potencia, 2)),
+                "detalhe_por_classe": {}
+            },
+            "perfil_consumo": {},
+            "geometry": geom_dict
+        }
+
+        for cls in CLASSES_RELATORIO:
+            df_c = d_cons[d_cons['TIPO'] == cls] if not d_cons.empty else pd.DataFrame()
+            if len(df_c) > 0:
+                c_cls = df_c['CONSUMO_ANUAL'].sum()
+                stats["perfil_consumo"][cls] = {
+                    "qtd_clientes": len(df_c),
+                    "pct": round((c_cls/consumo*100) if consumo > 0 else 0, 1),
+                    "consumo_anual_mwh": float(round(c_cls/1000, 2))
+                }
+
+            p_gd = d_gd[d_gd['TIPO'] == cls]['POT_INST'].sum() if not d_gd.empty else 0
+            if p_gd > 0:
+                stats["geracao_distribuida"]["detalhe_por_classe"][cls] = float(round(p_gd, 2))
+
+        relatorio.append(stats)
+
+    return relatorio
+
+
+def cronometrar(func, *args, repeticoes=1):
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        resultado = func(*args)
+        tempos.append(time.perf_counter() - t0)
+    return min(tempos), resultado
+
+
+def conferir(novo, legado):
+    """Compara os dois relatórios registro a registro (inclusive geometry)."""
+    return novo == legado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--consumidores", type=int, default=1_000_000)
+    parser.add_argument("--subestacoes", type=int, default=500)
+    parser.add_argument("--gd", type=int, default=50_000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-legado", action="store_true", help="Não roda o loop original (lento)")
+    args = parser.parse_args()
+
+    print(f"Gerando dados: {args.consumidores} consumidores, {args.subestacoes} subestações, {args.gd} GD...")
+    df_cons, df_gd, gdf_voronoi = gerar_dados_sinteticos(args.consumidores, args.subestacoes, args.gd)
+
+    t_novo, rel_novo = cronometrar(gerar_relatorio, df_cons, df_gd, repeticoes=args.repeticoes)
+    print(f"Vetorizado: {t_novo:.3f}s ({len(rel_novo)} subestações)")
+
+    if not args.sem_legado:
+        t_legado, rel_legado = cronometrar(gerar_relatorio_legado, df_cons, df_gd, gdf_voronoi, repeticoes=1)
+        print(f"Loop original: {t_legado:.3f}s")
+        print(f"Speedup: {t_legado / t_novo:.1f}x")
+        print(f"Resultados idênticos: {'SIM' if conferir(rel_novo, rel_legado) else 'NÃO'}")
@@ -0,0 +1,79 @@
+"""
+Benchmark: motor de territórios shapely (motor_voronoi) x pipeline original
+(scipy Voronoi + voronoi_finite_polygons_2d + overlay + sjoin).
+
+Uso:
+    python benchmarks/bench_voronoi.py --pontos 100 1000 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import geopandas as gpd
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from modelos.motor_voronoi import gerar_territorios
+from modelos.processar_voronoi import gerar_territorios_legado
+
+CRS = "EPSG:31984"
+
+
+def gerar_limite(raio=80_000, seed=7):
+    """Limite irregular (estilo município/estado) em coordenadas projetadas."""
+    rng = np.random.default_rng(seed)
+    angulos = np.linspace(0, 2 * np.pi, 64, endpoint=False)
+    raios = raio * rng.uniform(0.6, 1.0, len(angulos))
+    casca = np.column_stack([raios * np.cos(angulos), raios * np.sin(angulos)])
+    return shapely.Polygon(casca).buffer(2_000)
+
+
+def gerar_pontos(limite, n, seed=11):
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = limite.bounds
+    shapely.prepare(limite)
+    pontos = np.empty((0, 2))
+    while len(pontos) < n:
+        cand = rng.uniform([minx, miny], [maxx, maxy], size=(n * 2, 2))
+        cand = cand[shapely.contains_xy(limite, cand[:, 0], cand[:, 1])]
+        pontos = np.vstack([pontos, cand])
+    return pontos[:n]
+
+
+def rodar(n, limite):
+    coords = gerar_pontos(limite, n)
+    pontos_proj = gpd.GeoDataFrame(
+        {'NOM': [f"SE {i}" for i in range(n)], 'COD_ID': [str(i) for i in range(n)]},
+        geometry=shapely.points(coords), crs=CRS
+    )
+    limite_proj = gpd.GeoDataFrame(geometry=[limite], crs=CRS)
+
+    t0 = time.perf_counter()
+    celulas = gerar_territorios(coords, limite)
+    t_novo = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    legado = gerar_territorios_legado(pontos_proj, limite_proj)
+    t_legado = time.perf_counter() - t0
+
+    # Conferência: área de cada território pelo COD_ID
+    area_nova = dict(zip(pontos_proj['COD_ID'], shapely.area(celulas)))
+    difs = [abs(area_nova[cod] - a) / max(a, 1e-9) for cod, a in zip(legado['COD_ID'], legado.geometry.area)]
+    max_dif = max(difs) if difs else float('nan')
+
+    print(f"{n:>7} pontos | shapely: {t_novo*1000:9.1f} ms | original: {t_legado*1000:9.1f} ms | "
+          f"speedup: {t_legado / t_novo:6.1f}x | territórios legado: {len(legado)}/{n} | "
+          f"dif. máx. de área: {max_dif:.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pontos", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    limite = gerar_limite()
+    for n in args.pontos:
+        rodar(n, limite)
@@ -0,0 +1,392 @@
+"""
+Teste de carga ponta a ponta: API principal (8000) + API de IA (8001).
+
+1. Gera dados sintéticos (territórios GeoJSON + perfil de mercado) numa pasta temporária;
+2. sobe o Open-Meteo local (benchmarks/open_meteo_local.py, modo sintético);
+3. sobe `src.api:app` e `src.ai.ai_service:app` com uvicorn --workers N apontando
+   para esses dados (cache de clima e métricas em pasta própria);
+4. dispara um mix de /mercado/ranking, /simulacao/... e /predict/duck-curve com
+   concorrência fixa e mede p50/p95/p99, vazão, erros e memória de cada worker
+   (RSS, PSS e privada: quanto cada worker a mais custa de fato);
+5. grava o resultado em JSON (com o commit atual) e, com --comparar, mostra a
+   variação em relação a um resultado anterior.
+
+Uso:
+    python benchmarks/carga_e2e.py --subestacoes 300 --concorrencia 32 --duracao 30 --workers 4
+    python benchmarks/carga_e2e.py --comparar benchmarks/resultados/carga_<commit>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from metricas import memoria_processo
+
+DIR_BENCH = os.path.dirname(os.path.abspath(__file__))
+DIR_RAIZ = os.path.dirname(DIR_BENCH)
+DIR_RESULTADOS = os.path.join(DIR_BENCH, "resultados")
+
+CLASSES = ['Residencial', 'Comercial', 'Industrial', 'Rural', 'Poder Público']
+CENTRO = (-10.95, -37.07)   # Aracaju (lat, lon)
+
+# Mix padrão de requisições (peso relativo)
+MIX_PADRAO = {
+    "ranking_completo": 1,
+    "ranking_pagina": 3,
+    "simulacao_dia": 4,
+    "simulacao_periodo": 1,
+    "duck_curve": 3,
+}
+
+
+# --- Dados sintéticos ---
+
+def gerar_dados_sinteticos(pasta, n, seed=42):
+    """Grade de n territórios retangulares em volta de Aracaju + registros de mercado no formato do pipeline."""
+    rng = random.Random(seed)
+    lado = max(1, int(n ** 0.5 + 0.999))
+    passo = 0.25 / lado
+    lat0, lon0 = CENTRO[0] - 0.125, CENTRO[1] - 0.125
+
+    features, mercado = [], []
+    for i in range(n):
+        linha, coluna = divmod(i, lado)
+        y0, x0 = lat0 + linha * passo, lon0 + coluna * passo
+        nome = f"SE SINTETICA {i:04d}"
+        sub_id = str(100000 + i)
+        features.append({
+            "type": "Feature",
+            "properties": {"NOM": nome, "COD_ID": sub_id},
+            "geometry": {"type": "Polygon", "coordinates": [[
+                [x0, y0], [x0 + passo, y0], [x0 + passo, y0 + passo], [x0, y0 + passo], [x0, y0]
+            ]]}
+        })
+
+        clientes = rng.randint(500, 20000)
+        consumo = clientes * rng.uniform(1.5, 4.0)
+        pesos = [rng.random() for _ in CLASSES]
+        soma = sum(pesos)
+        potencia = rng.uniform(50, 8000)
+        mercado.append({
+            "subestacao": f"{nome} (ID: {sub_id})",
+            "id_tecnico": sub_id,
+            "metricas_rede": {
+                "total_clientes": clientes,
+                "consumo_anual_mwh": round(consumo, 2),
+                "nivel_criticidade_gd": "MEDIO"
+            },
+            "geracao_distribuida": {
+                "total_unidades": rng.randint(10, 900),
+                "potencia_total_kw": round(potencia, 2),
+                "detalhe_por_classe": {c: round(potencia * p / soma, 2) for c, p in zip(CLASSES, pesos)}
+            },
+            "perfil_consumo": {
+                c: {
+                    "qtd_clientes": int(clientes * p / soma),
+                    "pct": round(100 * p / soma, 1),
+                    "consumo_anual_mwh": round(consumo * p / soma, 2)
+                } for c, p in zip(CLASSES, pesos)
+            }
+        })
+
+    path_geo = os.path.join(pasta, "territorios_sinteticos.geojson")
+    path_mercado = os.path.join(pasta, "mercado_sintetico.json")
+    with open(path_geo, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+    with open(path_mercado, "w", encoding="utf-8") as f:
+        json.dump(mercado, f, ensure_ascii=False)
+    return path_geo, path_mercado, mercado
+
+
+# --- Processos ---
+
+def _ambiente(pasta, path_geo, path_mercado, porta_clima):
+    env = os.environ.copy()
+    env["PYTHONPATH"] = f"{os.path.join(DIR_RAIZ, 'src')}{os.pathsep}{env.get('PYTHONPATH', '')}"
+    env["PYTHONIOENCODING"] = "utf-8"
+    env["FILE_GEOJSON"] = path_geo
+    env["FILE_MERCADO"] = path_mercado
+    env["PATH_CACHE_CLIMA"] = os.path.join(pasta, "clima.sqlite")
+    env["OPEN_METEO_URL_PREVISAO"] = f"http://127.0.0.1:{porta_clima}/v1/forecast"
+    env["OPEN_METEO_URL_HISTORICO"] = f"http://127.0.0.1:{porta_clima}/v1/archive"
+    return env
+
+
+def subir(nome, comando, env, pasta, metricas=False):
+    if metricas:
+        env = dict(env)
+        env["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(pasta, f"metricas_{nome}")
+        os.makedirs(env["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+    log = open(os.path.join(pasta, f"{nome}.log"), "w", encoding="utf-8")
+    return subprocess.Popen(comando, cwd=DIR_RAIZ, env=env, stdout=log, stderr=subprocess.STDOUT,
+                            start_new_session=True)
+
+
+def aguardar(url, processo, timeout=180):
+    inicio = time.monotonic()
+    while time.monotonic() - inicio < timeout:
+        if processo.poll() is not None:
+            raise RuntimeError(f"Processo encerrou antes de responder em {url}")
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return time.monotonic() - inicio
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise TimeoutError(f"{url} não respondeu em {timeout}s")
+
+
+def encerrar(processo):
+    if processo is None or processo.poll() is not None:
+        return
+    try:
+        os.killpg(processo.pid, signal.SIGTERM)
+        processo.wait(timeout=15)
+    except Exception:
+        os.killpg(processo.pid, signal.SIGKILL)
+
+
+def memoria_workers(pid_pai):
+    """
+    Memória (MB) do processo principal e de cada filho (workers do uvicorn), via
+    /proc/<pid>/smaps_rollup: RSS, PSS e a parte privada (o que cada worker
+    custa além das páginas compartilhadas, ex: o segmento Arrow mapeado).
+    """
+    filhos = []
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat") as f:
+                campos = f.read().rsplit(")", 1)[1].split()
+            if int(campos[1]) == pid_pai:
+                filhos.append(memoria_processo(int(entrada)))
+        except (OSError, IndexError, ValueError):
+            continue
+    filhos = sorted((m for m in filhos if m), key=lambda m: m.get("rss_mb", 0))
+    return {
+        "principal": memoria_processo(pid_pai),
+        "workers": filhos,
+        "privada_workers_mb": round(sum(m.get("privada_mb", 0) for m in filhos), 1),
+        "pss_total_mb": round(sum(m.get("pss_mb", 0) for m in filhos), 1),
+    }
+
+
+# --- Carga ---
+
+def montar_requisicao(tipo, rng, mercado):
+    sub = rng.choice(mercado)
+    hoje = date.today()
+    if tipo == "ranking_completo":
+        return "GET", "http://127.0.0.1:8000/mercado/ranking", None
+    if tipo == "ranking_pagina":
+        sort = rng.choice(["-consumo_anual_mwh", "-potencia_total_kw", "total_clientes"])
+        return "GET", (f"http://127.0.0.1:8000/mercado/ranking?limit=20&offset={rng.randint(0, 5) * 20}"
+                       f"&sort={sort}&fields=subestacao,metricas_rede&geometry=none"), None
+    if tipo == "simulacao_dia":
+        dia = hoje - timedelta(days=rng.randint(0, 400))
+        return "GET", f"http://127.0.0.1:8000/simulacao/{sub['id_tecnico']}?data={dia:%d-%m-%Y}", None
+    if tipo == "simulacao_periodo":
+        inicio = date(hoje.year - 1, rng.randint(1, 12), 1)
+        fim = inicio + timedelta(days=29)
+        return "GET", (f"http://127.0.0.1:8000/simulacao/{sub['id_tecnico']}"
+                       f"?data_inicio={inicio:%d-%m-%Y}&data_fim={fim:%d-%m-%Y}"), None
+    # duck_curve
+    pcts = [rng.random() for _ in range(4)]
+    soma = sum(pcts)
+    dia = hoje - timedelta(days=rng.randint(0, 60))
+    payload = {
+        "data_alvo": dia.isoformat(),
+        "potencia_gd_kw": sub["geracao_distribuida"]["potencia_total_kw"],
+        "consumo_mes_alvo_mwh": round(sub["metricas_rede"]["consumo_anual_mwh"] / 12, 2),
+        "lat": CENTRO[0] + rng.uniform(-0.1, 0.1),
+        "lon": CENTRO[1] + rng.uniform(-0.1, 0.1),
+        "dna_perfil": dict(zip(["residencial", "comercial", "industrial", "rural"], [p / soma for p in pcts]))
+    }
+    return "POST", "http://127.0.0.1:8001/predict/duck-curve", payload
+
+
+async def gerar_carga(mercado, concorrencia, duracao, mix, seed):
+    rng = random.Random(seed)
+    tipos = [t for t, peso in mix.items() for _ in range(peso)]
+    resultados = {t: {"latencias": [], "erros": 0} for t in mix}
+    fim = time.monotonic() + duracao
+
+    limites = httpx.Limits(max_connections=concorrencia * 2, max_keepalive_connections=concorrencia * 2)
+    async with httpx.AsyncClient(limits=limites, timeout=60) as cliente:
+        async def usuario(uid):
+            rng_u = random.Random(seed * 1000 + uid)
+            while time.monotonic() < fim:
+                tipo = rng_u.choice(tipos)
+                metodo, url, payload = montar_requisicao(tipo, rng_u, mercado)
+                t0 = time.perf_counter()
+                try:
+                    r = await cliente.request(metodo, url, json=payload)
+                    await r.aread()
+                    ok = r.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                dt = time.perf_counter() - t0
+                if ok:
+                    resultados[tipo]["latencias"].append(dt)
+                else:
+                    resultados[tipo]["erros"] += 1
+
+        inicio = time.monotonic()
+        await asyncio.gather(*(usuario(i) for i in range(concorrencia)))
+        decorrido = time.monotonic() - inicio
+    return resultados, decorrido
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    i = int(k)
+    j = min(i + 1, len(ordenados) - 1)
+    return ordenados[i] + (ordenados[j] - ordenados[i]) * (k - i)
+
+
+def resumir(resultados, decorrido):
+    resumo = {}
+    todas, erros = [], 0
+    for tipo, r in resultados.items():
+        lat = r["latencias"]
+        todas.extend(lat)
+        erros += r["erros"]
+        resumo[tipo] = _estatisticas(lat, r["erros"], decorrido)
+    resumo["total"] = _estatisticas(todas, erros, decorrido)
+    return resumo
+
+
+def _estatisticas(latencias, erros, decorrido):
+    ms = lambda v: None if v is None else round(v * 1000, 2)
+    return {
+        "requisicoes": len(latencias) + erros,
+        "erros": erros,
+        "vazao_rps": round(len(latencias) / decorrido, 1) if decorrido else None,
+        "p50_ms": ms(percentil(latencias, 50)),
+        "p95_ms": ms(percentil(latencias, 95)),
+        "p99_ms": ms(percentil(latencias, 99)),
+    }
+
+
+def commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DIR_RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "desconhecido"
+
+
+def comparar(atual, base):
+    print(f"\nComparação com {base.get('commit')} ({base.get('inicio')}):")
+    for tipo, r in atual["resultados"].items():
+        b = base.get("resultados", {}).get(tipo)
+        if not b:
+            continue
+        partes = []
+        for campo in ("vazao_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if r.get(campo) is not None and b.get(campo):
+                partes.append(f"{campo} {100 * (r[campo] - b[campo]) / b[campo]:+6.1f}%")
+        print(f"  {tipo:<18} " + " | ".join(partes))
+
+
+def imprimir(resumo):
+    print(f"\n{'tipo':<18} {'req':>7} {'erros':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for tipo, r in resumo.items():
+        fmt = lambda v: "-" if v is None else f"{v:.1f}"
+        print(f"{tipo:<18} {r['requisicoes']:>7} {r['erros']:>6} {fmt(r['vazao_rps']):>8} "
+              f"{fmt(r['p50_ms']):>8} {fmt(r['p95_ms']):>8} {fmt(r['p99_ms']):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subestacoes", type=int, default=300)
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--duracao", type=float, default=30, help="segundos de carga medida")
+    parser.add_argument("--aquecimento", type=float, default=5, help="segundos de carga descartada antes da medição")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latencia-clima-ms", type=float, default=50)
+    parser.add_argument("--mix", default=None, help='JSON, ex: {"simulacao_dia": 1, "duck_curve": 1}')
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--saida", default=None)
+    parser.add_argument("--comparar", default=None, help="JSON de um resultado anterior")
+    args = parser.parse_args()
+
+    mix = json.loads(args.mix) if args.mix else MIX_PADRAO
+    pasta = tempfile.mkdtemp(prefix="gridscope_carga_")
+    path_geo, path_mercado, mercado = gerar_dados_sinteticos(pasta, args.subestacoes, args.seed)
+    env = _ambiente(pasta, path_geo, path_mercado, 8090)
+
+    processos = {}
+    try:
+        processos["clima"] = subir("clima", [sys.executable, os.path.join(DIR_BENCH, "open_meteo_local.py"),
+                                             "--porta", "8090", "--latencia-ms", str(args.latencia_clima_ms)],
+                                   env, pasta)
+        uvicorn = [sys.executable, "-m", "uvicorn", "--host", "127.0.0.1", "--workers", str(args.workers),
+                   "--log-level", "warning"]
+        processos["api"] = subir("api", uvicorn + ["src.api:app", "--port", "8000"], env, pasta, metricas=True)
+        processos["ia"] = subir("ia", uvicorn + ["src.ai.ai_service:app", "--port", "8001"], env, pasta, metricas=True)
+
+        aguardar("http://127.0.0.1:8090/estatisticas", processos["clima"])
+        subida = {
+            "api_s": round(aguardar("http://127.0.0.1:8000/openapi.json", processos["api"]), 2),
+            "ia_s": round(aguardar("http://127.0.0.1:8001/openapi.json", processos["ia"]), 2),
+        }
+        print(f"Serviços prontos: {subida}")
+
+        if args.aquecimento > 0:
+            asyncio.run(gerar_carga(mercado, args.concorrencia, args.aquecimento, mix, args.seed + 1))
+        print(f"Medindo {args.duracao:.0f}s com {args.concorrencia} usuários simultâneos...")
+        resultados, decorrido = asyncio.run(gerar_carga(mercado, args.concorrencia, args.duracao, mix, args.seed))
+        memoria = {nome: memoria_workers(processos[nome].pid) for nome in ("api", "ia")}
+    finally:
+        for p in processos.values():
+            encerrar(p)
+
+    resumo = resumir(resultados, decorrido)
+    saida = {
+        "commit": commit_atual(),
+        "inicio": datetime.now().isoformat(timespec="seconds"),
+        "configuracao": {
+            "subestacoes": args.subestacoes, "concorrencia": args.concorrencia, "duracao_s": args.duracao,
+            "workers": args.workers, "latencia_clima_ms": args.latencia_clima_ms, "mix": mix, "seed": args.seed
+        },
+        "subida": subida,
+        "resultados": resumo,
+        "memoria_mb": memoria,
+    }
+    imprimir(resumo)
+    for nome, m in memoria.items():
+        print(f"\nMemória {nome} (MB): privada dos workers {m['privada_workers_mb']} | PSS total {m['pss_total_mb']} | "
+              f"por worker {[(w.get('rss_mb'), w.get('privada_mb')) for w in m['workers']]} (RSS, privada)")
+
+    caminho = args.saida or os.path.join(DIR_RESULTADOS, f"carga_{saida['commit']}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(saida, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultado salvo em {caminho}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(saida, json.load(f))
+
+    shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
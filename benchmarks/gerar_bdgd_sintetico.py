@@ -0,0 +1,218 @@
+"""
+Gerador de BDGD sintético para testes de escala do ETL.
+
+Escreve um geodatabase (.gdb via driver OpenFileGDB, ou .gpkg) com as camadas e
+colunas que o projeto lê do BDGD da Energisa SE:
+
+    SUB       COD_ID, NOM (polígono)
+    UNTRMT    COD_ID, SUB, POT_NOM (ponto)
+    SSDMT     COD_ID, SUB, CTMT, COMP (linha subestação -> transformador)
+    UCBT_tab  COD_ID, UNI_TR_MT, SUB, CLAS_SUB, TIP_CC, PN_CON, ENE_01..ENE_12
+    UGBT_tab  COD_ID, UNI_TR_MT, SUB, PN_CON, POT_INST, CEG_GD
+
+e um limite municipal (GeoJSON) envolvendo a área, para o passo do Voronoi
+(ARQUIVO_LIMITE_CIDADE). As distribuições seguem o perfil de uma capital do
+Nordeste: ~86% residencial, consumo mensal log-normal por classe com pico no
+verão, alguns medidores zerados, PN_CON compartilhado entre unidades do mesmo
+lote e micro/minigeração concentrada no residencial. Mesmo --seed, mesmo arquivo.
+
+Uso:
+    python benchmarks/gerar_bdgd_sintetico.py --escala 10 --saida /tmp/bdgd
+    python benchmarks/gerar_bdgd_sintetico.py --subestacoes 400 --consumidores 2000000 --formato gpkg
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import pyogrio
+import shapely
+
+CRS_BDGD = "EPSG:4674"        # SIRGAS 2000 geográfico, como o BDGD publicado
+CRS_PROJETADO = "EPSG:31984"
+CENTRO = (711_000.0, 8_788_000.0)   # Aracaju em UTM 24S
+
+# Tamanho aproximado do recorte de Aracaju (escala 1)
+BASE = {"subestacoes": 40, "transformadores": 8_000, "consumidores": 250_000, "gd": 10_000}
+KM2_POR_SUBESTACAO = 15.0
+
+# CLAS_SUB: código, prefixo TIP_CC, peso, mediana do consumo mensal (kWh), sigma log-normal
+CLASSES = [
+    ("RE1", "RES", 0.80, 150.0, 0.65),
+    ("RE2", "RES", 0.06, 90.0, 0.55),     # baixa renda
+    ("CO1", "COM", 0.09, 600.0, 1.10),
+    ("IN",  "IND", 0.005, 3_000.0, 1.30),
+    ("RU1", "RUR", 0.02, 250.0, 0.90),
+    ("PP1", "COM", 0.01, 1_200.0, 1.00),
+    ("SP1", "COM", 0.005, 2_500.0, 1.00),
+    ("PO",  "COM", 0.01, 400.0, 1.00),
+]
+POTENCIAS_TRAFO = np.array([15.0, 30.0, 45.0, 75.0, 112.5, 150.0])
+PESOS_TRAFO = np.array([0.10, 0.22, 0.28, 0.25, 0.10, 0.05])
+TAXA_MEDIDOR_ZERADO = 0.03
+TAXA_PN_COMPARTILHADO = 0.05
+
+
+def _escalar(escala, **contagens):
+    return {k: int(contagens.get(k) or max(2, round(v * escala))) for k, v in BASE.items()}
+
+
+def gerar_camadas(subestacoes, transformadores, consumidores, gd, seed=42):
+    """Retorna ({camada: (Geo)DataFrame}, limite GeoDataFrame) no CRS do BDGD."""
+    rng = np.random.default_rng(seed)
+    raio = np.sqrt(subestacoes * KM2_POR_SUBESTACAO * 1e6 / np.pi)
+    espacamento = np.sqrt(KM2_POR_SUBESTACAO * 1e6)
+
+    # --- SUB: sítios uniformes num disco, polígono pequeno em volta de cada um
+    ang = rng.uniform(0, 2 * np.pi, subestacoes)
+    r = raio * np.sqrt(rng.uniform(0, 1, subestacoes))
+    xy_sub = np.column_stack([CENTRO[0] + r * np.cos(ang), CENTRO[1] + r * np.sin(ang)])
+    ids_sub = np.array([str(6587000 + i) for i in range(subestacoes)])
+    sub = gpd.GeoDataFrame({
+        "COD_ID": ids_sub,
+        "NOM": [f"SE SINTETICA {i:05d}" for i in range(subestacoes)],
+    }, geometry=shapely.buffer(shapely.points(xy_sub), 60.0, quad_segs=2), crs=CRS_PROJETADO)
+
+    limite = shapely.buffer(shapely.convex_hull(shapely.multipoints(xy_sub)), espacamento)
+    gdf_limite = gpd.GeoDataFrame({"nome": ["Cidade sintética"]}, geometry=[limite], crs=CRS_PROJETADO)
+
+    # --- UNTRMT: carga desigual entre subestações, pontos espalhados em volta da SE
+    carga_sub = rng.dirichlet(np.full(subestacoes, 2.0))
+    sub_trafo = rng.choice(subestacoes, transformadores, p=carga_sub)
+    xy_trafo = xy_sub[sub_trafo] + rng.normal(0, 0.35 * espacamento, (transformadores, 2))
+    ids_trafo = np.array([f"TR{i:08d}" for i in range(transformadores)])
+    untrmt = gpd.GeoDataFrame({
+        "COD_ID": ids_trafo,
+        "SUB": ids_sub[sub_trafo],
+        "POT_NOM": rng.choice(POTENCIAS_TRAFO, transformadores, p=PESOS_TRAFO),
+    }, geometry=shapely.points(xy_trafo), crs=CRS_PROJETADO)
+
+    # --- SSDMT: um trecho de média tensão por transformador (SE -> transformador)
+    linhas = shapely.linestrings(np.stack([xy_sub[sub_trafo], xy_trafo], axis=1))
+    ssdmt = gpd.GeoDataFrame({
+        "COD_ID": [f"MT{i:08d}" for i in range(transformadores)],
+        "SUB": ids_sub[sub_trafo],
+        "CTMT": [f"{s}-AL{k:02d}" for s, k in zip(ids_sub[sub_trafo], rng.integers(1, 9, transformadores))],
+        "COMP": np.round(shapely.length(linhas), 1),
+    }, geometry=linhas, crs=CRS_PROJETADO)
+
+    # --- UCBT_tab: consumidores por transformador proporcionais à potência nominal
+    p_trafo = untrmt["POT_NOM"].to_numpy() / untrmt["POT_NOM"].sum()
+    trafo_uc = rng.choice(transformadores, consumidores, p=p_trafo)
+    pesos = np.array([c[2] for c in CLASSES])
+    cls_uc = rng.choice(len(CLASSES), consumidores, p=pesos / pesos.sum())
+    medianas = np.array([c[3] for c in CLASSES])[cls_uc]
+    sigmas = np.array([c[4] for c in CLASSES])[cls_uc]
+    base = medianas * np.exp(rng.normal(0, sigmas))
+    base[rng.random(consumidores) < TAXA_MEDIDOR_ZERADO] = 0.0
+
+    meses = np.arange(12)
+    sazonal = 1 + 0.12 * np.cos(2 * np.pi * (meses - 1.5) / 12)   # pico de ar-condicionado em jan-fev
+
+    pn_con = np.array([f"PN{i:09d}" for i in range(consumidores)], dtype=object)
+    compartilhados = np.flatnonzero(rng.random(consumidores) < TAXA_PN_COMPARTILHADO)
+    if len(compartilhados) and consumidores > 1:
+        pn_con[compartilhados] = pn_con[np.maximum(compartilhados - 1, 0)]
+
+    ucbt = pd.DataFrame({
+        "COD_ID": [f"UC{i:09d}" for i in range(consumidores)],
+        "UNI_TR_MT": ids_trafo[trafo_uc],
+        "SUB": untrmt["SUB"].to_numpy()[trafo_uc],
+        "CLAS_SUB": np.array([c[0] for c in CLASSES])[cls_uc],
+        "TIP_CC": [f"{CLASSES[c][1]}-Tipo{k}" for c, k in zip(cls_uc, rng.integers(1, 4, consumidores))],
+        "PN_CON": pn_con,
+    })
+    for m in meses:
+        ruido = np.exp(rng.normal(0, 0.08, consumidores))
+        ucbt[f"ENE_{m + 1:02d}"] = np.round(base * sazonal[m] * ruido, 2)
+
+    # --- UGBT_tab: GD em unidades consumidoras existentes, concentrada no residencial
+    peso_gd = np.where(np.isin(cls_uc, [0, 1]), 1.0, 0.6)
+    gd = min(gd, consumidores)
+    uc_gd = rng.choice(consumidores, gd, replace=False, p=peso_gd / peso_gd.sum())
+    potencia = np.exp(rng.normal(np.log(5.0), 0.6, gd))
+    grandes = rng.random(gd) < 0.02
+    potencia[grandes] = rng.uniform(75, 1_000, grandes.sum())   # minigeração
+    ugbt = pd.DataFrame({
+        "COD_ID": [f"GD{i:08d}" for i in range(gd)],
+        "UNI_TR_MT": ucbt["UNI_TR_MT"].to_numpy()[uc_gd],
+        "SUB": ucbt["SUB"].to_numpy()[uc_gd],
+        "PN_CON": ucbt["PN_CON"].to_numpy()[uc_gd],
+        "POT_INST": np.round(np.clip(potencia, 1.0, 5_000.0), 2),
+        "CEG_GD": [f"GD.SE.{i:06d}.UFV" for i in range(gd)],
+    })
+
+    camadas = {
+        "SUB": sub.to_crs(CRS_BDGD),
+        "UNTRMT": untrmt.to_crs(CRS_BDGD),
+        "SSDMT": ssdmt.to_crs(CRS_BDGD),
+        "UCBT_tab": ucbt,
+        "UGBT_tab": ugbt,
+    }
+    return camadas, gdf_limite.to_crs("EPSG:4326")
+
+
+def escrever(camadas, caminho, formato="gdb"):
+    driver = "OpenFileGDB" if formato == "gdb" else "GPKG"
+    for nome, df in camadas.items():
+        t0 = time.time()
+        pyogrio.write_dataframe(df, caminho, layer=nome, driver=driver)
+        print(f"   ✅ {nome}: {len(df)} registros ({time.time() - t0:.1f}s)")
+
+
+def gerar_bdgd(saida, escala=1.0, formato="gdb", seed=42, **contagens):
+    """
+    Gera o BDGD sintético em `saida`. Retorna (caminho do .gdb/.gpkg, caminho do limite, contagens).
+    Se o GDAL não escrever OpenFileGDB (GDAL < 3.6), cai para GeoPackage.
+    """
+    qtd = _escalar(escala, **contagens)
+    os.makedirs(saida, exist_ok=True)
+
+    nome = f"BDGD_SINTETICO_{qtd['subestacoes']}SE_{qtd['consumidores']}UC"
+    caminho = os.path.join(saida, f"{nome}.{formato}")
+    for existente in (caminho, os.path.join(saida, f"{nome}.gpkg")):
+        if os.path.exists(existente):
+            raise FileExistsError(f"Já existe: {existente}")
+
+    print(f"🏗️ Gerando BDGD sintético: {qtd}")
+    t0 = time.time()
+    camadas, limite = gerar_camadas(seed=seed, **qtd)
+    print(f"   Camadas em memória ({time.time() - t0:.1f}s)")
+    try:
+        escrever(camadas, caminho, formato)
+    except Exception as e:
+        if formato != "gdb":
+            raise
+        print(f"⚠️ OpenFileGDB sem suporte a escrita ({e}). Gerando GeoPackage.")
+        import shutil
+        shutil.rmtree(caminho, ignore_errors=True)
+        caminho = os.path.join(saida, f"{nome}.gpkg")
+        escrever(camadas, caminho, "gpkg")
+
+    path_limite = os.path.join(saida, f"{nome}_limite.geojson")
+    limite.to_file(path_limite, driver="GeoJSON")
+    with open(os.path.join(saida, f"{nome}.json"), "w", encoding="utf-8") as f:
+        json.dump({"contagens": qtd, "seed": seed, "bdgd": os.path.basename(caminho),
+                   "limite": os.path.basename(path_limite)}, f, indent=4, ensure_ascii=False)
+
+    print(f"✅ BDGD sintético em {caminho} ({time.time() - t0:.1f}s)")
+    return caminho, path_limite, qtd
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--saida", default=os.path.join("dados", "sintetico"))
+    parser.add_argument("--escala", type=float, default=1.0, help="multiplica o tamanho base (recorte de Aracaju)")
+    parser.add_argument("--subestacoes", type=int)
+    parser.add_argument("--transformadores", type=int)
+    parser.add_argument("--consumidores", type=int)
+    parser.add_argument("--gd", type=int)
+    parser.add_argument("--formato", choices=["gdb", "gpkg"], default="gdb")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    gerar_bdgd(args.saida, args.escala, args.formato, args.seed, subestacoes=args.subestacoes,
+               transformadores=args.transformadores, consumidores=args.consumidores, gd=args.gd)
@@ -0,0 +1,191 @@
+"""
+Servidor local que substitui o Open-Meteo (forecast + archive) em benchmarks e CI.
+
+Implementa o subconjunto usado pelo projeto: /v1/forecast e /v1/archive com
+latitude/longitude (um ponto ou lista separada por vírgulas), start_date,
+end_date, daily=... e hourly=... (repetidos ou separados por vírgula).
+
+Modos:
+    sintetico   valores determinísticos por (ponto, data): mesma entrada, mesma saída
+    gravar      repassa ao Open-Meteo real e grava cada resposta em --fixtures
+    reproduzir  responde só com as respostas gravadas (404 se faltar, ou
+                sintético com --sintetico-se-faltar)
+
+Injeção de problemas: --latencia-ms/--jitter-ms atrasam cada resposta;
+--taxa-falhas devolve 503 (ou --falha timeout: segura a resposta por 60 s).
+
+Uso:
+    python benchmarks/open_meteo_local.py --porta 8090 --latencia-ms 80 --taxa-falhas 0.02
+    OPEN_METEO_URL_PREVISAO=http://127.0.0.1:8090/v1/forecast \\
+    OPEN_METEO_URL_HISTORICO=http://127.0.0.1:8090/v1/archive python run_all.py
+"""
+import argparse
+import asyncio
+import hashlib
+import math
+import os
+import random
+from datetime import date, timedelta
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+UPSTREAM = {
+    "forecast": "https://api.open-meteo.com/v1/forecast",
+    "archive": "https://archive-api.open-meteo.com/v1/archive",
+}
+CODIGOS_TEMPO = [0, 0, 1, 1, 2, 3, 45, 61, 80]
+DIR_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "open_meteo")
+
+
+def _lista(query, nome):
+    valores = []
+    for v in query.getlist(nome):
+        valores.extend(x for x in v.split(",") if x)
+    return valores
+
+
+def chave_fixture(fonte, query):
+    """Chave estável da consulta (parâmetros ordenados, listas normalizadas)."""
+    itens = sorted((k, ",".join(_lista(query, k))) for k in set(query.keys()))
+    texto = fonte + "?" + "&".join(f"{k}={v}" for k, v in itens)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def _rng(lat, lon, dia):
+    return random.Random(f"{lat:.2f}|{lon:.2f}|{dia}")
+
+
+def _diario(lat, lon, dia, variaveis):
+    rng = _rng(lat, lon, dia)
+    sazonal = math.cos(2 * math.pi * (dia.timetuple().tm_yday - 15) / 365)  # verão austral em jan
+    codigo = rng.choice(CODIGOS_TEMPO)
+    nebulosidade = 0.0 if codigo <= 1 else (0.25 if codigo <= 3 else 0.6)
+    valores = {
+        "shortwave_radiation_sum": round((20.5 + 4.0 * sazonal) * (1 - nebulosidade) + rng.uniform(-1, 1), 2),
+        "temperature_2m_max": round(30.0 + 2.0 * sazonal + rng.uniform(-1.5, 1.5), 1),
+        "weather_code": codigo,
+    }
+    return {v: valores.get(v) for v in variaveis}
+
+
+def _horario(lat, lon, dia, variaveis):
+    diario = _diario(lat, lon, dia, ["shortwave_radiation_sum", "temperature_2m_max"])
+    # Curva de sino com a mesma energia diária (MJ/m² -> W/m² médio por hora)
+    pico = diario["shortwave_radiation_sum"] * 1e6 / 3600 / (3.2 * math.sqrt(2 * math.pi))
+    series = {"shortwave_radiation": [], "temperature_2m": []}
+    for h in range(24):
+        rad = pico * math.exp(-((h - 12) ** 2) / (2 * 3.2 ** 2)) if 6 <= h <= 18 else 0.0
+        series["shortwave_radiation"].append(round(rad, 1))
+        series["temperature_2m"].append(round(diario["temperature_2m_max"] - 4.5 + 4.5 * math.sin((h - 8) * math.pi / 12), 1))
+    return {v: series.get(v, [None] * 24) for v in variaveis}
+
+
+def resposta_sintetica(query):
+    lats = [float(x) for x in _lista(query, "latitude")]
+    lons = [float(x) for x in _lista(query, "longitude")]
+    inicio = date.fromisoformat(query.get("start_date", date.today().isoformat()))
+    fim = date.fromisoformat(query.get("end_date", inicio.isoformat()))
+    dias = [inicio + timedelta(days=i) for i in range((fim - inicio).days + 1)]
+    v_diarias, v_horarias = _lista(query, "daily"), _lista(query, "hourly")
+
+    locais = []
+    for lat, lon in zip(lats, lons):
+        corpo = {"latitude": lat, "longitude": lon, "timezone": query.get("timezone", "GMT")}
+        if v_diarias:
+            daily = {"time": [d.isoformat() for d in dias]}
+            for v in v_diarias:
+                daily[v] = []
+            for d in dias:
+                for v, x in _diario(lat, lon, d, v_diarias).items():
+                    daily[v].append(x)
+            corpo["daily"] = daily
+        if v_horarias:
+            hourly = {"time": []}
+            for v in v_horarias:
+                hourly[v] = []
+            for d in dias:
+                hourly["time"].extend(f"{d.isoformat()}T{h:02d}:00" for h in range(24))
+                for v, serie in _horario(lat, lon, d, v_horarias).items():
+                    hourly[v].extend(serie)
+            corpo["hourly"] = hourly
+        locais.append(corpo)
+    return locais[0] if len(locais) == 1 else locais
+
+
+def criar_app(modo="sintetico", fixtures=DIR_FIXTURES, latencia_ms=0.0, jitter_ms=0.0,
+              taxa_falhas=0.0, falha="503", sintetico_se_faltar=False, seed=0):
+    app = FastAPI(title="Open-Meteo local")
+    sorteio = random.Random(seed)
+    contadores = {"requisicoes": 0, "falhas": 0, "gravadas": 0, "reproduzidas": 0, "sinteticas": 0}
+
+    async def atender(fonte, request):
+        contadores["requisicoes"] += 1
+        atraso = latencia_ms + (sorteio.uniform(0, jitter_ms) if jitter_ms else 0)
+        if atraso:
+            await asyncio.sleep(atraso / 1000)
+
+        if taxa_falhas and sorteio.random() < taxa_falhas:
+            contadores["falhas"] += 1
+            if falha == "timeout":
+                await asyncio.sleep(60)
+            return JSONResponse({"error": True, "reason": "falha injetada"}, status_code=503)
+
+        query = request.query_params
+        caminho = os.path.join(fixtures, fonte, f"{chave_fixture(fonte, query)}.json")
+
+        if modo == "gravar":
+            import httpx
+            async with httpx.AsyncClient(timeout=30) as cliente:
+                r = await cliente.get(UPSTREAM[fonte], params=list(query.multi_items()))
+            if r.status_code == 200:
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                with open(caminho, "wb") as f:
+                    f.write(r.content)
+                contadores["gravadas"] += 1
+            return Response(r.content, status_code=r.status_code, media_type="application/json")
+
+        if modo == "reproduzir":
+            if os.path.exists(caminho):
+                contadores["reproduzidas"] += 1
+                with open(caminho, "rb") as f:
+                    return Response(f.read(), media_type="application/json")
+            if not sintetico_se_faltar:
+                return JSONResponse({"error": True, "reason": "resposta não gravada"}, status_code=404)
+
+        contadores["sinteticas"] += 1
+        return JSONResponse(resposta_sintetica(query))
+
+    @app.get("/v1/forecast")
+    async def forecast(request: Request):
+        return await atender("forecast", request)
+
+    @app.get("/v1/archive")
+    async def archive(request: Request):
+        return await atender("archive", request)
+
+    @app.get("/estatisticas")
+    def estatisticas():
+        return contadores
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--porta", type=int, default=8090)
+    parser.add_argument("--modo", choices=["sintetico", "gravar", "reproduzir"], default="sintetico")
+    parser.add_argument("--fixtures", default=DIR_FIXTURES)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--taxa-falhas", type=float, default=0.0)
+    parser.add_argument("--falha", choices=["503", "timeout"], default="503")
+    parser.add_argument("--sintetico-se-faltar", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app = criar_app(args.modo, args.fixtures, args.latencia_ms, args.jitter_ms, args.taxa_falhas,
+                    args.falha, args.sintetico_se_faltar, args.seed)
+    print(f"🌦️ Open-Meteo local ({args.modo}) em http://127.0.0.1:{args.porta}/v1/forecast e /v1/archive")
+    uvicorn.run(app, host="127.0.0.1", port=args.porta, log_level="warning")
@@ -3,6 +3,9 @@ import sys
 import time
 import os
 import logging
+import shutil
+import urllib.error
+import urllib.request
 from datetime import datetime
 
 DIR_RAIZ = os.path.dirname(os.path.abspath(__file__))
@@ -57,8 +60,12 @@ def run_script(script_path, description):
         return False
 
 
-def start_api_process(module_name, port, log_filename, description):
-    """Inicia um processo de API em background."""
+def start_api_process(module_name, port, log_filename, description, prefork=False):
+    """
+    Inicia um processo de API em background. Com prefork (Linux/macOS), o app é
+    carregado uma vez no processo pai e os workers são criados com fork
+    (src/servidor_prefork.py), compartilhando as páginas do modelo.
+    """
     logger.info(f"🚀 SUBINDO {description} na porta {port}...")
 
     log_file = open(os.path.join(DIR_LOGS, log_filename), "w", encoding="utf-8")
@@ -69,8 +76,22 @@ def start_api_process(module_name, port, log_filename, description):
     env_vars = get_env_with_src()
     env_vars["PYTHONIOENCODING"] = "utf-8"
 
+    # Métricas Prometheus multiprocesso: uma pasta limpa por serviço, compartilhada pelos workers
+    servico = module_name.split(":")[0].split(".")[-1]
+    dir_metricas = os.path.join(DIR_RAIZ, "cache", "metricas", servico)
+    shutil.rmtree(dir_metricas, ignore_errors=True)
+    os.makedirs(dir_metricas, exist_ok=True)
+    env_vars["PROMETHEUS_MULTIPROC_DIR"] = dir_metricas
+
+    if prefork and hasattr(os, "fork"):
+        comando = [PYTHON_EXEC, os.path.join(DIR_SRC, "servidor_prefork.py"), module_name,
+                   "--host", "0.0.0.0", "--port", str(port), "--workers", workers]
+    else:
+        comando = [PYTHON_EXEC, "-m", "uvicorn", module_name, "--host", "0.0.0.0", "--port", str(port),
+                   "--workers", workers]
+
     processo = subprocess.Popen(
-        [PYTHON_EXEC, "-m", "uvicorn", module_name, "--host", "0.0.0.0", "--port", str(port), "--workers", workers],
+        comando,
         cwd=DIR_RAIZ,
         env=env_vars,
         stdout=log_file,
@@ -79,16 +100,41 @@ def start_api_process(module_name, port, log_filename, description):
     return processo
 
 
+def aguardar_servico(url, processo, description, timeout=180):
+    """Espera o serviço responder em `url` (em vez de um sleep fixo). Retorna False se o processo morrer ou expirar."""
+    inicio = time.time()
+    while time.time() - inicio < timeout:
+        if processo.poll() is not None:
+            logger.error(f"❌ {description} encerrou durante a inicialização (Código {processo.returncode})")
+            return False
+        try:
+            with urllib.request.urlopen(url, timeout=2) as resposta:
+                if resposta.status < 500:
+                    logger.info(f"✅ {description} pronta em {time.time() - inicio:.1f}s")
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.25)
+    logger.error(f"❌ {description} não respondeu em {timeout}s ({url})")
+    return False
+
+
 def run_pipeline():
-    run_script(os.path.join(DIR_SRC, "etl", "etl_ai_consumo.py"), "ETL: Carga Consumo (BDGD)")
+    run_script(os.path.join(DIR_SRC, "etl", "snapshot_bdgd.py"), "ETL: Snapshot Colunar (BDGD)")
+
+    run_script(os.path.join(DIR_SRC, "etl", "cubo_consumo.py"), "ETL: Cubo de Consumo (BDGD)")
 
     run_script(os.path.join(DIR_SRC, "modelos", "processar_voronoi.py"), "Gerando Territórios (Voronoi)")
 
     run_script(os.path.join(DIR_SRC, "modelos", "analise_mercado.py"), "Análise de Mercado")
 
+    run_script(os.path.join(DIR_SRC, "segmento_dados.py"), "Segmento Compartilhado da API (Arrow mmap)")
+
 
     logger.info("🧠 Treinando IA (Duck Curve)... Isso pode levar alguns segundos.")
     run_script(os.path.join(DIR_SRC, "ai", "train_model.py"), "Treinamento Modelo Random Forest")
+    run_script(os.path.join(DIR_SRC, "ai", "floresta_vetorizada.py"), "Exportação da Floresta Vetorizada (numpy)")
+    run_script(os.path.join(DIR_SRC, "ai", "superficie_curva.py"), "Superfície de Resposta da Curva (lookup)")
 
 
 if __name__ == "__main__":
@@ -101,10 +147,12 @@ if __name__ == "__main__":
 
         api_proc = start_api_process("src.api:app", 8000, "api_service.log", "API Principal")
 
-        api_ai_proc = start_api_process("src.ai.ai_service:app", 8001, "api_ai.log", "API Inteligência Artificial")
+        api_ai_proc = start_api_process("src.ai.ai_service:app", 8001, "api_ai.log", "API Inteligência Artificial",
+                                        prefork=True)
 
-        logger.info("⏳ Aguardando 12 segundos para carga completa dos modelos de IA...")
-        time.sleep(12)
+        logger.info("⏳ Aguardando as APIs ficarem prontas...")
+        aguardar_servico("http://127.0.0.1:8000/", api_proc, "API Principal")
+        aguardar_servico("http://127.0.0.1:8001/saude", api_ai_proc, "API Inteligência Artificial")
 
         logger.info("📊 Abrindo Dashboard...")
         dash_proc = subprocess.Popen(
@@ -1,29 +1,44 @@
 import pandas as pd
 import numpy as np
-import joblib
 import uvicorn
 import traceback
 import sys
 import os
-import requests
 import holidays
 import calendar   
 import geopandas as gpd
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
 from datetime import datetime
 from shapely.geometry import Point
 from scipy.ndimage import gaussian_filter1d
 
-# --- TENTATIVA DE IMPORTAR CONFIGURAÇÃO ---
-try:
-    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-    from config import PATH_GDB
-except ImportError:
-    PATH_GDB = "C:/BDGD/BDGD.gdb" # Caminho Fallback
+# --- CONFIGURAÇÃO E MÓDULOS DO SERVIÇO ---
+# Usados já na importação: se faltarem, o erro aparece aqui
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import PATH_GDB, MOTOR_INFERENCIA, LOTE_MAX_ITENS
+from etl.snapshot_bdgd import ler_camada, listar_camadas, listar_colunas
+from etl.cubo_consumo import garantir_cubo, normalizar_id
+from clima_cache import buscar_clima_async
+from cliente_http import ciclo_cliente_http
+from coalescencia import Coalescedor, chave_payload
+from lote_predicao import LotePredicao
+from metricas import instalar_metricas, medir_fase
+from ai.carregador_modelo import carregar_modelo, info_modelo
+from ai.superficie_curva import carregar_superficie, vetor_dna
+from ai.floresta_vetorizada import carregar_floresta
 
 # --- CONFIGURAÇÃO DA APP ---
-app = FastAPI(title="GridScope AI - Enterprise Full", version="7.0 Final-Fix")
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    # Pool HTTP único do processo (Open-Meteo)
+    async with ciclo_cliente_http():
+        yield
+
+app = FastAPI(title="GridScope AI - Enterprise Full", version="7.0 Final-Fix", lifespan=ciclo_de_vida)
+instalar_metricas(app, "ia")
 
 DIR_ATUAL = os.path.dirname(os.path.abspath(__file__))
 SUBESTACOES_GEOJSON = os.path.join(DIR_ATUAL, "subestacoes_logicas.geojson")
@@ -32,16 +47,21 @@ MODEL_PATH = os.path.join(DIR_ATUAL, "modelo_consumo.pkl")
 # ==============================================================================
 # 1. MÓDULO ETL (EXTRAÇÃO DE DADOS REAIS - CONFIRMADO KWH)
 # ==============================================================================
-def normalizar_id(valor):
-    if pd.isna(valor): return ""
-    s = str(valor).strip().replace('.0', '')
-    return s
-
 def buscar_dados_reais_interno(nome_subestacao, mes_alvo):
     """
-    Busca no GDB a soma de energia para o mês alvo.
-    Retorna float (kWh).
+    Busca a soma de energia para o mês alvo no cubo em memória. O GDB só é lido
+    quando o cubo não está disponível: com o cubo carregado, subestação fora
+    dele (sem consumidores ou nome desconhecido) é resposta final.
+    Retorna float (kWh) ou None.
     """
+    if cubo_consumo is not None:
+        total_kwh = cubo_consumo.consumo_mes(nome_subestacao, mes_alvo)
+        if total_kwh is None:
+            print(f"⚠️ Cubo: {nome_subestacao} não encontrada (sem consumidores no BDGD).")
+            return None
+        print(f"🧊 Cubo: {nome_subestacao} (Mês: {mes_alvo}) -> {total_kwh:,.0f} kWh")
+        return total_kwh
+
     if not os.path.exists(PATH_GDB):
         print(f"⚠️ GDB não encontrado.")
         return None
@@ -51,14 +71,14 @@ def buscar_dados_reais_interno(nome_subestacao, mes_alvo):
         
         # 1. Identificar ID da Subestação
         try:
-            sample = gpd.read_file(PATH_GDB, layer='SUB', engine='pyogrio', rows=1)
-            cols = sample.columns.tolist()
+            cols = listar_colunas('SUB', path_gdb=PATH_GDB)
             col_nome = next((c for c in cols if c.upper() in ['NOM', 'NOME', 'NAME', 'PAC_1']), None)
             col_id = next((c for c in cols if c.upper() in ['COD_ID', 'ID', 'CODIGO', 'SUB']), None)
 
             if not col_nome or not col_id: return None
 
-            gdf_sub = gpd.read_file(PATH_GDB, layer='SUB', engine='pyogrio', columns=[col_nome, col_id])
+            with medir_fase("leitura_gdb"):
+                gdf_sub = ler_camada('SUB', columns=[col_nome, col_id], ignore_geometry=True, path_gdb=PATH_GDB)
             filtro = gdf_sub[col_nome].astype(str).str.upper().str.contains(str(nome_subestacao).strip().upper(), na=False)
             
             if filtro.sum() == 0: return None
@@ -72,12 +92,11 @@ def buscar_dados_reais_interno(nome_subestacao, mes_alvo):
 
         # 2. Ler Consumo na layer UCBT
         try:
-            layers = gpd.list_layers(PATH_GDB)['name'].tolist()
+            layers = listar_camadas(PATH_GDB)
             layer_uc = 'UCBT' if 'UCBT' in layers else 'UCBT_tab'
             
             # Pega amostra para achar a coluna do mês
-            sample_uc = gpd.read_file(PATH_GDB, layer=layer_uc, engine='pyogrio', rows=1)
-            cols_uc = sample_uc.columns.tolist()
+            cols_uc = listar_colunas(layer_uc, path_gdb=PATH_GDB)
             
             # Busca coluna ENE_01, ENE_02, etc. baseada no mês numérico
             col_mes = None
@@ -94,7 +113,8 @@ def buscar_dados_reais_interno(nome_subestacao, mes_alvo):
                 return None
 
             # Lê dados
-            df_uc = gpd.read_file(PATH_GDB, layer=layer_uc, engine='pyogrio', columns=['SUB', col_mes], ignore_geometry=True)
+            with medir_fase("leitura_gdb"):
+                df_uc = ler_camada(layer_uc, columns=['SUB', col_mes], ignore_geometry=True, path_gdb=PATH_GDB)
             df_uc['SUB_STR'] = df_uc['SUB'].apply(normalizar_id)
             
             # SOMA DIRETA (CONFIRMADO QUE ESTÁ EM KWH)
@@ -115,10 +135,18 @@ def buscar_dados_reais_interno(nome_subestacao, mes_alvo):
 # ==============================================================================
 # 2. CARREGAMENTO MODELOS
 # ==============================================================================
-model_rf = None
-if os.path.exists(MODEL_PATH):
-    try: model_rf = joblib.load(MODEL_PATH)
-    except: pass
+# Carregado uma vez por processo; com src/servidor_prefork.py, no pai antes do fork
+model_rf = carregar_modelo(MODEL_PATH)
+# Tabela pré-calculada do modelo (src/ai/superficie_curva.py); ausente/reprovada -> modelo direto
+superficie_curva = carregar_superficie() if MOTOR_INFERENCIA == "superficie" else None
+# Mesma floresta em arrays numpy (src/ai/floresta_vetorizada.py), idêntica ao sklearn e compartilhada via mmap
+floresta_vetorizada = carregar_floresta() if MOTOR_INFERENCIA in ("superficie", "vetorizada") else None
+preditor = floresta_vetorizada if floresta_vetorizada is not None else model_rf
+# Requisições concorrentes agrupadas em uma chamada ao modelo (LOTE_MAX_ITENS=1 desativa)
+lote_predicao = LotePredicao(preditor) if preditor is not None and LOTE_MAX_ITENS > 1 else None
+cubo_consumo = None
+try: cubo_consumo = garantir_cubo(PATH_GDB)
+except Exception as e: print(f"⚠️ Cubo de consumo indisponível: {e}")
 gdf_subs = None
 if os.path.exists(SUBESTACOES_GEOJSON):
     try: gdf_subs = gpd.read_file(SUBESTACOES_GEOJSON).to_crs(epsg=4326)
@@ -145,29 +173,24 @@ def resolver_subestacao(lat, lon):
     except: pass
     return "Não Mapeada"
 
-def obter_clima(lat, lon, data_str):
+async def obter_clima(lat, lon, data_str):
     """
     Retorna irradiação solar com formato de sino garantido.
     """
     try:
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": lat, "longitude": lon, 
-            "start_date": data_str, "end_date": data_str, 
-            "hourly": ["shortwave_radiation", "temperature_2m"], 
-            "timezone": "America/Sao_Paulo"
-        }
-        r = requests.get(url, params=params, timeout=3)
-        if r.status_code == 200:
-            d = r.json()
-            r_api = np.array(d["hourly"]["shortwave_radiation"])
-            t_api = np.array(d["hourly"]["temperature_2m"])
-            
-            # Verifica se temos dados válidos
-            if len(r_api) == 24 and np.max(r_api) > 0:
-                return r_api, t_api
-    except:
-        pass
+        hourly = await buscar_clima_async(
+            lat, lon, data_str, ["shortwave_radiation", "temperature_2m"],
+            escala="hourly", fonte="forecast", timeout=3
+        )
+        r_api = np.array(hourly["shortwave_radiation"], dtype=float)
+        t_api = np.array(hourly["temperature_2m"], dtype=float)
+
+        # Verifica se temos dados válidos
+        if len(r_api) == 24 and not np.isnan(r_api).any() and np.max(r_api) > 0:
+            return r_api, t_api
+        print(f"⚠️ Clima sem dados válidos para {data_str} ({lat:.2f}, {lon:.2f}): usando curva padrão")
+    except Exception as e:
+        print(f"⚠️ Clima indisponível ({e}): usando curva padrão")
     
     # Fallback: Curva de sino padrão (aproximação de dia ensolarado)
     # Formato: baixo à noite, crescente pela manhã, pico ao meio-dia, decrescente à tarde
@@ -180,12 +203,21 @@ def obter_clima(lat, lon, data_str):
     
     return rad, temp
 
-def prever_curva_ml(data_alvo, dna):
+# Roda no event loop a cada requisição: o calendário (anos calculados sob demanda) é do processo
+FERIADOS_BR = holidays.Brazil()
+
+def preparar_curva(data_alvo, dna):
+    """(curva da superfície, None) quando ela cobre o DNA; senão (None, features das 24 horas para o modelo)."""
     if not dna: dna = {"residencial": 0.4, "comercial": 0.3, "industrial": 0.3, "rural": 0.0}
-    br_holidays = holidays.Brazil()
-    eh_feriado = int(data_alvo.date() in br_holidays)
+    eh_feriado = int(data_alvo.date() in FERIADOS_BR)
     eh_fds = int(data_alvo.weekday() >= 5)
-    
+
+    if superficie_curva is not None:
+        with medir_fase("predicao_superficie"):
+            curva = superficie_curva.prever(data_alvo.month, data_alvo.weekday(), eh_feriado, vetor_dna(dna))
+        if curva is not None:
+            return curva, None
+
     features = []
     for h in range(24):
         features.append({
@@ -196,22 +228,77 @@ def prever_curva_ml(data_alvo, dna):
             "pct_industrial": float(dna.get('industrial',0)),
             "pct_rural": float(dna.get('rural',0))
         })
-    
-    if model_rf:
-        try: return model_rf.predict(pd.DataFrame(features))
-        except: pass
-    
+    return None, pd.DataFrame(features)
+
+def curva_padrao():
     t = np.linspace(0, 24, 24)
     return np.maximum(10 + 5 * np.sin((t - 10) * np.pi / 12), 0.1)
 
+def prever_curva_ml(data_alvo, dna):
+    curva, features = preparar_curva(data_alvo, dna)
+    if curva is not None:
+        return curva
+
+    if preditor is not None:
+        try:
+            with medir_fase("predicao_modelo"):
+                return preditor.predict(features)
+        except: pass
+    
+    return curva_padrao()
+
+async def prever_curva_ml_async(data_alvo, dna):
+    # Com lotes ativos, as 24 linhas desta requisição vão ao modelo junto com as das concorrentes
+    if lote_predicao is None:
+        return await run_in_threadpool(prever_curva_ml, data_alvo, dna)
+    curva, features = preparar_curva(data_alvo, dna)
+    if curva is not None:
+        return curva
+    try:
+        return await lote_predicao.prever(features)
+    except Exception as e:
+        print(f"⚠️ Predição em lote falhou ({e}): usando curva padrão")
+        return curva_padrao()
+
+coalescedor = Coalescedor()
+
+@app.get("/saude")
+def saude():
+    # Prontidão (run_all aguarda este endpoint) + tempo/memória da carga do modelo
+    return {
+        "status": "online", "modelo": info_modelo(), "cubo_consumo": cubo_consumo is not None,
+        "motor_inferencia": "superficie" if superficie_curva is not None
+                            else "vetorizada" if floresta_vetorizada is not None else "floresta",
+        "lote_predicao": lote_predicao.estatisticas if lote_predicao is not None else None,
+    }
+
 @app.post("/predict/duck-curve")
-def calcular_curva_inteligente(payload: DuckCurveRequest):
+async def calcular_curva_inteligente(payload: DuckCurveRequest):
+    # Payloads idênticos em paralelo (vários usuários na mesma subestação/data) calculam uma vez só
+    return await coalescedor.executar(
+        chave_payload("duck-curve", payload.model_dump()),
+        lambda: executar_curva(payload)
+    )
+
+def data_do_payload(payload):
+    try:
+        return datetime.strptime(payload.data_alvo, "%Y-%m-%d")
+    except:
+        return datetime.now()
+
+async def executar_curva(payload):
+    # Espera o clima sem ocupar thread; o cálculo (pandas/modelo) roda no threadpool
+    clima = await obter_clima(payload.lat, payload.lon, payload.data_alvo)
+    try:
+        curva_shape = await prever_curva_ml_async(data_do_payload(payload), payload.dna_perfil)
+    except Exception:
+        curva_shape = None  # o calcular_curva repete a predição e trata o erro
+    return await run_in_threadpool(calcular_curva, payload, clima, curva_shape)
+
+def calcular_curva(payload, clima, curva_shape=None):
     try:
         sub_nome = resolver_subestacao(payload.lat, payload.lon)
-        try:
-            dt = datetime.strptime(payload.data_alvo, "%Y-%m-%d")
-        except:
-            dt = datetime.now()
+        dt = data_do_payload(payload)
 
         # --- 1. CONSUMO (Confiança no GDB) ---
         consumo_real = buscar_dados_reais_interno(sub_nome, dt.month)
@@ -243,7 +330,8 @@ def calcular_curva_inteligente(payload: DuckCurveRequest):
         _, dias_no_mes = calendar.monthrange(dt.year, dt.month)
         media_diaria_kwh = consumo_mes_final_kwh / dias_no_mes if dias_no_mes > 0 else consumo_mes_final_kwh
 
-        curva_shape = prever_curva_ml(dt, payload.dna_perfil)
+        if curva_shape is None:
+            curva_shape = prever_curva_ml(dt, payload.dna_perfil)
 
         # NORMALIZAÇÃO: Garante que a curva tenha amplitude consistente
         if curva_shape.max() > 0:
@@ -296,7 +384,7 @@ def calcular_curva_inteligente(payload: DuckCurveRequest):
         curve_consumo = curva_combinada * (media_diaria_kwh / soma_shape) * fator_escala
         
         # --- 4. Geração Solar com formato de sino garantido ---
-        rad, temp = obter_clima(payload.lat, payload.lon, payload.data_alvo)
+        rad, temp = clima
         eficiencia_temp = 1.0 - np.clip((temp - 25.0) * 0.004, 0.0, 0.2)
         
         # FÓRMULA AJUSTADA: P(kW) * Irrad(kW/m2) * PR * fator_diurno
@@ -0,0 +1,112 @@
+"""
+Persistência e carregamento do modelo de curva de carga (Random Forest).
+
+- `salvar_modelo`: joblib sem compressão (cada array numpy vira um bloco
+  alinhado no arquivo, legível com mmap_mode) + manifesto com tamanho,
+  número de árvores e versão do scikit-learn, gravados de forma atômica.
+- `carregar_modelo`: um único carregamento por processo, com tempo e memória
+  registrados (`info_modelo()`, exposto no /saude da API de IA). Falhas
+  aparecem no log em vez de serem engolidas.
+
+Compartilhamento entre workers: o scikit-learn copia os nós de cada árvore
+para memória própria ao desserializar, então o mmap reduz o pico da carga,
+mas o que mantém a memória estável com N workers é carregar no processo pai
+antes do fork (src/servidor_prefork.py): as páginas do modelo, que nunca são
+escritas, ficam compartilhadas copy-on-write entre todos os filhos.
+"""
+import json
+import os
+import sys
+import time
+
+import joblib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PATH_MODELO, MODELO_MMAP_MODE
+from metricas import memoria_processo
+
+_MODELO = None
+_INFO = {"carregado": False, "caminho": PATH_MODELO}
+
+
+def _caminho_manifesto(caminho):
+    return os.path.splitext(caminho)[0] + ".json"
+
+
+def impressao_modelo(caminho=PATH_MODELO):
+    """Tamanho + mtime do arquivo: artefatos derivados do modelo guardam isto para detectar retreino."""
+    st = os.stat(caminho)
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def salvar_modelo(modelo, caminho=PATH_MODELO):
+    tmp = f"{caminho}.tmp-{os.getpid()}"
+    joblib.dump(modelo, tmp, compress=0)
+    os.replace(tmp, caminho)
+
+    try:
+        import sklearn
+        versao_sklearn = sklearn.__version__
+    except ImportError:
+        versao_sklearn = None
+    manifesto = {
+        "classe": type(modelo).__name__,
+        "arvores": len(getattr(modelo, "estimators_", [])),
+        "nos": int(sum(e.tree_.node_count for e in getattr(modelo, "estimators_", []))),
+        "tamanho_mb": round(os.path.getsize(caminho) / 1e6, 1),
+        "sklearn": versao_sklearn,
+        "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(_caminho_manifesto(caminho), "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=4, ensure_ascii=False)
+    print(f"💾 Modelo salvo em: {caminho} ({manifesto['tamanho_mb']} MB, {manifesto['arvores']} árvores)")
+
+
+def carregar_modelo(caminho=PATH_MODELO, mmap_mode=MODELO_MMAP_MODE):
+    """Modelo do processo (carregado na primeira chamada; herdado pelos filhos após um fork)."""
+    global _MODELO
+    if _MODELO is not None or _INFO.get("erro"):
+        return _MODELO
+    if not os.path.exists(caminho):
+        _INFO["erro"] = "arquivo não encontrado"
+        print(f"⚠️ Modelo não encontrado em {caminho}: a API de IA usará a curva padrão.")
+        return None
+
+    antes = memoria_processo()
+    inicio = time.perf_counter()
+    try:
+        modelo = joblib.load(caminho, mmap_mode=mmap_mode)
+    except Exception as e:
+        _INFO["erro"] = f"{type(e).__name__}: {e}"
+        print(f"❌ Falha ao carregar o modelo ({caminho}): {e}")
+        return None
+    duracao = time.perf_counter() - inicio
+    depois = memoria_processo()
+
+    manifesto = {}
+    if os.path.exists(_caminho_manifesto(caminho)):
+        with open(_caminho_manifesto(caminho), "r", encoding="utf-8") as f:
+            manifesto = json.load(f)
+
+    _MODELO = modelo
+    _INFO.update({
+        "carregado": True,
+        "mmap_mode": mmap_mode,
+        "carga_s": round(duracao, 3),
+        "pid_carga": os.getpid(),
+        "tamanho_arquivo_mb": round(os.path.getsize(caminho) / 1e6, 1),
+        "rss_acrescimo_mb": round(depois.get("rss_mb", 0) - antes.get("rss_mb", 0), 1),
+        "manifesto": manifesto,
+    })
+    print(f"🧠 Modelo carregado em {duracao:.2f}s (+{_INFO['rss_acrescimo_mb']} MB RSS, pid {os.getpid()})")
+    return modelo
+
+
+def info_modelo():
+    """Estado do carregamento + memória atual do processo (RSS / compartilhada / privada)."""
+    info = dict(_INFO)
+    info["pid"] = os.getpid()
+    info["herdado_do_pai"] = info.get("pid_carga") not in (None, os.getpid())
+    info["memoria_processo"] = memoria_processo()
+    return info
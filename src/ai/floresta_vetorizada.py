@@ -0,0 +1,262 @@
+"""
+Floresta do modelo de consumo exportada em arrays NumPy contíguos e avaliada
+em lote com operações vetorizadas.
+
+Para pontuar anos inteiros (8760 h) de centenas de subestações, o custo do
+`model.predict` está no grafo de objetos do pickle (100 árvores, cada uma com
+sua chamada, validação e threads). Aqui todas as árvores viram um único
+conjunto de arrays, com índices globais de nó:
+
+- feature (int32), limiar (float64), esquerda/direita (int32), valor (float64);
+- raizes (int32): nó inicial de cada árvore.
+
+Folhas apontam para si mesmas, então a descida é um laço fixo de
+`profundidade` passos sobre uma matriz (árvores x linhas) de nós atuais.
+
+Resultado bit a bit igual ao scikit-learn com n_jobs=1: X em float32 (como o
+sklearn converte), comparação `x <= limiar` em float64 e soma das folhas árvore
+a árvore, na ordem de `estimators_`, dividida pelo número de árvores no fim.
+Com n_jobs > 1 o sklearn soma na ordem em que as threads terminam, o que pode
+mudar o último bit. A exportação confere a igualdade e grava no manifesto;
+floresta não conferida não é carregada. Os arrays abrem com mmap, então os
+workers da API de IA os compartilham pelo page cache.
+
+Uso:
+    python src/ai/floresta_vetorizada.py             # exporta e confere
+    python src/ai/floresta_vetorizada.py --conferir  # só confere a exportação existente
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PATH_MODELO, DIR_FLORESTA_VETORIZADA, FLORESTA_LINHAS_POR_BLOCO
+from ai.carregador_modelo import impressao_modelo
+from ai.superficie_curva import FEATURES
+
+NOME_MANIFESTO = "manifest.json"
+ARRAYS = ("feature", "limiar", "esquerda", "direita", "valor", "raizes")
+VERSAO_FLORESTA = 1
+
+
+def achatar_floresta(modelo):
+    """Arrays (dict) com todas as árvores de `modelo.estimators_`, em ordem."""
+    arvores = [e.tree_ for e in modelo.estimators_]
+    tamanhos = np.array([t.node_count for t in arvores], dtype=np.int64)
+    raizes = np.concatenate([[0], np.cumsum(tamanhos)[:-1]])
+
+    feature, limiar, esquerda, direita, valor = [], [], [], [], []
+    for t, inicio in zip(arvores, raizes):
+        folha = t.children_left == -1
+        proprio = np.arange(inicio, inicio + t.node_count)
+        feature.append(np.where(folha, 0, t.feature))
+        limiar.append(t.threshold)
+        esquerda.append(np.where(folha, proprio, t.children_left + inicio))
+        direita.append(np.where(folha, proprio, t.children_right + inicio))
+        valor.append(t.value[:, 0, 0])
+
+    return {
+        "feature": np.concatenate(feature).astype(np.int32),
+        "limiar": np.concatenate(limiar).astype(np.float64),
+        "esquerda": np.concatenate(esquerda).astype(np.int32),
+        "direita": np.concatenate(direita).astype(np.int32),
+        "valor": np.concatenate(valor).astype(np.float64),
+        "raizes": raizes.astype(np.int32),
+    }
+
+
+class FlorestaVetorizada:
+    """Avaliador em lote dos arrays exportados (mesma interface `predict` do sklearn)."""
+
+    def __init__(self, arrays, profundidade, features=None, manifesto=None):
+        for nome in ARRAYS:
+            setattr(self, nome, arrays[nome])
+        self.profundidade = profundidade
+        self.features = features
+        self.manifesto = manifesto or {}
+
+    def _matriz(self, X):
+        if hasattr(X, "columns") and self.features:
+            X = X[self.features]
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2:
+            raise ValueError(f"Esperada matriz 2D de features, recebido shape {X.shape}")
+        if not np.isfinite(X).all():
+            raise ValueError("Features com NaN/infinito não são suportadas pela floresta vetorizada")
+        return X
+
+    def _prever_bloco(self, XT):
+        # XT: (features x linhas); nos: (árvores x linhas)
+        nos = np.repeat(self.raizes[:, None], XT.shape[1], axis=1)
+        for _ in range(self.profundidade):
+            x = np.take_along_axis(XT, self.feature[nos], axis=0)
+            proximos = np.where(x <= self.limiar[nos], self.esquerda[nos], self.direita[nos])
+            if np.array_equal(proximos, nos):
+                break
+            nos = proximos
+
+        folhas = self.valor[nos]
+        soma = np.zeros(XT.shape[1], dtype=np.float64)
+        for linha in folhas:  # árvore a árvore, na ordem do sklearn (np.sum mudaria o arredondamento)
+            soma += linha
+        soma /= len(self.raizes)
+        return soma
+
+    def prever(self, X, linhas_por_bloco=FLORESTA_LINHAS_POR_BLOCO):
+        X = self._matriz(X)
+        saida = np.empty(len(X), dtype=np.float64)
+        for inicio in range(0, len(X), linhas_por_bloco):
+            bloco = X[inicio:inicio + linhas_por_bloco]
+            saida[inicio:inicio + len(bloco)] = self._prever_bloco(np.ascontiguousarray(bloco.T))
+        return saida
+
+    predict = prever
+
+
+def matriz_ano(dnas, ano=2023):
+    """Features de um ano inteiro (8760 h) para cada DNA (k x 4), na ordem do treino."""
+    import holidays
+
+    horas = pd.date_range(f"{ano}-01-01", f"{ano}-12-31 23:00", freq="h")
+    feriados = holidays.Brazil(years=ano)
+    eh_feriado = np.array([d in feriados for d in horas.date], dtype=np.int64)
+    calendario = np.column_stack([
+        horas.hour, horas.month, horas.dayofweek, eh_feriado, (horas.dayofweek >= 5).astype(np.int64)
+    ]).astype(np.float64)
+    dnas = np.asarray(dnas, dtype=np.float64)
+    return pd.DataFrame(
+        np.hstack([np.tile(calendario, (len(dnas), 1)), np.repeat(dnas, len(horas), axis=0)]),
+        columns=FEATURES,
+    )
+
+
+def dnas_aleatorios(k, seed=0):
+    return np.random.default_rng(seed).dirichlet(np.ones(4), size=k)
+
+
+def predizer_sequencial(modelo, X):
+    """`modelo.predict` com n_jobs=1 (ordem de soma determinística), restaurando o n_jobs original."""
+    n_jobs = modelo.n_jobs
+    modelo.set_params(n_jobs=1)
+    try:
+        return modelo.predict(X)
+    finally:
+        modelo.set_params(n_jobs=n_jobs)
+
+
+def conferir(floresta, modelo, X):
+    referencia = predizer_sequencial(modelo, X)
+    obtido = floresta.prever(X)
+    return {
+        "linhas": len(X),
+        "identica": bool(np.array_equal(obtido, referencia)),
+        "divergentes": int(np.count_nonzero(obtido != referencia)),
+        "dif_max": float(np.abs(obtido - referencia).max()) if len(X) else 0.0,
+    }
+
+
+def exportar_floresta(modelo, diretorio=DIR_FLORESTA_VETORIZADA, caminho_modelo=PATH_MODELO, k_conferencia=3):
+    """Grava os arrays + manifesto (troca atômica da pasta) e retorna o resultado da conferência."""
+    inicio = time.perf_counter()
+    arrays = achatar_floresta(modelo)
+    profundidade = int(max(e.tree_.max_depth for e in modelo.estimators_))
+    features = list(getattr(modelo, "feature_names_in_", FEATURES))
+    floresta = FlorestaVetorizada(arrays, profundidade, features)
+    resultado = conferir(floresta, modelo, matriz_ano(dnas_aleatorios(k_conferencia)))
+
+    try:
+        import sklearn
+        versao_sklearn = sklearn.__version__
+    except ImportError:
+        versao_sklearn = None
+    manifesto = {
+        "versao": VERSAO_FLORESTA,
+        "modelo": impressao_modelo(caminho_modelo),
+        "sklearn": versao_sklearn,
+        "arvores": len(arrays["raizes"]),
+        "nos": len(arrays["feature"]),
+        "profundidade": profundidade,
+        "features": features,
+        "tamanho_mb": round(sum(a.nbytes for a in arrays.values()) / 1e6, 1),
+        "conferencia": resultado,
+        "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+    dir_tmp = f"{diretorio.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(dir_tmp, ignore_errors=True)
+    os.makedirs(dir_tmp)
+    for nome, array in arrays.items():
+        np.save(os.path.join(dir_tmp, f"{nome}.npy"), array)
+    with open(os.path.join(dir_tmp, NOME_MANIFESTO), "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=4, ensure_ascii=False)
+    shutil.rmtree(diretorio, ignore_errors=True)
+    os.replace(dir_tmp, diretorio)
+
+    print(f"🌲 Floresta exportada em {time.perf_counter() - inicio:.1f}s: {manifesto['arvores']} árvores, "
+          f"{manifesto['nos']} nós, {manifesto['tamanho_mb']} MB -> {diretorio}")
+    return resultado
+
+
+def carregar_floresta(diretorio=DIR_FLORESTA_VETORIZADA, caminho_modelo=PATH_MODELO):
+    """FlorestaVetorizada (arrays em mmap), ou None se ausente, não conferida ou de outro modelo."""
+    caminho_manifesto = os.path.join(diretorio, NOME_MANIFESTO)
+    if not os.path.exists(caminho_manifesto):
+        print("⚠️ Floresta vetorizada não encontrada: a API de IA usará o scikit-learn.")
+        return None
+    try:
+        with open(caminho_manifesto, "r", encoding="utf-8") as f:
+            manifesto = json.load(f)
+        if manifesto.get("versao") != VERSAO_FLORESTA:
+            print("⚠️ Floresta vetorizada em formato antigo: usando o scikit-learn.")
+            return None
+        if os.path.exists(caminho_modelo) and manifesto.get("modelo") != impressao_modelo(caminho_modelo):
+            print("⚠️ Floresta vetorizada exportada de outro modelo: usando o scikit-learn.")
+            return None
+        if not manifesto.get("conferencia", {}).get("identica"):
+            print(f"⚠️ Floresta vetorizada divergiu do scikit-learn ({manifesto.get('conferencia')}): usando o scikit-learn.")
+            return None
+        arrays = {nome: np.load(os.path.join(diretorio, f"{nome}.npy"), mmap_mode="r") for nome in ARRAYS}
+    except Exception as e:
+        print(f"❌ Falha ao carregar a floresta vetorizada: {e}")
+        return None
+    print(f"🌲 Floresta vetorizada carregada ({manifesto['arvores']} árvores, {manifesto['tamanho_mb']} MB em mmap)")
+    return FlorestaVetorizada(arrays, manifesto["profundidade"], manifesto["features"], manifesto)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conferir", action="store_true", help="só confere a exportação existente")
+    parser.add_argument("--subestacoes", type=int, default=3, help="DNAs (anos de 8760 h) na conferência")
+    args = parser.parse_args()
+
+    from ai.carregador_modelo import carregar_modelo
+    modelo = carregar_modelo(PATH_MODELO)
+    if modelo is None:
+        print("❌ Sem modelo treinado: rode src/ai/train_model.py antes.")
+        sys.exit(1)
+
+    if args.conferir:
+        floresta = carregar_floresta()
+        if floresta is None:
+            sys.exit(1)
+        resultado = conferir(floresta, modelo, matriz_ano(dnas_aleatorios(args.subestacoes, seed=1)))
+    else:
+        resultado = exportar_floresta(modelo, k_conferencia=args.subestacoes)
+
+    if resultado["identica"]:
+        print(f"✅ Predições idênticas bit a bit ao scikit-learn em {resultado['linhas']} linhas")
+    else:
+        print(f"❌ {resultado['divergentes']} de {resultado['linhas']} predições divergem do scikit-learn "
+              f"(dif. máx. {resultado['dif_max']:.3e}): a API seguirá no scikit-learn.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
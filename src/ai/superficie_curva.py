@@ -0,0 +1,250 @@
+"""
+Superfície de resposta pré-calculada do modelo de curva de carga.
+
+A Random Forest é avaliada uma vez, offline, em todas as combinações de
+mês (12) x dia da semana (7) x feriado (2) x grade do DNA x hora (24). A grade
+do DNA é a rede regular do simplex (residencial + comercial + industrial +
+rural = 1) com SUPERFICIE_N_GRADE divisões: 286 pontos para N=10. O resultado
+é um array float32 (~1 MB) salvo em .npy e aberto com mmap na API de IA.
+
+Na requisição, o DNA é interpolado linearmente dentro do sub-simplex da grade
+que o contém (triangulação de Freudenthal: 4 vértices e 4 pesos), então a
+inferência são alguns índices e uma soma ponderada de 4 linhas de 24 horas,
+em vez de 24 linhas passando por 100 árvores.
+
+O erro contra o modelo é medido na geração, em DNAs aleatórios do simplex,
+relativo ao pico de cada curva (a API normaliza a curva pelo máximo). Se o
+p99 passar de SUPERFICIE_TOLERANCIA a superfície não é aprovada, e a API
+continua no modelo. O manifesto (.json ao lado do .npy) guarda a impressão
+digital do modelo: superfície de um modelo antigo é ignorada.
+
+Uso:
+    python src/ai/superficie_curva.py             # gera e valida
+    python src/ai/superficie_curva.py --validar   # só revalida a superfície existente
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PATH_MODELO, PATH_SUPERFICIE, SUPERFICIE_N_GRADE, SUPERFICIE_TOLERANCIA
+from ai.carregador_modelo import impressao_modelo
+
+# Ordem das colunas usada no treino (src/ai/train_model.py)
+FEATURES = ["hora", "mes", "dia_semana", "eh_feriado", "eh_fim_semana",
+            "pct_residencial", "pct_comercial", "pct_industrial", "pct_rural"]
+CLASSES_DNA = ["residencial", "comercial", "industrial", "rural"]
+VERSAO_SUPERFICIE = 1
+
+
+def _caminho_manifesto(caminho):
+    return os.path.splitext(caminho)[0] + ".json"
+
+
+def grade_simplex(n):
+    """
+    Pontos da grade (P x 4, frações do DNA) e tabela (n+1)^3 que leva as
+    coordenadas acumuladas inteiras (a <= b <= c) ao índice do ponto.
+    """
+    pontos, indice = [], np.full((n + 1,) * 3, -1, dtype=np.int32)
+    for a in range(n + 1):
+        for b in range(a, n + 1):
+            for c in range(b, n + 1):
+                indice[a, b, c] = len(pontos)
+                pontos.append((a, b - a, c - b, n - c))
+    return np.array(pontos, dtype=np.float64) / n, indice
+
+
+def _matriz_entrada(mes, dias_semana, feriado, dna_grade):
+    """Linhas do modelo para um mês: (dia_semana x feriado x ponto x hora) nesta ordem."""
+    n_pontos = len(dna_grade)
+    d, f, p, h = np.meshgrid(dias_semana, feriado, np.arange(n_pontos), np.arange(24), indexing="ij")
+    d, f, p, h = (x.ravel() for x in (d, f, p, h))
+    return pd.DataFrame({
+        "hora": h, "mes": mes, "dia_semana": d, "eh_feriado": f, "eh_fim_semana": (d >= 5).astype(int),
+        "pct_residencial": dna_grade[p, 0], "pct_comercial": dna_grade[p, 1],
+        "pct_industrial": dna_grade[p, 2], "pct_rural": dna_grade[p, 3],
+    }, columns=FEATURES)
+
+
+def gerar_superficie(modelo, n=SUPERFICIE_N_GRADE):
+    """Array float32 (12, 7, 2, P, 24) com a predição do modelo em cada nó da grade."""
+    dna_grade, _ = grade_simplex(n)
+    superficie = np.empty((12, 7, 2, len(dna_grade), 24), dtype=np.float32)
+    for mes in range(1, 13):
+        entrada = _matriz_entrada(mes, np.arange(7), np.arange(2), dna_grade)
+        superficie[mes - 1] = modelo.predict(entrada).reshape(7, 2, len(dna_grade), 24)
+    return superficie
+
+
+def vetor_dna(dna):
+    return np.array([float(dna.get(c, 0) or 0) for c in CLASSES_DNA], dtype=np.float64)
+
+
+class SuperficieCurva:
+    """Superfície carregada (mmap) + interpolação no simplex do DNA."""
+
+    def __init__(self, dados, n, manifesto=None):
+        self.dados = dados
+        self.n = n
+        self.manifesto = manifesto or {}
+        _, self.indice = grade_simplex(n)
+
+    def vertices(self, dna):
+        """
+        4 índices da grade e pesos do sub-simplex que contém o DNA, ou None se o
+        DNA estiver fora do simplex (negativo ou soma != 1): aí vale o modelo.
+        """
+        if dna.min() < 0 or abs(dna.sum() - 1.0) > 1e-3:
+            return None
+        n = self.n
+        y = np.clip(np.cumsum(dna[:3]) * n, 0, n)
+        base = np.minimum(np.floor(y), n - 1).astype(int)
+        frac = y - base
+        # Freudenthal: percorre as coordenadas da maior fração para a menor
+        # (empate: a de maior índice primeiro, o que mantém a <= b <= c)
+        ordem = sorted(range(3), key=lambda k: (-frac[k], -k))
+        atual = base.copy()
+        indices = [self.indice[tuple(atual)]]
+        for k in ordem:
+            atual[k] += 1
+            indices.append(self.indice[tuple(atual)])
+        f = frac[ordem]
+        pesos = np.array([1 - f[0], f[0] - f[1], f[1] - f[2], f[2]])
+        return indices, pesos
+
+    def prever(self, mes, dia_semana, eh_feriado, dna):
+        """Curva de 24 horas (float64), ou None quando o DNA não está no simplex."""
+        vert = self.vertices(dna)
+        if vert is None:
+            return None
+        indices, pesos = vert
+        linhas = self.dados[mes - 1, dia_semana, int(eh_feriado), indices].astype(np.float64)
+        return pesos @ linhas
+
+
+def validar(superficie, modelo, amostras=2000, seed=0):
+    """Erro da superfície contra o modelo em DNAs/datas aleatórios, relativo ao pico de cada curva."""
+    rng = np.random.default_rng(seed)
+    dnas = rng.dirichlet(np.ones(4), size=amostras)
+    # Metade das amostras sem rural, como a maioria dos cenários do treino
+    dnas[::2, 3] = 0
+    dnas /= dnas.sum(axis=1, keepdims=True)
+    meses = rng.integers(1, 13, amostras)
+    dias = rng.integers(0, 7, amostras)
+    feriados = rng.integers(0, 2, amostras)
+
+    horas = np.tile(np.arange(24), amostras)
+    rep = lambda v: np.repeat(v, 24)
+    entrada = pd.DataFrame({
+        "hora": horas, "mes": rep(meses), "dia_semana": rep(dias), "eh_feriado": rep(feriados),
+        "eh_fim_semana": rep((dias >= 5).astype(int)),
+        "pct_residencial": rep(dnas[:, 0]), "pct_comercial": rep(dnas[:, 1]),
+        "pct_industrial": rep(dnas[:, 2]), "pct_rural": rep(dnas[:, 3]),
+    }, columns=FEATURES)
+    referencia = modelo.predict(entrada).reshape(amostras, 24)
+
+    erros = np.empty(amostras)
+    for i in range(amostras):
+        curva = superficie.prever(meses[i], dias[i], feriados[i], dnas[i])
+        pico = max(referencia[i].max(), 1e-9)
+        erros[i] = np.abs(curva - referencia[i]).max() / pico
+    return {
+        "amostras": amostras,
+        "erro_max": round(float(erros.max()), 5),
+        "erro_p99": round(float(np.percentile(erros, 99)), 5),
+        "erro_medio": round(float(erros.mean()), 5),
+    }
+
+
+def salvar_superficie(dados, manifesto, caminho=PATH_SUPERFICIE):
+    tmp = f"{caminho}.tmp-{os.getpid()}.npy"
+    np.save(tmp, dados)
+    os.replace(tmp, caminho)
+    with open(_caminho_manifesto(caminho), "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=4, ensure_ascii=False)
+
+
+def carregar_superficie(caminho=PATH_SUPERFICIE, caminho_modelo=PATH_MODELO):
+    """SuperficieCurva pronta para uso, ou None (ausente, reprovada ou de outro modelo)."""
+    if not os.path.exists(caminho) or not os.path.exists(_caminho_manifesto(caminho)):
+        print("⚠️ Superfície da curva não encontrada: a API de IA usará o modelo direto.")
+        return None
+    try:
+        with open(_caminho_manifesto(caminho), "r", encoding="utf-8") as f:
+            manifesto = json.load(f)
+        if manifesto.get("versao") != VERSAO_SUPERFICIE:
+            print("⚠️ Superfície da curva em formato antigo: usando o modelo direto.")
+            return None
+        if os.path.exists(caminho_modelo) and manifesto.get("modelo") != impressao_modelo(caminho_modelo):
+            print("⚠️ Superfície da curva gerada para outro modelo: usando o modelo direto.")
+            return None
+        if not manifesto.get("aprovada"):
+            print(f"⚠️ Superfície da curva reprovada na validação ({manifesto.get('validacao')}): usando o modelo direto.")
+            return None
+        dados = np.load(caminho, mmap_mode="r")
+    except Exception as e:
+        print(f"❌ Falha ao carregar a superfície da curva: {e}")
+        return None
+    print(f"🗺️ Superfície da curva carregada ({dados.nbytes / 1e6:.1f} MB, "
+          f"erro p99 {manifesto['validacao']['erro_p99']:.2%} do pico)")
+    return SuperficieCurva(dados, manifesto["n_grade"], manifesto)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--validar", action="store_true", help="só revalida a superfície existente")
+    parser.add_argument("--amostras", type=int, default=2000)
+    args = parser.parse_args()
+
+    from ai.carregador_modelo import carregar_modelo
+    modelo = carregar_modelo(PATH_MODELO)
+    if modelo is None:
+        print("❌ Sem modelo treinado: rode src/ai/train_model.py antes.")
+        sys.exit(1)
+
+    if args.validar:
+        if not os.path.exists(PATH_SUPERFICIE):
+            print(f"❌ Superfície não encontrada em {PATH_SUPERFICIE}.")
+            sys.exit(1)
+        with open(_caminho_manifesto(PATH_SUPERFICIE), "r", encoding="utf-8") as f:
+            n = json.load(f)["n_grade"]
+        superficie = SuperficieCurva(np.load(PATH_SUPERFICIE, mmap_mode="r"), n)
+        resultado = validar(superficie, modelo, args.amostras)
+        print(f"📏 Erro vs. modelo: {resultado}")
+        sys.exit(0 if resultado["erro_p99"] <= SUPERFICIE_TOLERANCIA else 1)
+
+    inicio = time.perf_counter()
+    dados = gerar_superficie(modelo, SUPERFICIE_N_GRADE)
+    duracao = time.perf_counter() - inicio
+    print(f"🧮 Superfície {dados.shape} gerada em {duracao:.1f}s ({dados.nbytes / 1e6:.1f} MB)")
+
+    resultado = validar(SuperficieCurva(dados, SUPERFICIE_N_GRADE), modelo, args.amostras)
+    aprovada = resultado["erro_p99"] <= SUPERFICIE_TOLERANCIA
+    manifesto = {
+        "versao": VERSAO_SUPERFICIE,
+        "modelo": impressao_modelo(PATH_MODELO),
+        "n_grade": SUPERFICIE_N_GRADE,
+        "forma": list(dados.shape),
+        "tolerancia": SUPERFICIE_TOLERANCIA,
+        "validacao": resultado,
+        "aprovada": aprovada,
+        "geracao_s": round(duracao, 1),
+        "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    salvar_superficie(dados, manifesto)
+    if aprovada:
+        print(f"✅ Superfície aprovada: erro p99 {resultado['erro_p99']:.2%} / máx {resultado['erro_max']:.2%} do pico")
+    else:
+        print(f"⚠️ Superfície reprovada (p99 {resultado['erro_p99']:.2%} > {SUPERFICIE_TOLERANCIA:.2%}): "
+              f"a API seguirá usando o modelo. Aumente SUPERFICIE_N_GRADE.")
+
+
+if __name__ == "__main__":
+    main()
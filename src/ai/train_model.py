@@ -1,10 +1,12 @@
 import os
-import joblib
+import sys
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 import holidays
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai.carregador_modelo import salvar_modelo
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -139,7 +141,7 @@ def treinar_modelo_universal():
     model.fit(X, y)
     
     print(f"💾 Salvando modelo em: {MODEL_PATH}")
-    joblib.dump(model, MODEL_PATH)
+    salvar_modelo(model, MODEL_PATH)
     print("✅ Modelo Universal Treinado com Sucesso!")
 
 if __name__ == "__main__":
@@ -1,26 +1,56 @@
-from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
+from collections.abc import Sequence
+from pydantic import BaseModel, TypeAdapter
 import json
 import os
 import sys
-import requests
 import urllib.parse 
 from datetime import datetime, date
-from typing import Dict, Optional, List, Any
-from shapely.geometry import mapping
+from typing import Dict, Optional, List, Any, Union, Literal
+import numpy as np
+import pyarrow as pa
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 try:
     from config import PATH_GEOJSON
-    from utils import carregar_dados_cache, fundir_dados_geo_mercado
+    from repositorio_dados import RepositorioDados
+    from cache_respostas import RespostaPreparada, serializar_json
+    from consulta_ranking import consultar, consultar_em_fluxo, interpretar_bbox, interpretar_campos, ConsultaInvalida
+    from formatos_saida import escolher_formato, resposta_ndjson, resposta_arrow_registros, resposta_arrow_tabela
+    from clima_cache import buscar_clima_async, buscar_clima_lote_async, fonte_para_data
+    from simulacao_solar import (
+        VARIAVEIS_DIARIAS, MAX_DIAS_PERIODO, FONTES, FONTE_PADRAO,
+        dias_do_periodo, preparar_clima, simular, linhas_simulacao
+    )
+    from cliente_http import ciclo_cliente_http
+    from coalescencia import Coalescedor, chave_payload
+    from metricas import instalar_metricas
 except ImportError:
     pass
 
+repositorio = RepositorioDados()
+coalescedor = Coalescedor()
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    # Carga única na subida; as requisições leem só estruturas em memória
+    try:
+        repositorio.carregar()
+    except Exception as e:
+        print(f"⚠️ Dados indisponíveis na inicialização (nova tentativa na 1ª requisição): {e}")
+    async with ciclo_cliente_http():
+        yield
+
 app = FastAPI(
     title="GridScope API",
     description="API Avançada de Monitoramento de Rede",
-    version="4.7" 
+    version="4.7",
+    lifespan=ciclo_de_vida
 )
+instalar_metricas(app, "api")
 
 def limpar_float(valor):
     """Converte strings BR (1.000,00) ou sujas para float Python (1000.00)"""
@@ -68,32 +98,42 @@ class SimulacaoSolar(BaseModel):
     geracao_estimada_mwh: float
     impacto_na_rede: str
 
+class TotaisPeriodo(BaseModel):
+    dias: int
+    geracao_total_mwh: float
+    geracao_media_diaria_mwh: float
+    irradiacao_media_kwh_m2: float
+    temperatura_max_media_c: float
+    dia_pico_geracao: str
+    geracao_pico_mwh: float
+    dias_criticos: int
+    dias_alta_injecao: int
+    dias_estimados: int
+
+class SimulacaoPeriodo(BaseModel):
+    subestacao: str
+    data_inicio: str
+    data_fim: str
+    potencia_instalada_kw: float
+    totais: TotaisPeriodo
+    dias: List[SimulacaoSolar]
+
+class SimulacaoLoteRequest(BaseModel):
+    subestacoes: Union[Literal["all"], List[str]] = "all"  # IDs técnicos ou nomes
+    data_inicio: str
+    data_fim: Optional[str] = None
+
+
+async def obter_clima_avancado(lat: float, lon: float, data_alvo: date):
+    fonte_api = fonte_para_data(data_alvo)
+    fonte = "Historico Real" if fonte_api == "archive" else "Previsao Numerica"
 
-def obter_clima_avancado(lat: float, lon: float, data_alvo: date):
-    hoje = date.today()
-    
-    if data_alvo < hoje:
-        url = "https://archive-api.open-meteo.com/v1/archive"
-        fonte = "Historico Real"
-    else:
-        url = "https://api.open-meteo.com/v1/forecast"
-        fonte = "Previsao Numerica"
-
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "start_date": data_alvo.isoformat(),
-        "end_date": data_alvo.isoformat(),
-        "daily": ["shortwave_radiation_sum", "temperature_2m_max", "weather_code"],
-        "timezone": "America/Sao_Paulo"
-    }
-    
     try:
-        response = requests.get(url, params=params, timeout=5)
-        response.raise_for_status()
-        dados = response.json()
-        
-        daily = dados.get('daily', {})
+        daily = await buscar_clima_async(
+            lat, lon, data_alvo,
+            ["shortwave_radiation_sum", "temperature_2m_max", "weather_code"],
+            escala="daily", fonte=fonte_api, timeout=5
+        )
         
         irradiacao_mj = daily['shortwave_radiation_sum'][0]
         if irradiacao_mj is None: irradiacao_mj = 0
@@ -117,75 +157,184 @@ def obter_clima_avancado(lat: float, lon: float, data_alvo: date):
 def home():
     return {"status": "online", "system": "GridScope Core 4.7"}
 
+adaptador_ranking = TypeAdapter(List[SubestacaoData])
+adaptador_subestacao = TypeAdapter(SubestacaoData)
+
+class RegistrosValidados(Sequence):
+    """Registros do ranking validados pelo schema um a um, no acesso (formatos em fluxo)."""
+
+    def __init__(self, versao):
+        self.versao = versao
+
+    def __len__(self):
+        return len(self.versao.registros)
+
+    def __getitem__(self, pos):
+        dados = adaptador_subestacao.validate_python(self.versao.registro_completo(pos))
+        return adaptador_subestacao.dump_python(dados, mode="json")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+def montar_registros_validados(versao):
+    # Forma canônica (validada pelo schema) usada pelas consultas parciais
+    dados = adaptador_ranking.validate_python(versao.registros_com_geometria())
+    return adaptador_ranking.dump_python(dados, mode="json")
+
+def montar_ranking(versao):
+    # Validação pelo modelo e serialização acontecem uma vez por versão dos dados
+    dados = adaptador_ranking.validate_python(versao.registros_com_geometria())
+    return RespostaPreparada(adaptador_ranking.dump_json(dados))
+
+def montar_geojson(versao):
+    # O arquivo já é JSON: serve os bytes sem parse/re-serialização
+    with open(versao.caminhos[0], 'rb') as f:
+        return RespostaPreparada(f.read())
+
+def montar_tabela_arrow(versao):
+    # Colunas do GeoJSON + geometria WKB (geoarrow.wkb), como a tabela do geopandas
+    if versao.tabela_territorios is not None:
+        return versao.tabela_territorios  # já mapeada do segmento compartilhado
+    return pa.table(versao.gdf.to_arrow(index=False, geometry_encoding="WKB"))
+
 @app.get("/mercado/ranking", response_model=List[SubestacaoData], tags=["Core"])
-def obter_dados_completos():
+def obter_dados_completos(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, description="Máximo de subestações retornadas"),
+    offset: int = Query(0, ge=0),
+    sort: Optional[str] = Query(None, description="Métrica de ordenação, ex: -consumo_anual_mwh (decrescente)"),
+    fields: Optional[str] = Query(None, description="Campos, ex: subestacao,metricas_rede.consumo_anual_mwh"),
+    geometry: Optional[str] = Query(None, description="none | simplified | full"),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat")
+):
+    consulta = (limit, offset, sort, fields, geometry, bbox)
+    formato = escolher_formato(request)
     try:
-        gdf, dados_mercado = carregar_dados_cache()
-        dados_fundidos = fundir_dados_geo_mercado(gdf, dados_mercado)
-        
-        for item in dados_fundidos:
-            if item.get('geometry'):
-                item['geometry'] = mapping(item['geometry'])
-            
-            if 'metricas_rede' in item:
-                m = item['metricas_rede']
-                if 'consumo_anual_mwh' in m:
-                    m['consumo_anual_mwh'] = limpar_float(m['consumo_anual_mwh'])
-
-            if 'perfil_consumo' in item:
-                for classe, valores in item['perfil_consumo'].items():
-                    raw_consumo = valores.get('consumo_anual_mwh', valores.get('consumo', 0))
-                    valores['consumo_anual_mwh'] = limpar_float(raw_consumo)
-
-        return dados_fundidos
+        versao = repositorio.atual()
+        if formato != "json":
+            # NDJSON / Arrow IPC: cada registro é validado e serializado quando o lote
+            # dele sai; nem a lista nem o corpo vão para o cache de respostas
+            registros = RegistrosValidados(versao)
+            headers = {"X-Total-Count": str(len(registros))}
+            if consulta != (None, 0, None, None, None, None):
+                registros, total = consultar_em_fluxo(
+                    versao, registros, limit=limit, offset=offset, sort=sort,
+                    fields=interpretar_campos(fields) if fields else None,
+                    geometry=geometry, bbox=interpretar_bbox(bbox) if bbox else None
+                )
+                headers["X-Total-Count"] = str(total)
+            if formato == "ndjson":
+                return resposta_ndjson(registros, headers)
+            return resposta_arrow_registros(registros, headers)
+
+        if consulta == (None, 0, None, None, None, None):
+            return versao.resposta_compartilhada("ranking", montar_ranking).responder(request)
+
+        def montar_consulta(v):
+            registros = v.resposta("ranking:registros", montar_registros_validados)
+            itens, total = consultar(
+                v, registros, limit=limit, offset=offset, sort=sort,
+                fields=interpretar_campos(fields) if fields else None,
+                geometry=geometry, bbox=interpretar_bbox(bbox) if bbox else None
+            )
+            return RespostaPreparada(serializar_json(itens)), total
+
+        pronta, total = versao.resposta(("ranking",) + consulta, montar_consulta)
+        return pronta.responder(request, {"X-Total-Count": str(total)})
+    except ConsultaInvalida as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Erro detalhado API: {e}") 
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
 @app.get("/mercado/geojson", tags=["Core"])
-def obter_apenas_geojson():
-    if os.path.exists(PATH_GEOJSON):
-        with open(PATH_GEOJSON, 'r', encoding='utf-8') as f: return json.load(f)
-    raise HTTPException(status_code=404, detail="GeoJSON não encontrado")
+def obter_apenas_geojson(request: Request):
+    try:
+        versao = repositorio.atual()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="GeoJSON não encontrado")
 
-@app.get("/simulacao/{nome_subestacao}", response_model=SimulacaoSolar, tags=["Simulacao"])
-def simular_geracao(
+    formato = escolher_formato(request)
+    if formato == "ndjson":
+        # Uma Feature por linha, gerada sob demanda a partir do GeoDataFrame
+        return resposta_ndjson(versao.gdf.iterfeatures(na="null", show_bbox=False))
+    if formato == "arrow":
+        return resposta_arrow_tabela(versao.resposta("geojson:arrow", montar_tabela_arrow))
+    return versao.resposta_compartilhada("geojson", montar_geojson).responder(request)
+
+@app.get("/subestacoes/{id_tecnico}", response_model=SubestacaoData, tags=["Core"])
+def obter_subestacao(id_tecnico: str):
+    versao = repositorio.atual()
+    pos = versao.indice.por_id_tecnico(id_tecnico)
+    if pos is None:
+        raise HTTPException(status_code=404, detail=f"Subestacao de ID '{id_tecnico}' nao encontrada")
+    return versao.registro_completo(pos)
+
+# Centro de Aracaju: usado quando a subestação não tem território
+PONTO_PADRAO = (-10.9472, -37.0731)
+
+def interpretar_data(texto):
+    """Aceita AAAA-MM-DD, DD-MM-AAAA ou DD/MM/AAAA."""
+    data_clean = texto.replace("/", "-").replace(" ", "-")
+    for fmt in ["%Y-%m-%d", "%d-%m-%Y"]:
+        try:
+            return datetime.strptime(data_clean, fmt).date()
+        except ValueError:
+            continue
+    raise HTTPException(status_code=400, detail="Formato invalido. Use DD-MM-AAAA")
+
+def interpretar_periodo(data_inicio, data_fim):
+    inicio = interpretar_data(data_inicio)
+    fim = interpretar_data(data_fim) if data_fim else inicio
+    if fim < inicio:
+        raise HTTPException(status_code=400, detail="data_fim anterior a data_inicio")
+    dias = dias_do_periodo(inicio, fim)
+    if len(dias) > MAX_DIAS_PERIODO:
+        raise HTTPException(status_code=400, detail=f"Periodo maximo: {MAX_DIAS_PERIODO} dias")
+    return dias
+
+async def simular_posicoes(versao, posicoes, dias):
+    """
+    Clima em lote + física vetorizada para (subestações x dias).
+    Retorna (potencias, fontes, irradiacao, temp, condicao, perda, geracao_mwh, impacto);
+    os arrays têm forma (len(posicoes), len(dias)).
+    """
+    pontos = [versao.pontos[p] or PONTO_PADRAO for p in posicoes]
+    clima = await buscar_clima_lote_async(pontos, dias, VARIAVEIS_DIARIAS)
+    irradiacao, temp, condicao, disponivel = preparar_clima(
+        clima["shortwave_radiation_sum"], clima["temperature_2m_max"], clima["weather_code"]
+    )
+
+    potencias = [limpar_float(versao.registros[p]['geracao_distribuida']['potencia_total_kw']) for p in posicoes]
+    perda, geracao_mwh, impacto = simular(np.array(potencias)[:, None], irradiacao, temp)
+    fonte_dia = np.array([FONTES[fonte_para_data(d)] for d in dias])
+    fontes = np.where(disponivel, fonte_dia, FONTE_PADRAO)
+    return potencias, fontes, irradiacao, temp, condicao, perda, geracao_mwh, impacto
+
+@app.get("/simulacao/{nome_subestacao}", response_model=Union[SimulacaoSolar, SimulacaoPeriodo], tags=["Simulacao"])
+async def simular_geracao(
     nome_subestacao: str, 
-    data: Optional[str] = Query(None, description="Data: DD-MM-AAAA ou DD/MM/AAAA")
+    data: Optional[str] = Query(None, description="Data: DD-MM-AAAA ou DD/MM/AAAA"),
+    data_inicio: Optional[str] = Query(None, description="Início do período (retorna um registro por dia + totais)"),
+    data_fim: Optional[str] = Query(None, description="Fim do período (inclusive)")
 ):
     # 1. TRATAMENTO DA DATA
-    data_obj = date.today()
-    if data:
-        data_clean = data.replace("/", "-").replace(" ", "-")
-        formatos = ["%Y-%m-%d", "%d-%m-%Y"]
-        parsed = False
-        for fmt in formatos:
-            try:
-                data_obj = datetime.strptime(data_clean, fmt).date()
-                parsed = True
-                break
-            except ValueError:
-                continue
-        if not parsed:
-            raise HTTPException(status_code=400, detail="Formato invalido. Use DD-MM-AAAA")
+    if data_fim and not data_inicio:
+        raise HTTPException(status_code=400, detail="data_fim exige data_inicio")
+    dias = interpretar_periodo(data_inicio, data_fim) if data_inicio else None
+    data_obj = interpretar_data(data) if data else date.today()
 
     try:
-        gdf, dados_mercado = carregar_dados_cache()
-        dados_fundidos = fundir_dados_geo_mercado(gdf, dados_mercado)
+        # atual() pode recarregar os arquivos: fora do event loop
+        versao = await run_in_threadpool(repositorio.atual)
     
         nome_buscado = urllib.parse.unquote(nome_subestacao).strip().upper()
-        print(f"DEBUG: Buscando por '{nome_buscado}'...")
-
-        alvo = None
-        for x in dados_fundidos:
-            nome_banco = str(x['subestacao']).strip().upper()
-            
-            if nome_banco == nome_buscado:
-                alvo = x; break
-            if nome_buscado in nome_banco:
-                alvo = x; break
-            if nome_banco in nome_buscado:
-                alvo = x; break
+
+        pos, modo = versao.indice.buscar(nome_buscado)
+        alvo = versao.registros[pos] if pos is not None else None
+        ponto = versao.pontos[pos] if pos is not None else None
+        if modo and modo != "id":
+            print(f"DEBUG: '{nome_buscado}' resolvido por {modo} -> {alvo['subestacao']}")
 
         if not alvo: 
             print(f"ERRO: '{nome_buscado}' nao encontrado no cache.")
@@ -196,41 +345,23 @@ def simular_geracao(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro dados: {e}")
 
-    lat, lon = -10.9472, -37.0731
-    try:
-        geom = alvo.get('geometry')
-        if isinstance(geom, dict) and 'coordinates' in geom:
-             coords = geom['coordinates']
-             if isinstance(coords[0], float): # Point
-                 lon, lat = coords[0], coords[1]
-             else: # Polygon
-                 lon, lat = coords[0][0][0], coords[0][0][1]
-    except Exception as e:
-        print(f"Aviso Geometria: {e}")
+    # Pedidos idênticos (mesma versão dos dados, subestação e data/período) compartilham o cálculo
+    if dias is not None:
+        chave = chave_payload("periodo", versao.hash_conteudo, pos, dias[0], dias[-1])
+        return await coalescedor.executar(chave, lambda: simular_periodo(versao, pos, dias))
+    chave = chave_payload("dia", versao.hash_conteudo, pos, data_obj)
+    return await coalescedor.executar(chave, lambda: simular_dia(alvo, ponto, data_obj))
 
-    irradiacao, temp_max, desc_tempo, fonte = obter_clima_avancado(lat, lon, data_obj)
-    
-    perda_termica = 0.0
-    if temp_max > 25:
-        delta_t = temp_max - 25
-        perda_termica = delta_t * 0.004
-    
-    fator_performance_base = 0.75
-    fator_performance_real = fator_performance_base * (1 - perda_termica)
+async def simular_dia(alvo, ponto, data_obj):
+    lat, lon = ponto if ponto is not None else PONTO_PADRAO
+
+    irradiacao, temp_max, desc_tempo, fonte = await obter_clima_avancado(lat, lon, data_obj)
     
     potencia = limpar_float(alvo['geracao_distribuida']['potencia_total_kw'])
-    
-    geracao_kwh = potencia * irradiacao * fator_performance_real
-    geracao_mwh = geracao_kwh / 1000
-
-    impacto = "Normal"
-    if irradiacao > 5.5 and temp_max < 30:
-        impacto = "CRITICO: Sol forte e Temp amena. Pico de injecao!"
-    elif irradiacao > 5.0:
-        impacto = "ALTA INJECAO: Atencao ao fluxo reverso."
-    elif irradiacao < 2.0:
-        impacto = "BAIXA GERACAO: Rede suportara carga maxima."
-    
+    perda_termica, geracao_mwh, impacto = (
+        x.item() for x in simular(potencia, irradiacao, temp_max)
+    )
+
     return {
         "subestacao": alvo['subestacao'],
         "data_referencia": data_obj.strftime("%d/%m/%Y"),
@@ -242,4 +373,72 @@ def simular_geracao(
         "potencia_instalada_kw": potencia,
         "geracao_estimada_mwh": round(geracao_mwh, 2),
         "impacto_na_rede": impacto
-    }
\ No newline at end of file
+    }
+
+async def simular_periodo(versao, pos, dias):
+    """Série diária de uma subestação (uma chamada de clima por fonte) + totais do período."""
+    potencias, fontes, irradiacao, temp, condicao, perda, geracao_mwh, impacto = \
+        await simular_posicoes(versao, [pos], dias)
+    linhas = linhas_simulacao(
+        versao.registros[pos]['subestacao'], potencias[0], dias, fontes[0].tolist(),
+        irradiacao[0], temp[0], condicao[0], perda[0], geracao_mwh[0], impacto[0]
+    )
+
+    ger = geracao_mwh[0]
+    pico = int(np.argmax(ger))
+    totais = {
+        "dias": len(dias),
+        "geracao_total_mwh": round(float(ger.sum()), 2),
+        "geracao_media_diaria_mwh": round(float(ger.mean()), 2),
+        "irradiacao_media_kwh_m2": round(float(irradiacao[0].mean()), 2),
+        "temperatura_max_media_c": round(float(temp[0].mean()), 1),
+        "dia_pico_geracao": dias[pico].strftime("%d/%m/%Y"),
+        "geracao_pico_mwh": round(float(ger[pico]), 2),
+        "dias_criticos": int(np.char.startswith(impacto[0], "CRITICO").sum()),
+        "dias_alta_injecao": int(np.char.startswith(impacto[0], "ALTA INJECAO").sum()),
+        "dias_estimados": int((fontes[0] == FONTE_PADRAO).sum())
+    }
+    return {
+        "subestacao": versao.registros[pos]['subestacao'],
+        "data_inicio": dias[0].strftime("%d/%m/%Y"),
+        "data_fim": dias[-1].strftime("%d/%m/%Y"),
+        "potencia_instalada_kw": potencias[0],
+        "totais": totais,
+        "dias": linhas
+    }
+
+@app.post("/simulacao/batch", tags=["Simulacao"])
+async def simular_lote(pedido: SimulacaoLoteRequest):
+    """
+    Simulação de várias subestações x vários dias, em NDJSON (uma linha
+    SimulacaoSolar por subestação/dia). O clima é buscado em lote (poucas
+    chamadas multi-ponto ao Open-Meteo) e a física roda vetorizada.
+    """
+    dias = interpretar_periodo(pedido.data_inicio, pedido.data_fim)
+
+    versao = await run_in_threadpool(repositorio.atual)
+    if pedido.subestacoes == "all":
+        posicoes = list(range(len(versao.registros)))
+    else:
+        posicoes, nao_encontradas = [], []
+        for consulta in pedido.subestacoes:
+            pos, _ = versao.indice.buscar(consulta)
+            if pos is None:
+                nao_encontradas.append(consulta)
+            else:
+                posicoes.append(pos)
+        if nao_encontradas:
+            raise HTTPException(status_code=404, detail=f"Subestacoes nao encontradas: {nao_encontradas[:20]}")
+
+    potencias, fontes, irradiacao, temp, condicao, perda, geracao_mwh, impacto = \
+        await simular_posicoes(versao, posicoes, dias)
+
+    def gerar():
+        for i, pos in enumerate(posicoes):
+            linhas = linhas_simulacao(
+                versao.registros[pos]['subestacao'], potencias[i], dias, fontes[i].tolist(),
+                irradiacao[i], temp[i], condicao[i], perda[i], geracao_mwh[i], impacto[i]
+            )
+            yield b"".join(serializar_json(linha) + b"\n" for linha in linhas)
+
+    return StreamingResponse(gerar(), media_type="application/x-ndjson")
@@ -0,0 +1,91 @@
+"""
+Respostas pré-serializadas e comprimidas, com ETag forte por codificação.
+
+Cada versão do conjunto de dados é serializada uma única vez em bytes; as
+variantes gzip/brotli ficam prontas em memória. Cada variante tem a sua ETag
+("<hash>", "<hash>-gzip", "<hash>-br"): ETag forte não pode se repetir entre
+representações diferentes, senão um cache intermediário pode responder 304
+para uma codificação que o cliente nunca recebeu. O cliente que envia
+If-None-Match com qualquer ETag da versão atual recebe 304 sem corpo.
+"""
+import gzip
+import hashlib
+import json
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def serializar_json(obj):
+    """JSON compacto em bytes (orjson quando disponível)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def etags_por_codificacao(hash_corpo, codificacoes):
+    """ETag forte de cada codificação a partir do hash do corpo sem compressão."""
+    return {cod: f'"{hash_corpo}"' if cod == "identity" else f'"{hash_corpo}-{cod}"' for cod in codificacoes}
+
+
+class RespostaPreparada:
+    """Corpo já serializado + variantes comprimidas + ETags fortes (sha256 do corpo, uma por codificação)."""
+
+    def __init__(self, corpo, media_type="application/json"):
+        self.media_type = media_type
+        self.variantes = {"identity": corpo}
+        self.variantes["gzip"] = gzip.compress(corpo, compresslevel=6)
+        if brotli is not None:
+            self.variantes["br"] = brotli.compress(corpo, quality=5)
+        self.etags = etags_por_codificacao(hashlib.sha256(corpo).hexdigest()[:32], self.variantes)
+
+    @classmethod
+    def de_variantes(cls, variantes, etags, media_type="application/json"):
+        """Resposta com os corpos e ETags já prontos (ex: mapeados dos arquivos do segmento compartilhado)."""
+        pronta = cls.__new__(cls)
+        pronta.media_type = media_type
+        pronta.variantes = variantes
+        pronta.etags = etags
+        return pronta
+
+    def _escolher_codificacao(self, accept_encoding):
+        aceitas = {}
+        for parte in (accept_encoding or "").split(","):
+            nome, _, params = parte.strip().partition(";")
+            q = 1.0
+            if params.strip().startswith("q="):
+                try:
+                    q = float(params.strip()[2:])
+                except ValueError:
+                    q = 0.0
+            if nome:
+                aceitas[nome.lower()] = q
+        for cod in ("br", "gzip"):
+            if cod in self.variantes and aceitas.get(cod, aceitas.get("*", 0)) > 0:
+                return cod
+        return "identity"
+
+    def responder(self, request, headers_extras=None):
+        """Monta a Response adequada (304 / br / gzip / identity) para a requisição."""
+        cod = self._escolher_codificacao(request.headers.get("accept-encoding"))
+        headers = {"ETag": self.etags[cod], "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if headers_extras:
+            headers.update(headers_extras)
+
+        if_none_match = request.headers.get("if-none-match", "")
+        etags_cliente = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if not etags_cliente.isdisjoint(self.etags.values()) or "*" in etags_cliente:
+            return Response(status_code=304, headers=headers)
+
+        if cod != "identity":
+            headers["Content-Encoding"] = cod
+        return Response(content=self.variantes[cod], media_type=self.media_type, headers=headers)
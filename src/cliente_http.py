@@ -0,0 +1,112 @@
+"""
+Clientes HTTP compartilhados (um por processo) para todas as chamadas externas.
+
+- `cliente`: httpx.AsyncClient com keep-alive, limite global de conexões,
+  limite de requisições simultâneas por host e timeouts configuráveis. Usado
+  pelos endpoints async das APIs; abra/feche no lifespan com `ciclo_cliente_http`.
+- `sessao_http()`: requests.Session com pool de conexões, para código síncrono
+  (dashboard Streamlit, ETL).
+"""
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    HTTP_TIMEOUT_CONEXAO, HTTP_TIMEOUT_LEITURA, HTTP_MAX_CONEXOES,
+    HTTP_MAX_KEEPALIVE, HTTP_MAX_POR_HOST
+)
+
+USER_AGENT = "GridScope/4.7"
+
+
+def _timeout(timeout):
+    if timeout is None or isinstance(timeout, httpx.Timeout):
+        return timeout
+    return httpx.Timeout(timeout, connect=min(float(timeout), HTTP_TIMEOUT_CONEXAO))
+
+
+class ClienteHTTP:
+    """httpx.AsyncClient compartilhado + semáforo por host."""
+
+    def __init__(self, max_conexoes=HTTP_MAX_CONEXOES, max_keepalive=HTTP_MAX_KEEPALIVE,
+                 max_por_host=HTTP_MAX_POR_HOST, timeout_conexao=HTTP_TIMEOUT_CONEXAO,
+                 timeout_leitura=HTTP_TIMEOUT_LEITURA):
+        self.limites = httpx.Limits(
+            max_connections=max_conexoes,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=30
+        )
+        self.timeout = httpx.Timeout(timeout_leitura, connect=timeout_conexao)
+        self.max_por_host = max_por_host
+        self._cliente = None
+        self._semaforos = {}
+
+    async def iniciar(self):
+        if self._cliente is None:
+            self._cliente = httpx.AsyncClient(
+                limits=self.limites, timeout=self.timeout, headers={"User-Agent": USER_AGENT}
+            )
+        return self
+
+    async def fechar(self):
+        if self._cliente is not None:
+            await self._cliente.aclose()
+            self._cliente = None
+            self._semaforos = {}
+
+    def _semaforo(self, url):
+        host = httpx.URL(url).host
+        sem = self._semaforos.get(host)
+        if sem is None:
+            sem = self._semaforos[host] = asyncio.Semaphore(self.max_por_host)
+        return sem
+
+    async def requisitar(self, metodo, url, timeout=None, **kwargs):
+        if self._cliente is None:
+            await self.iniciar()  # uso fora de um lifespan (scripts, benchmarks)
+        if timeout is not None:
+            kwargs["timeout"] = _timeout(timeout)
+        async with self._semaforo(url):
+            return await self._cliente.request(metodo, url, **kwargs)
+
+    async def get(self, url, **kwargs):
+        return await self.requisitar("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.requisitar("POST", url, **kwargs)
+
+
+cliente = ClienteHTTP()
+
+
+@asynccontextmanager
+async def ciclo_cliente_http():
+    """Para usar dentro do lifespan do FastAPI: abre o pool na subida e fecha no desligamento."""
+    await cliente.iniciar()
+    try:
+        yield cliente
+    finally:
+        await cliente.fechar()
+
+
+_sessao = None
+_lock_sessao = threading.Lock()
+
+
+def sessao_http():
+    """requests.Session compartilhada pelo processo (keep-alive + pool por host)."""
+    global _sessao
+    if _sessao is None:
+        with _lock_sessao:
+            if _sessao is None:
+                sessao = requests.Session()
+                adaptador = HTTPAdapter(pool_connections=HTTP_MAX_POR_HOST, pool_maxsize=HTTP_MAX_KEEPALIVE)
+                sessao.mount("http://", adaptador)
+                sessao.mount("https://", adaptador)
+                sessao.headers["User-Agent"] = USER_AGENT
+                _sessao = sessao
+    return _sessao
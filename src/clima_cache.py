@@ -0,0 +1,312 @@
+"""
+Cache persistente (SQLite) das consultas ao Open-Meteo, compartilhado pela API
+principal e pela API de IA (e por todos os workers de cada uma).
+
+Chave: fonte (archive/forecast) + escala (daily/hourly) + lat/lon arredondados
++ data + conjunto de variáveis. Dias já consolidados (anteriores a
+CLIMA_DIAS_CONSOLIDACAO dias atrás) ficam guardados para sempre; os demais
+(previsão / passado recente ainda sujeito a revisão) expiram após
+CLIMA_TTL_PREVISAO_MIN minutos. Falhas de rede nunca são gravadas.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from config import (
+    PATH_CACHE_CLIMA, CLIMA_TTL_PREVISAO_MIN, CLIMA_CASAS_DECIMAIS, CLIMA_DIAS_CONSOLIDACAO,
+    CLIMA_MAX_LOCAIS_POR_CHAMADA, OPEN_METEO_URL_PREVISAO, OPEN_METEO_URL_HISTORICO
+)
+from cliente_http import cliente, sessao_http
+from metricas import medir_fase, contar_cache
+
+URLS = {"forecast": OPEN_METEO_URL_PREVISAO, "archive": OPEN_METEO_URL_HISTORICO}
+FUSO = "America/Sao_Paulo"
+
+_local = threading.local()
+
+
+def _conexao():
+    """Uma conexão por thread (sqlite3 não compartilha conexões entre threads)."""
+    con = getattr(_local, "con", None)
+    if con is None:
+        os.makedirs(os.path.dirname(PATH_CACHE_CLIMA), exist_ok=True)
+        con = sqlite3.connect(PATH_CACHE_CLIMA, timeout=5, isolation_level=None)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS clima ("
+            " chave TEXT PRIMARY KEY,"
+            " dados TEXT NOT NULL,"
+            " obtido_em REAL NOT NULL,"
+            " expira_em REAL)"  # NULL = não expira
+        )
+        _local.con = con
+    return con
+
+
+def _data_iso(data_alvo):
+    return data_alvo.isoformat() if isinstance(data_alvo, date) else str(data_alvo)[:10]
+
+
+def chave_clima(fonte, escala, lat, lon, data_alvo, variaveis):
+    lat_r = round(float(lat), CLIMA_CASAS_DECIMAIS)
+    lon_r = round(float(lon), CLIMA_CASAS_DECIMAIS)
+    vars_ = ",".join(sorted(variaveis))
+    return f"{fonte}|{escala}|{lat_r:.{CLIMA_CASAS_DECIMAIS}f}|{lon_r:.{CLIMA_CASAS_DECIMAIS}f}|{_data_iso(data_alvo)}|{vars_}"
+
+
+def consolidado(data_alvo):
+    """True se o dia já não muda mais na fonte (pode ficar no cache para sempre)."""
+    dia = date.fromisoformat(_data_iso(data_alvo))
+    return dia < date.today() - timedelta(days=CLIMA_DIAS_CONSOLIDACAO)
+
+
+def ler_cache(chave):
+    try:
+        linha = _conexao().execute(
+            "SELECT dados, expira_em FROM clima WHERE chave = ?", (chave,)
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"⚠️ Cache de clima indisponível (leitura): {e}")
+        return None
+    if linha is None:
+        return None
+    dados, expira_em = linha
+    if expira_em is not None and expira_em < time.time():
+        return None
+    return json.loads(dados)
+
+
+def ler_cache_varios(chaves):
+    """{chave: dados} das entradas válidas entre `chaves` (consulta em blocos)."""
+    encontrados = {}
+    agora = time.time()
+    chaves = list(chaves)
+    try:
+        con = _conexao()
+        for i in range(0, len(chaves), 900):
+            bloco = chaves[i:i + 900]
+            marcadores = ",".join("?" * len(bloco))
+            for chave, dados, expira_em in con.execute(
+                f"SELECT chave, dados, expira_em FROM clima WHERE chave IN ({marcadores})", bloco
+            ):
+                if expira_em is None or expira_em >= agora:
+                    encontrados[chave] = json.loads(dados)
+    except sqlite3.Error as e:
+        print(f"⚠️ Cache de clima indisponível (leitura): {e}")
+    return encontrados
+
+
+def gravar_cache(chave, dados, data_alvo):
+    agora = time.time()
+    expira_em = None if consolidado(data_alvo) else agora + CLIMA_TTL_PREVISAO_MIN * 60
+    try:
+        _conexao().execute(
+            "INSERT OR REPLACE INTO clima (chave, dados, obtido_em, expira_em) VALUES (?, ?, ?, ?)",
+            (chave, json.dumps(dados), agora, expira_em)
+        )
+    except sqlite3.Error as e:
+        print(f"⚠️ Cache de clima indisponível (gravação): {e}")
+
+
+def gravar_cache_varios(itens):
+    """Grava vários [(chave, dados, data_alvo)] em uma única transação."""
+    agora = time.time()
+    linhas = [
+        (chave, json.dumps(dados), agora, None if consolidado(dia) else agora + CLIMA_TTL_PREVISAO_MIN * 60)
+        for chave, dados, dia in itens
+    ]
+    try:
+        con = _conexao()
+        with con:
+            con.execute("BEGIN")
+            con.executemany(
+                "INSERT OR REPLACE INTO clima (chave, dados, obtido_em, expira_em) VALUES (?, ?, ?, ?)", linhas
+            )
+    except sqlite3.Error as e:
+        print(f"⚠️ Cache de clima indisponível (gravação): {e}")
+
+
+def fonte_para_data(data_alvo):
+    """Mesmo critério original da API principal: passado -> archive, hoje/futuro -> forecast."""
+    dia = date.fromisoformat(_data_iso(data_alvo))
+    return "archive" if dia < date.today() else "forecast"
+
+
+def parametros_open_meteo(lat, lon, data_alvo, variaveis, escala):
+    dia = _data_iso(data_alvo)
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "start_date": dia,
+        "end_date": dia,
+        escala: list(variaveis),
+        "timezone": FUSO
+    }
+
+
+def buscar_clima(lat, lon, data_alvo, variaveis, escala="daily", fonte=None, timeout=5):
+    """
+    Retorna o bloco `daily`/`hourly` do Open-Meteo ({variavel: [valores]}) para
+    um dia e um ponto, consultando o cache antes da rede. Levanta exceção se o
+    dado não estiver no cache e a consulta falhar (o chamador decide o fallback).
+    """
+    fonte = fonte or fonte_para_data(data_alvo)
+    chave = chave_clima(fonte, escala, lat, lon, data_alvo, variaveis)
+    dados = ler_cache(chave)
+    if dados is not None:
+        contar_cache("clima", "acerto")
+        return dados
+    contar_cache("clima", "falta")
+
+    params = parametros_open_meteo(lat, lon, data_alvo, variaveis, escala)
+    with medir_fase("clima"):
+        resposta = sessao_http().get(URLS[fonte], params=params, timeout=timeout)
+    resposta.raise_for_status()
+    dados = resposta.json().get(escala, {})
+    gravar_cache(chave, dados, data_alvo)
+    return dados
+
+
+async def buscar_clima_async(lat, lon, data_alvo, variaveis, escala="daily", fonte=None, timeout=5):
+    """
+    Versão async de `buscar_clima`, pelo cliente httpx compartilhado do processo.
+    O SQLite roda numa thread: com o lock de escrita do WAL em outro worker a
+    espera (até o timeout da conexão) não trava o event loop.
+    """
+    fonte = fonte or fonte_para_data(data_alvo)
+    chave = chave_clima(fonte, escala, lat, lon, data_alvo, variaveis)
+    dados = await asyncio.to_thread(ler_cache, chave)
+    if dados is not None:
+        contar_cache("clima", "acerto")
+        return dados
+    contar_cache("clima", "falta")
+
+    params = parametros_open_meteo(lat, lon, data_alvo, variaveis, escala)
+    with medir_fase("clima"):
+        resposta = await cliente.get(URLS[fonte], params=params, timeout=timeout)
+    resposta.raise_for_status()
+    dados = resposta.json().get(escala, {})
+    await asyncio.to_thread(gravar_cache, chave, dados, data_alvo)
+    return dados
+
+
+async def _consultar_locais(fonte, locais, inicio, fim, variaveis, escala, timeout):
+    """Uma chamada ao Open-Meteo para vários pontos (latitude/longitude separados por vírgula)."""
+    params = {
+        "latitude": ",".join(f"{lat:.{CLIMA_CASAS_DECIMAIS}f}" for lat, _ in locais),
+        "longitude": ",".join(f"{lon:.{CLIMA_CASAS_DECIMAIS}f}" for _, lon in locais),
+        "start_date": _data_iso(inicio),
+        "end_date": _data_iso(fim),
+        escala: list(variaveis),
+        "timezone": FUSO
+    }
+    with medir_fase("clima"):
+        resposta = await cliente.get(URLS[fonte], params=params, timeout=timeout)
+    resposta.raise_for_status()
+    corpo = resposta.json()
+    # Um ponto -> objeto; vários pontos -> lista na mesma ordem
+    return [corpo] if isinstance(corpo, dict) else corpo
+
+
+async def buscar_clima_lote_async(pontos, datas, variaveis, timeout=15):
+    """
+    Clima diário de vários pontos x vários dias com o mínimo de chamadas: lê
+    tudo o que já está no cache (por ponto/dia, as mesmas chaves de
+    `buscar_clima`) e busca o restante agrupando até CLIMA_MAX_LOCAIS_POR_CHAMADA
+    pontos por chamada, uma faixa de datas por fonte (archive/forecast).
+
+    Retorna {variavel: ndarray (len(pontos) x len(datas))}, NaN onde não há dado.
+    """
+    datas = [date.fromisoformat(_data_iso(d)) for d in datas]
+    escala = "daily"
+    # Pontos repetidos (mesma chave arredondada) são consultados uma vez só
+    locais = sorted({(round(float(lat), CLIMA_CASAS_DECIMAIS), round(float(lon), CLIMA_CASAS_DECIMAIS))
+                     for lat, lon in pontos})
+    pos_local = {loc: k for k, loc in enumerate(locais)}
+    fontes = [fonte_para_data(d) for d in datas]
+
+    chaves = {
+        (k, j): chave_clima(fontes[j], escala, lat, lon, d, variaveis)
+        for k, (lat, lon) in enumerate(locais) for j, d in enumerate(datas)
+    }
+    cache = await asyncio.to_thread(ler_cache_varios, chaves.values())
+
+    valores = {v: np.full((len(locais), len(datas)), np.nan) for v in variaveis}
+    faltantes = {}  # fonte -> {local: [índices de dias]}
+    for (k, j), chave in chaves.items():
+        bloco = cache.get(chave)
+        if bloco is None:
+            faltantes.setdefault(fontes[j], {}).setdefault(k, []).append(j)
+            continue
+        for v in variaveis:
+            valor = (bloco.get(v) or [None])[0]
+            if valor is not None:
+                valores[v][k, j] = valor
+
+    n_faltas = sum(len(dias) for por_local in faltantes.values() for dias in por_local.values())
+    contar_cache("clima", "acerto", len(chaves) - n_faltas)
+    contar_cache("clima", "falta", n_faltas)
+
+    tarefas = []
+    for fonte, por_local in faltantes.items():
+        idx_dias = sorted({j for dias in por_local.values() for j in dias})
+        inicio, fim = datas[idx_dias[0]], datas[idx_dias[-1]]
+        ks = sorted(por_local)
+        for i in range(0, len(ks), CLIMA_MAX_LOCAIS_POR_CHAMADA):
+            grupo = ks[i:i + CLIMA_MAX_LOCAIS_POR_CHAMADA]
+            tarefas.append((fonte, grupo, _consultar_locais(
+                fonte, [locais[k] for k in grupo], inicio, fim, variaveis, escala, timeout
+            )))
+
+    pos_data = {d.isoformat(): j for j, d in enumerate(datas)}
+    respostas = await asyncio.gather(*(t for _, _, t in tarefas), return_exceptions=True)
+    novos = []
+    for (fonte, grupo, _), resposta in zip(tarefas, respostas):
+        if isinstance(resposta, Exception):
+            print(f"⚠️ Open-Meteo ({fonte}) falhou para {len(grupo)} pontos: {resposta}")
+            continue
+        for k, corpo in zip(grupo, resposta):
+            bloco = corpo.get(escala, {})
+            lat, lon = locais[k]
+            for n, dia in enumerate(bloco.get("time", [])):
+                j = pos_data.get(dia)
+                if j is None or fontes[j] != fonte:
+                    continue
+                por_dia = {"time": [dia]}
+                for v in variaveis:
+                    serie = bloco.get(v) or []
+                    valor = serie[n] if n < len(serie) else None
+                    por_dia[v] = [valor]
+                    if valor is not None:
+                        valores[v][k, j] = valor
+                novos.append((chave_clima(fonte, escala, lat, lon, dia, variaveis), por_dia, dia))
+    if novos:
+        await asyncio.to_thread(gravar_cache_varios, novos)
+
+    # Reexpande dos locais únicos para a ordem original dos pontos
+    idx = np.array([pos_local[(round(float(lat), CLIMA_CASAS_DECIMAIS), round(float(lon), CLIMA_CASAS_DECIMAIS))]
+                    for lat, lon in pontos], dtype=int)
+    return {v: arr[idx] if len(idx) else arr[:0] for v, arr in valores.items()}
+
+
+def limpar_expirados():
+    """Remove entradas de previsão vencidas. Retorna quantas foram apagadas."""
+    cur = _conexao().execute(
+        "DELETE FROM clima WHERE expira_em IS NOT NULL AND expira_em < ?", (time.time(),)
+    )
+    return cur.rowcount
+
+
+if __name__ == "__main__":
+    removidas = limpar_expirados()
+    total, permanentes = _conexao().execute(
+        "SELECT COUNT(*), SUM(expira_em IS NULL) FROM clima"
+    ).fetchone()
+    print(f"🌦️ Cache de clima: {total} entradas ({permanentes or 0} permanentes), {removidas} expiradas removidas")
@@ -0,0 +1,78 @@
+"""
+Coalescência de requisições idênticas ("single-flight") + cache curto de resultados.
+
+Requisições concorrentes com a mesma chave aguardam uma única execução e
+recebem o mesmo resultado; por RESULTADOS_TTL_S segundos o resultado ainda é
+servido da memória. Erros não ficam em cache. A execução roda numa task
+própria: se o cliente que a iniciou desconectar, os demais continuam esperando
+o mesmo cálculo.
+
+Escopo: um processo (cada worker do uvicorn tem o seu).
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+from config import RESULTADOS_TTL_S, RESULTADOS_MAX_ITENS
+from metricas import contar_cache
+
+
+def chave_payload(*partes):
+    """Hash estável de partes JSON-serializáveis (dicts com chaves em qualquer ordem)."""
+    texto = json.dumps(partes, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+class Coalescedor:
+
+    def __init__(self, ttl=RESULTADOS_TTL_S, max_itens=RESULTADOS_MAX_ITENS):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._em_andamento = {}
+        self._resultados = OrderedDict()   # chave -> (expira_em, valor)
+        self.estatisticas = {"cache": 0, "coalescidas": 0, "executadas": 0}
+
+    def _do_cache(self, chave):
+        item = self._resultados.get(chave)
+        if item is None:
+            return None
+        expira_em, valor = item
+        if expira_em < time.monotonic():
+            del self._resultados[chave]
+            return None
+        self._resultados.move_to_end(chave)
+        return item
+
+    def _guardar(self, chave, task):
+        self._em_andamento.pop(chave, None)
+        if task.cancelled() or task.exception() is not None or self.ttl <= 0:
+            return
+        self._resultados[chave] = (time.monotonic() + self.ttl, task.result())
+        while len(self._resultados) > self.max_itens:
+            self._resultados.popitem(last=False)
+
+    async def executar(self, chave, fabrica):
+        """
+        Retorna o resultado de `await fabrica()` para a chave, executando no
+        máximo uma vez por vez (e reaproveitando o resultado durante o TTL).
+        """
+        item = self._do_cache(chave)
+        if item is not None:
+            self.estatisticas["cache"] += 1
+            contar_cache("resultados", "acerto")
+            return item[1]
+
+        task = self._em_andamento.get(chave)
+        if task is None:
+            self.estatisticas["executadas"] += 1
+            contar_cache("resultados", "falta")
+            task = asyncio.ensure_future(fabrica())
+            self._em_andamento[chave] = task
+            task.add_done_callback(lambda t: self._guardar(chave, t))
+        else:
+            self.estatisticas["coalescidas"] += 1
+            contar_cache("resultados", "coalescida")
+        # shield: cancelar uma requisição não cancela o cálculo compartilhado
+        return await asyncio.shield(task)
@@ -16,9 +16,77 @@ NOME_JSON_MERCADO = os.getenv("FILE_MERCADO", "perfil_mercado_aracaju.json")
 PATH_GDB = os.path.join(DIR_DADOS, NOME_GDB)
 PATH_GEOJSON = os.path.join(DIR_RAIZ, NOME_GEOJSON)
 PATH_JSON_MERCADO = os.path.join(DIR_RAIZ, NOME_JSON_MERCADO)
+# Pontos (sítios) das subestações usados no Voronoi, salvos junto dos territórios
+PATH_GEOJSON_PONTOS = os.path.splitext(PATH_GEOJSON)[0] + "_pontos.geojson"
+
+# API principal: intervalo (s) entre verificações de mtime dos arquivos servidos em memória
+INTERVALO_VERIFICACAO_DADOS = float(os.getenv("INTERVALO_VERIFICACAO_DADOS", "2"))
+
+# Snapshot colunar (Parquet/GeoParquet) das camadas do GDB, versionado pela impressão digital do .gdb
+DIR_SNAPSHOT = os.getenv("DIR_SNAPSHOT", os.path.join(DIR_DADOS, "snapshot"))
+CAMADAS_SNAPSHOT = ['SUB', 'UNTRMT', 'UCBT_tab', 'UCBT', 'UGBT_tab', 'SSDMT']
+# Intervalo (s) entre recálculos da impressão digital do .gdb por processo (percorre a pasta inteira)
+INTERVALO_VERIFICACAO_SNAPSHOT = float(os.getenv("INTERVALO_VERIFICACAO_SNAPSHOT", "30"))
+
+# Cubo pré-agregado (subestação x mês x classe) servido em memória pela API de IA
+PATH_CUBO_CONSUMO = os.path.join(DIR_SRC, "ai", "cubo_consumo.pkl")
+
+# Modelo da API de IA: joblib.load(..., mmap_mode=MODELO_MMAP_MODE) ("" desativa o mmap)
+PATH_MODELO = os.path.join(DIR_SRC, "ai", "modelo_consumo.pkl")
+MODELO_MMAP_MODE = os.getenv("MODELO_MMAP_MODE", "r") or None
+
+# Inferência da curva: "superficie" (tabela pré-calculada), "vetorizada" (floresta exportada em
+# arrays numpy) ou "floresta" (model.predict do scikit-learn). Cada motor cai para o seguinte se faltar.
+MOTOR_INFERENCIA = os.getenv("MOTOR_INFERENCIA", "superficie").lower()
+DIR_FLORESTA_VETORIZADA = os.path.join(DIR_SRC, "ai", "floresta_vetorizada")
+FLORESTA_LINHAS_POR_BLOCO = int(os.getenv("FLORESTA_LINHAS_POR_BLOCO", "65536"))  # limita a RAM do lote
+PATH_SUPERFICIE = os.path.join(DIR_SRC, "ai", "superficie_curva.npy")
+SUPERFICIE_N_GRADE = int(os.getenv("SUPERFICIE_N_GRADE", "10"))           # divisões do simplex do DNA
+SUPERFICIE_TOLERANCIA = float(os.getenv("SUPERFICIE_TOLERANCIA", "0.05"))  # p99 do erro vs. o modelo (fração do pico)
 
 CIDADE_ALVO = os.getenv("CIDADE_ALVO", "Aracaju, Sergipe, Brazil")
+
+# Cache offline dos limites municipais (GeoParquet por CIDADE_ALVO normalizada)
+DIR_CACHE = os.path.join(DIR_RAIZ, "cache")
+DIR_CACHE_LIMITES = os.path.join(DIR_CACHE, "limites")
+LIMITE_CACHE_DIAS = int(os.getenv("LIMITE_CACHE_DIAS", "180"))    # 0 = nunca atualiza
+LIMITE_CACHE_MAX_ITENS = int(os.getenv("LIMITE_CACHE_MAX_ITENS", "50"))
+ARQUIVO_LIMITE_CIDADE = os.getenv("ARQUIVO_LIMITE_CIDADE", "")     # importação de arquivo local
+MODO_OFFLINE = os.getenv("MODO_OFFLINE", "0").lower() in ("1", "true", "sim")
+
+# Segmento somente leitura (Arrow IPC mapeado em memória) compartilhado pelos workers da API
+DIR_SEGMENTO = os.getenv("DIR_SEGMENTO", os.path.join(DIR_CACHE, "segmento"))
+SEGMENTO_COMPARTILHADO = os.getenv("SEGMENTO_COMPARTILHADO", "1").lower() in ("1", "true", "sim")
+
+# Open-Meteo: URLs configuráveis (ex: servidor local benchmarks/open_meteo_local.py em CI)
+OPEN_METEO_URL_PREVISAO = os.getenv("OPEN_METEO_URL_PREVISAO", "https://api.open-meteo.com/v1/forecast")
+OPEN_METEO_URL_HISTORICO = os.getenv("OPEN_METEO_URL_HISTORICO", "https://archive-api.open-meteo.com/v1/archive")
+
+# Cache compartilhado das consultas ao Open-Meteo (SQLite em cache/)
+PATH_CACHE_CLIMA = os.getenv("PATH_CACHE_CLIMA", os.path.join(DIR_CACHE, "clima.sqlite"))
+CLIMA_TTL_PREVISAO_MIN = int(os.getenv("CLIMA_TTL_PREVISAO_MIN", "180"))  # previsão / passado recente
+CLIMA_DIAS_CONSOLIDACAO = int(os.getenv("CLIMA_DIAS_CONSOLIDACAO", "7"))  # dias mais antigos não expiram
+CLIMA_CASAS_DECIMAIS = int(os.getenv("CLIMA_CASAS_DECIMAIS", "2"))        # ~1 km de resolução na chave
+CLIMA_MAX_LOCAIS_POR_CHAMADA = int(os.getenv("CLIMA_MAX_LOCAIS_POR_CHAMADA", "100"))  # lote multi-ponto
+
+# Cliente HTTP compartilhado (pool por processo) das chamadas externas
+HTTP_TIMEOUT_CONEXAO = float(os.getenv("HTTP_TIMEOUT_CONEXAO", "3"))
+HTTP_TIMEOUT_LEITURA = float(os.getenv("HTTP_TIMEOUT_LEITURA", "5"))
+HTTP_MAX_CONEXOES = int(os.getenv("HTTP_MAX_CONEXOES", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_MAX_POR_HOST = int(os.getenv("HTTP_MAX_POR_HOST", "10"))  # requisições simultâneas por host
+
+# Coalescência de requisições idênticas (simulação / duck curve): cache curto por processo
+RESULTADOS_TTL_S = float(os.getenv("RESULTADOS_TTL_S", "15"))
+RESULTADOS_MAX_ITENS = int(os.getenv("RESULTADOS_MAX_ITENS", "1024"))
+
+# Micro-lotes de predição na API de IA: requisições concorrentes viram uma única chamada ao modelo
+LOTE_MAX_ITENS = int(os.getenv("LOTE_MAX_ITENS", "64"))                # 1 desativa os lotes
+LOTE_MAX_ESPERA_MS = float(os.getenv("LOTE_MAX_ESPERA_MS", "2"))       # espera máx. para encher o lote
 CRS_PROJETADO = "EPSG:31984"
 
+# Vínculo transformador -> território: "kdtree" (padrão), "sjoin" (legado) ou "validar" (compara os dois)
+MODO_ATRIBUICAO_TRAFOS = os.getenv("MODO_ATRIBUICAO_TRAFOS", "kdtree")
+
 ANEEL_API_HUB_URL = os.getenv("ANEEL_API_HUB_URL", "https://hub.arcgis.com/api/search/v1/collections/all/items")
 DISTRIBUIDORA_ALVO = os.getenv("DISTRIBUIDORA_ALVO", "Energisa SE")
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+Consultas parciais ao ranking de subestações: filtro espacial (bbox via
+STRtree), ordenação por métrica com seleção top-k, paginação e projeção de
+campos/geometria.
+
+Tudo o que não depende da consulta (registros validados, árvore espacial,
+geometrias simplificadas, colunas numéricas de ordenação) é montado uma vez
+por versão dos dados via `VersaoDados.resposta`.
+"""
+from collections.abc import Sequence
+
+import numpy as np
+import shapely
+from shapely.geometry import mapping
+
+CAMPOS = ["subestacao", "metricas_rede", "geracao_distribuida", "perfil_consumo", "geometry"]
+MODOS_GEOMETRIA = ("none", "simplified", "full")
+TOLERANCIA_SIMPLIFICACAO = 0.0005   # graus (~50 m): suficiente para mapas de visão geral
+
+# Atalhos para as métricas mais usadas em `sort`
+ALIASES_METRICAS = {
+    "consumo_anual_mwh": "metricas_rede.consumo_anual_mwh",
+    "total_clientes": "metricas_rede.total_clientes",
+    "nivel_criticidade_gd": "metricas_rede.nivel_criticidade_gd",
+    "potencia_total_kw": "geracao_distribuida.potencia_total_kw",
+    "total_unidades": "geracao_distribuida.total_unidades",
+}
+
+
+class ConsultaInvalida(ValueError):
+    pass
+
+
+def _valor(registro, caminho):
+    for parte in caminho.split("."):
+        if not isinstance(registro, dict) or parte not in registro:
+            return None
+        registro = registro[parte]
+    return registro
+
+
+def interpretar_bbox(texto):
+    try:
+        minx, miny, maxx, maxy = (float(v) for v in texto.split(","))
+    except ValueError:
+        raise ConsultaInvalida("bbox deve ser 'min_lon,min_lat,max_lon,max_lat'")
+    if minx > maxx or miny > maxy:
+        raise ConsultaInvalida("bbox com mínimos maiores que máximos")
+    return minx, miny, maxx, maxy
+
+
+def interpretar_campos(texto):
+    """'subestacao,metricas_rede.consumo_anual_mwh' -> ('subestacao', 'metricas_rede.consumo_anual_mwh')"""
+    campos = tuple(dict.fromkeys(c.strip() for c in texto.split(",") if c.strip()))
+    for c in campos:
+        if c.split(".")[0] not in CAMPOS:
+            raise ConsultaInvalida(f"Campo desconhecido: '{c}'. Disponíveis: {', '.join(CAMPOS)}")
+    return campos
+
+
+# --- Estruturas por versão (montadas sob demanda, uma vez) ---
+
+def _arvore(versao):
+    def montar(v):
+        geoms = v.geometrias_array()
+        posicoes = np.flatnonzero(~shapely.is_missing(geoms) & ~shapely.is_empty(geoms))
+        return shapely.STRtree(geoms[posicoes]), posicoes
+    return versao.resposta("consulta:arvore", montar)
+
+
+def _simplificadas(versao):
+    def montar(v):
+        geoms = v.geometrias_array()
+        validas = ~shapely.is_missing(geoms)
+        saida = [None] * len(geoms)
+        if validas.any():
+            simples = shapely.simplify(geoms[validas], TOLERANCIA_SIMPLIFICACAO, preserve_topology=True)
+            for i, g in zip(np.flatnonzero(validas), simples):
+                saida[i] = mapping(g)
+        return saida
+    return versao.resposta("consulta:simplificadas", montar)
+
+
+def _coluna(versao, registros, caminho):
+    """Valores de uma métrica como array (float; NaN onde ausente) ou object para texto."""
+    def montar(v):
+        valores = [_valor(r, caminho) for r in registros]
+        if all(x is None or isinstance(x, (int, float)) for x in valores):
+            return np.array([np.nan if x is None else float(x) for x in valores], dtype=float)
+        return np.array(["" if x is None else str(x) for x in valores], dtype=object)
+    return versao.resposta(f"consulta:coluna:{caminho}", montar)
+
+
+# --- Consulta ---
+
+def filtrar_bbox(versao, bbox):
+    arvore, posicoes = _arvore(versao)
+    if len(posicoes) == 0:
+        return np.empty(0, dtype=int)
+    hits = arvore.query(shapely.box(*bbox), predicate="intersects")
+    return np.sort(posicoes[hits])
+
+
+def ordenar_top_k(versao, registros, posicoes, sort, k):
+    """Ordena `posicoes` pela métrica (prefixo '-' = decrescente) e devolve só os k primeiros."""
+    decrescente = sort.startswith("-")
+    caminho = sort.lstrip("-+")
+    caminho = ALIASES_METRICAS.get(caminho, caminho)
+    if caminho.split(".")[0] not in CAMPOS:
+        raise ConsultaInvalida(f"Métrica de ordenação desconhecida: '{sort}'")
+
+    coluna = _coluna(versao, registros, caminho)[posicoes]
+    if coluna.dtype == object:
+        # Texto: ordenação completa (estável) e depois corte
+        ordem = sorted(range(len(posicoes)), key=lambda i: coluna[i], reverse=decrescente)
+        return posicoes[np.array(ordem, dtype=int)][:k]
+
+    chave = -coluna if decrescente else coluna.copy()
+    chave[np.isnan(chave)] = np.inf     # ausentes sempre no fim
+    if k < len(chave):
+        candidatos = np.argpartition(chave, k - 1)[:k]
+    else:
+        candidatos = np.arange(len(chave))
+    # Empates desempatados pela ordem original, para a paginação ser estável
+    ordem = candidatos[np.lexsort((posicoes[candidatos], chave[candidatos]))]
+    return posicoes[ordem][:k]
+
+
+def _projetar(registro, campos):
+    saida = {}
+    for c in campos:
+        partes = c.split(".")
+        valor = _valor(registro, c)
+        if valor is None and partes[0] not in registro:
+            continue
+        destino = saida
+        for p in partes[:-1]:
+            destino = destino.setdefault(p, {})
+        destino[partes[-1]] = valor
+    return saida
+
+
+class ItensConsulta(Sequence):
+    """
+    Itens projetados das `posicoes` (já filtradas, ordenadas e paginadas),
+    montados um a um no acesso: os formatos em fluxo nunca têm o resultado
+    inteiro em memória.
+    """
+
+    def __init__(self, versao, registros, posicoes, fields=None, geometry=None):
+        campos = list(fields) if fields else [c for c in CAMPOS]
+        if geometry is None:
+            geometry = "full" if "geometry" in campos else "none"
+        self.registros = registros
+        self.posicoes = posicoes.tolist()
+        self.campos = [c for c in campos if c.split(".")[0] != "geometry"]
+        self.geometry = geometry
+        self.simplificadas = _simplificadas(versao) if geometry == "simplified" else None
+
+    def __len__(self):
+        return len(self.posicoes)
+
+    def __getitem__(self, i):
+        pos = self.posicoes[i]
+        registro = self.registros[pos]
+        item = _projetar(registro, self.campos)
+        if self.geometry == "full":
+            item["geometry"] = registro.get("geometry")
+        elif self.geometry == "simplified":
+            item["geometry"] = self.simplificadas[pos]
+        return item
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self.posicoes)))
+
+
+def consultar_em_fluxo(versao, registros, limit=None, offset=0, sort=None, fields=None, geometry=None, bbox=None):
+    """Como `consultar`, mas `itens` é um ItensConsulta (projeção sob demanda)."""
+    if geometry is not None and geometry not in MODOS_GEOMETRIA:
+        raise ConsultaInvalida(f"geometry deve ser um de: {', '.join(MODOS_GEOMETRIA)}")
+
+    posicoes = filtrar_bbox(versao, bbox) if bbox is not None else np.arange(len(registros))
+    total = len(posicoes)
+    fim = total if limit is None else min(total, offset + limit)
+
+    if sort:
+        posicoes = ordenar_top_k(versao, registros, posicoes, sort, fim)
+    posicoes = posicoes[offset:fim]
+    return ItensConsulta(versao, registros, posicoes, fields, geometry), total
+
+
+def consultar(versao, registros, limit=None, offset=0, sort=None, fields=None, geometry=None, bbox=None):
+    """
+    Retorna (itens, total): `itens` já projetados e paginados; `total` é o número
+    de subestações que passaram no filtro (antes da paginação).
+    """
+    itens, total = consultar_em_fluxo(versao, registros, limit, offset, sort, fields, geometry, bbox)
+    return list(itens), total
@@ -1,4 +1,3 @@
-import geopandas as gpd
 import os
 import sys
 
@@ -9,6 +8,8 @@ try:
 except ImportError:
     PATH_GDB = "caminho/para/seu/arquivo.gdb"
 
+from etl.snapshot_bdgd import ler_camada, listar_camadas
+
 def carregar_subestacoes():
     print("Iniciando módulo de carregamento (ETL)...")
     print(f"Lendo GDB em: {PATH_GDB}")
@@ -19,7 +20,7 @@ def carregar_subestacoes():
         sys.exit(1)
 
     try:
-        gdf = gpd.read_file(PATH_GDB, layer='SUB', engine='pyogrio')
+        gdf = ler_camada('SUB', path_gdb=PATH_GDB)
         
         # 2. Normaliza Nome
         coluna_nome = 'NOM'
@@ -46,17 +47,11 @@ def carregar_subestacoes():
         print("Cruzando com base de consumidores para validar operação...")
         
         try:
-            layers = gpd.list_layers(PATH_GDB)
-            layer_uc = next((l for l in ['UCBT_tab', 'UCBT'] if l in layers['name'].values), None)
+            layers = listar_camadas(PATH_GDB)
+            layer_uc = next((l for l in ['UCBT_tab', 'UCBT'] if l in layers), None)
             
             if layer_uc:
-                df_clientes = gpd.read_file(
-                    PATH_GDB, 
-                    layer=layer_uc, 
-                    engine='pyogrio', 
-                    ignore_geometry=True, 
-                    columns=['SUB']
-                )
+                df_clientes = ler_camada(layer_uc, columns=['SUB'], ignore_geometry=True, path_gdb=PATH_GDB)
 
                 ids_com_carga = df_clientes['SUB'].astype(str).unique()
                 
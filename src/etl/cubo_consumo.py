@@ -0,0 +1,238 @@
+"""
+Cubo de consumo pré-agregado: (subestação x mês x classe) -> kWh, com contagem de clientes.
+
+Construído uma vez a partir da UCBT (via snapshot colunar) e salvo ao lado do
+modelo de IA. A API de IA e o ETL de consumo respondem a partir dele em memória,
+com busca O(1) por ID canônico ou por nome normalizado.
+"""
+import pandas as pd
+import numpy as np
+import joblib
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PATH_GDB, PATH_CUBO_CONSUMO
+from utils import normalizar_nome
+from etl.snapshot_bdgd import ler_camada, listar_camadas, listar_colunas, impressao_digital_gdb
+
+CLASSES_DNA = ["residencial", "comercial", "industrial", "rural"]
+# Última posição do eixo de classes: consumo de bases sem coluna de classe
+CLASSES_CUBO = CLASSES_DNA + ["indefinido"]
+VERSAO_CUBO = 1
+
+
+def normalizar_ids(serie):
+    """Versão vetorizada de normalizar_id: 123.0 -> "123" | " 123 " -> "123" | NaN -> ""."""
+    s = serie.astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    return s.where(serie.notna(), "")
+
+
+def normalizar_id(valor):
+    """123.0 -> "123" | " 123 " -> "123" | NaN/None -> "" (mesma regra de normalizar_ids)."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ""
+    s = str(valor).strip()
+    if s.endswith('.0'):
+        return s[:-2]
+    return s
+
+
+def classe_dna(codigo):
+    """Mapeamento ANEEL simplificado do código de classe para as classes do DNA."""
+    c_str = str(codigo).upper()
+    if c_str == '1' or 'RES' in c_str:
+        return 'residencial'
+    if c_str == '3' or 'COM' in c_str:
+        return 'comercial'
+    if c_str in ['2', '8'] or 'IND' in c_str:
+        return 'industrial'
+    if c_str == '4' or 'RUR' in c_str:
+        return 'rural'
+    return 'comercial'  # Outros cai em comercial
+
+
+class CuboConsumo:
+    """Cubo em memória com índices por ID e por nome normalizado."""
+
+    def __init__(self, dados):
+        self.ids = list(dados["ids"])
+        self.nomes = list(dados["nomes"])
+        self.energia = np.asarray(dados["energia"])    # (subs, 12, classes) em kWh
+        self.clientes = np.asarray(dados["clientes"])  # (subs, classes)
+        self.tem_classe = bool(dados["tem_classe"])
+        self.impressao_digital = dados.get("impressao_digital")
+
+        self._por_id = {i: pos for pos, i in enumerate(self.ids)}
+        self._por_nome = {}
+        for pos, nome in enumerate(self.nomes):
+            chave = normalizar_nome(nome)
+            if chave and chave not in self._por_nome:
+                self._por_nome[chave] = pos
+
+    def __len__(self):
+        return len(self.ids)
+
+    def localizar(self, chave):
+        """Retorna a posição da subestação no cubo (por ID ou nome) ou None."""
+        pos = self._por_id.get(normalizar_id(chave))
+        if pos is not None:
+            return pos
+
+        nome = normalizar_nome(str(chave).split(' (ID')[0])
+        if not nome:
+            return None
+        pos = self._por_nome.get(nome)
+        if pos is not None:
+            return pos
+
+        # Compatibilidade com a busca antiga (nome contido), só em caso de falha do índice
+        for nome_cubo, pos in self._por_nome.items():
+            if nome in nome_cubo:
+                return pos
+        return None
+
+    def consumo_mes(self, chave, mes):
+        """Soma de kWh da subestação no mês (1-12), ou None se não estiver no cubo."""
+        pos = self.localizar(chave)
+        if pos is None:
+            return None
+        return float(self.energia[pos, int(mes) - 1, :].sum())
+
+    def resumo(self, chave):
+        """Perfil mensal, mensal por classe, clientes e DNA de uma subestação."""
+        pos = self.localizar(chave)
+        if pos is None:
+            return None
+
+        energia = self.energia[pos]
+        mensal = energia.sum(axis=1)
+        anual_classe = energia[:, :len(CLASSES_DNA)].sum(axis=0)
+        total_classificado = anual_classe.sum()
+
+        dna = None
+        if self.tem_classe and total_classificado > 0:
+            dna = {c: float(v / total_classificado) for c, v in zip(CLASSES_DNA, anual_classe)}
+
+        return {
+            "id": self.ids[pos],
+            "nome": self.nomes[pos],
+            "consumo_mensal": {m + 1: float(mensal[m]) for m in range(12)},
+            "consumo_mensal_por_classe": {
+                m + 1: {c: float(energia[m, i]) for i, c in enumerate(CLASSES_DNA)}
+                for m in range(12)
+            },
+            "clientes_por_classe": {c: int(self.clientes[pos, i]) for i, c in enumerate(CLASSES_DNA)},
+            "total_clientes": int(self.clientes[pos].sum()),
+            "consumo_anual": float(mensal.sum()),
+            "dna_perfil": dna
+        }
+
+
+def gerar_cubo(path_gdb=PATH_GDB):
+    """Agrega a UCBT inteira em um único passe vetorizado."""
+    inicio = time.time()
+    print("🧊 Construindo cubo de consumo (subestação x mês x classe)...")
+
+    cols_sub = listar_colunas('SUB', path_gdb=path_gdb)
+    col_nome = next((c for c in cols_sub if c.upper() in ['NOM', 'NOME', 'NAME', 'PAC_1']), None)
+    col_id = next((c for c in cols_sub if c.upper() in ['COD_ID', 'ID', 'CODIGO', 'SUB']), None)
+    nomes_sub = {}
+    if col_nome and col_id:
+        df_sub = ler_camada('SUB', columns=[col_nome, col_id], ignore_geometry=True, path_gdb=path_gdb)
+        nomes_sub = dict(zip(normalizar_ids(df_sub[col_id]), df_sub[col_nome].astype(str)))
+
+    layers = listar_camadas(path_gdb)
+    layer_uc = 'UCBT' if 'UCBT' in layers else 'UCBT_tab'
+    cols_uc = listar_colunas(layer_uc, path_gdb=path_gdb)
+
+    cols_ene = {}
+    for c in cols_uc:
+        parts = c.split('_')
+        if c.upper().startswith('ENE_') and len(parts) > 1 and parts[1].isdigit() and 1 <= int(parts[1]) <= 12:
+            cols_ene[c] = int(parts[1])
+    col_classe = next((c for c in cols_uc if c in ['CLA_CONS', 'TIP_CC', 'CLASSE', 'COD_CLASS']), None)
+
+    cols_leitura = ['SUB'] + list(cols_ene)
+    if col_classe:
+        cols_leitura.append(col_classe)
+    df_uc = ler_camada(layer_uc, columns=cols_leitura, ignore_geometry=True, path_gdb=path_gdb)
+
+    ids_uc = normalizar_ids(df_uc['SUB'])
+    cod_sub, ids = pd.factorize(ids_uc)
+
+    n_cls = len(CLASSES_CUBO)
+    if col_classe:
+        # Mapeia só os códigos distintos e propaga por código (evita apply linha a linha)
+        cod_raw, uniq_raw = pd.factorize(df_uc[col_classe].astype(str))
+        mapa = np.array([CLASSES_CUBO.index(classe_dna(u)) for u in uniq_raw], dtype=np.int64)
+        cod_cls = mapa[cod_raw] if len(mapa) else np.zeros(len(df_uc), dtype=np.int64)
+    else:
+        cod_cls = np.full(len(df_uc), n_cls - 1, dtype=np.int64)
+
+    n_subs = len(ids)
+    celula = cod_sub.astype(np.int64) * n_cls + cod_cls
+
+    energia = np.zeros((n_subs, 12, n_cls))
+    for col, mes in cols_ene.items():
+        valores = pd.to_numeric(df_uc[col], errors='coerce').fillna(0.0).to_numpy(dtype=float)
+        energia[:, mes - 1, :] += np.bincount(celula, weights=valores, minlength=n_subs * n_cls).reshape(n_subs, n_cls)
+
+    clientes = np.bincount(celula, minlength=n_subs * n_cls).reshape(n_subs, n_cls)
+
+    ids = [str(i) for i in ids]
+    dados = {
+        "versao": VERSAO_CUBO,
+        "impressao_digital": impressao_digital_gdb(path_gdb),
+        "ids": ids,
+        "nomes": [nomes_sub.get(i, i) for i in ids],
+        "energia": energia,
+        "clientes": clientes,
+        "tem_classe": col_classe is not None
+    }
+    print(f"✅ Cubo com {n_subs} subestações e {len(df_uc)} clientes ({time.time() - inicio:.1f}s)")
+    return dados
+
+
+def salvar_cubo(dados, path_cubo=PATH_CUBO_CONSUMO):
+    tmp = f"{path_cubo}.tmp-{os.getpid()}"
+    joblib.dump(dados, tmp)
+    os.replace(tmp, path_cubo)
+    print(f"💾 Cubo salvo em: {path_cubo}")
+
+
+def garantir_cubo(path_gdb=PATH_GDB, path_cubo=PATH_CUBO_CONSUMO):
+    """
+    Carrega o cubo persistido. Se o GDB estiver disponível e tiver mudado desde a
+    construção, reconstrói. Retorna CuboConsumo ou None.
+    """
+    dados = None
+    if os.path.exists(path_cubo):
+        try:
+            dados = joblib.load(path_cubo)
+            if dados.get("versao") != VERSAO_CUBO:
+                dados = None
+        except Exception as e:
+            print(f"⚠️ Cubo de consumo ilegível ({e}).")
+            dados = None
+
+    if os.path.exists(path_gdb):
+        try:
+            if dados is None or dados.get("impressao_digital") != impressao_digital_gdb(path_gdb):
+                dados = gerar_cubo(path_gdb)
+                salvar_cubo(dados, path_cubo)
+        except Exception as e:
+            print(f"⚠️ Não foi possível construir o cubo de consumo: {e}")
+
+    if dados is None:
+        return None
+    return CuboConsumo(dados)
+
+
+if __name__ == "__main__":
+    if not os.path.exists(PATH_GDB):
+        print(f"❌ GDB não encontrado em: {PATH_GDB}")
+        sys.exit(1)
+    salvar_cubo(gerar_cubo(PATH_GDB))
@@ -0,0 +1,214 @@
+"""
+Cache offline e endereçado por conteúdo dos limites municipais.
+
+Cada limite resolvido (OSM/Nominatim ou arquivo local) é salvo como GeoParquet
+em cache/limites/objetos/<sha256>.parquet, e o índice (cache/limites/indice.json)
+associa a CIDADE_ALVO normalizada ao objeto. Com o cache preenchido, a geração
+do Voronoi roda sem rede (CI, ambientes isolados).
+
+Uso:
+    python src/etl/limites_cidade.py --listar
+    python src/etl/limites_cidade.py --importar limite.geojson [--cidade "Aracaju, Sergipe, Brazil"]
+    python src/etl/limites_cidade.py --atualizar
+"""
+import geopandas as gpd
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    CIDADE_ALVO, DIR_CACHE_LIMITES, LIMITE_CACHE_DIAS, LIMITE_CACHE_MAX_ITENS,
+    ARQUIVO_LIMITE_CIDADE, MODO_OFFLINE
+)
+from utils import normalizar_nome
+
+DIR_OBJETOS = os.path.join(DIR_CACHE_LIMITES, "objetos")
+PATH_INDICE = os.path.join(DIR_CACHE_LIMITES, "indice.json")
+# Leituras do cache só regravam o índice (para o LRU) se o último acesso anotado for mais antigo que isto
+INTERVALO_ACESSO_S = 3600
+
+
+def chave_cidade(cidade):
+    """Chave do índice: nome normalizado (sem acento, maiúsculo, vírgulas uniformes)."""
+    partes = [normalizar_nome(p) for p in str(cidade).split(",")]
+    return ", ".join(p for p in partes if p)
+
+
+def _ler_indice():
+    if not os.path.exists(PATH_INDICE):
+        return {}
+    try:
+        with open(PATH_INDICE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Índice de limites ilegível ({e}). Recriando.")
+        return {}
+
+
+def _gravar_indice(indice):
+    os.makedirs(DIR_CACHE_LIMITES, exist_ok=True)
+    tmp = f"{PATH_INDICE}.tmp-{os.getpid()}"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(indice, f, indent=4, ensure_ascii=False)
+    os.replace(tmp, PATH_INDICE)
+
+
+def _sha256_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def assinatura_arquivo(caminho):
+    """Tamanho + mtime do arquivo local importado (detecta correções salvas com o mesmo nome)."""
+    st = os.stat(caminho)
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def salvar_limite(gdf, cidade, origem, assinatura_fonte=None):
+    """Grava o limite como objeto endereçado por conteúdo e atualiza o índice."""
+    os.makedirs(DIR_OBJETOS, exist_ok=True)
+    gdf = gdf.to_crs(epsg=4326) if gdf.crs is not None else gdf.set_crs(epsg=4326)
+    gdf = gdf[['geometry']].reset_index(drop=True)
+
+    tmp = os.path.join(DIR_OBJETOS, f"novo-{os.getpid()}.parquet")
+    gdf.to_parquet(tmp, index=False)
+    digest = _sha256_arquivo(tmp)
+    destino = os.path.join(DIR_OBJETOS, f"{digest}.parquet")
+    if os.path.exists(destino):
+        os.remove(tmp)
+    else:
+        os.replace(tmp, destino)
+
+    agora = time.time()
+    indice = _ler_indice()
+    indice[chave_cidade(cidade)] = {
+        "cidade": cidade,
+        "objeto": digest,
+        "origem": origem,
+        "criado_em": agora,
+        "acessado_em": agora,
+        "assinatura_fonte": assinatura_fonte
+    }
+    _despejar(indice)
+    _gravar_indice(indice)
+    print(f"💾 Limite de '{cidade}' salvo no cache ({origem}, {digest[:12]})")
+    return gdf
+
+
+def _despejar(indice):
+    """Política de despejo: mantém só os LIMITE_CACHE_MAX_ITENS acessados mais recentemente."""
+    if LIMITE_CACHE_MAX_ITENS > 0 and len(indice) > LIMITE_CACHE_MAX_ITENS:
+        ordem = sorted(indice, key=lambda k: indice[k].get("acessado_em", 0), reverse=True)
+        for chave in ordem[LIMITE_CACHE_MAX_ITENS:]:
+            del indice[chave]
+
+    # Remove objetos que nenhuma cidade referencia mais
+    if os.path.isdir(DIR_OBJETOS):
+        usados = {f"{e['objeto']}.parquet" for e in indice.values()}
+        for nome in os.listdir(DIR_OBJETOS):
+            if nome.endswith(".parquet") and not nome.startswith("novo-") and nome not in usados:
+                os.remove(os.path.join(DIR_OBJETOS, nome))
+
+
+def importar_limite(caminho, cidade=CIDADE_ALVO):
+    """Importa o limite de um arquivo local (GeoJSON, Shapefile, GPKG ou GeoParquet)."""
+    if caminho.lower().endswith(".parquet"):
+        gdf = gpd.read_parquet(caminho)
+    else:
+        gdf = gpd.read_file(caminho)
+    if gdf.empty:
+        raise ValueError(f"Arquivo de limite vazio: {caminho}")
+    return salvar_limite(gdf, cidade, origem=f"arquivo:{os.path.basename(caminho)}",
+                         assinatura_fonte=assinatura_arquivo(caminho))
+
+
+def _ler_cache(cidade):
+    """Retorna (gdf, entrada) do cache ou (None, None)."""
+    indice = _ler_indice()
+    entrada = indice.get(chave_cidade(cidade))
+    if not entrada:
+        return None, None
+    caminho = os.path.join(DIR_OBJETOS, f"{entrada['objeto']}.parquet")
+    if not os.path.exists(caminho):
+        return None, None
+
+    agora = time.time()
+    if agora - entrada.get("acessado_em", 0) > INTERVALO_ACESSO_S:
+        entrada["acessado_em"] = agora
+        _gravar_indice(indice)
+    return gpd.read_parquet(caminho), entrada
+
+
+def _expirado(entrada):
+    if LIMITE_CACHE_DIAS <= 0 or entrada["origem"].startswith("arquivo:"):
+        return False
+    return time.time() - entrada["criado_em"] > LIMITE_CACHE_DIAS * 86400
+
+
+def _baixar_osm(cidade):
+    import osmnx as ox
+    print(f"🌐 Baixando limite de '{cidade}' via OpenStreetMap...")
+    return salvar_limite(ox.geocode_to_gdf(cidade), cidade, origem="osm")
+
+
+def obter_limite_cidade(cidade=CIDADE_ALVO, forcar_atualizacao=False):
+    """
+    Retorna o limite da cidade (GeoDataFrame em EPSG:4326).
+
+    Ordem: arquivo local (ARQUIVO_LIMITE_CIDADE) -> cache válido -> OSM
+    (salvando no cache) -> cache expirado. Em MODO_OFFLINE a rede nunca é usada.
+    """
+    if ARQUIVO_LIMITE_CIDADE and os.path.exists(ARQUIVO_LIMITE_CIDADE):
+        entrada = _ler_indice().get(chave_cidade(cidade))
+        origem = f"arquivo:{os.path.basename(ARQUIVO_LIMITE_CIDADE)}"
+        if (entrada is None or entrada["origem"] != origem or forcar_atualizacao
+                or entrada.get("assinatura_fonte") != assinatura_arquivo(ARQUIVO_LIMITE_CIDADE)):
+            return importar_limite(ARQUIVO_LIMITE_CIDADE, cidade)
+
+    gdf, entrada = _ler_cache(cidade)
+    if gdf is not None and not forcar_atualizacao and not _expirado(entrada):
+        print(f"📦 Limite de '{cidade}' carregado do cache ({entrada['origem']})")
+        return gdf
+
+    if not MODO_OFFLINE:
+        try:
+            return _baixar_osm(cidade)
+        except Exception as e:
+            if gdf is None:
+                raise RuntimeError(f"Limite de '{cidade}' indisponível: sem cache e falha no OSM ({e})")
+            print(f"⚠️ Falha ao atualizar limite via OSM ({e}). Usando cache expirado.")
+            return gdf
+
+    if gdf is None:
+        raise RuntimeError(
+            f"Limite de '{cidade}' não está no cache e MODO_OFFLINE está ativo. "
+            f"Importe com: python src/etl/limites_cidade.py --importar <arquivo>"
+        )
+    print(f"📦 Limite de '{cidade}' carregado do cache (expirado, modo offline)")
+    return gdf
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cidade", default=CIDADE_ALVO)
+    parser.add_argument("--importar", metavar="ARQUIVO", help="Importa o limite de um arquivo local")
+    parser.add_argument("--atualizar", action="store_true", help="Força nova consulta ao OSM")
+    parser.add_argument("--listar", action="store_true", help="Lista as cidades em cache")
+    args = parser.parse_args()
+
+    if args.listar:
+        for chave, e in _ler_indice().items():
+            idade = (time.time() - e["criado_em"]) / 86400
+            print(f"{chave:<50} {e['origem']:<30} {idade:6.1f} dias  {e['objeto'][:12]}")
+    elif args.importar:
+        importar_limite(args.importar, args.cidade)
+    else:
+        obter_limite_cidade(args.cidade, forcar_atualizacao=args.atualizar)
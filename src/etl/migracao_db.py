@@ -7,6 +7,7 @@ import logging
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from config import PATH_GDB
+from etl.snapshot_bdgd import ler_camada
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("MigracaoDB")
@@ -45,7 +46,7 @@ def migrar_gdb_para_sql():
         logger.info(f"🔄 Processando camada: {layer_gdb} -> Tabela: {nome_tabela}")
         
         try:
-            gdf = gpd.read_file(PATH_GDB, layer=layer_gdb, engine='pyogrio')
+            gdf = ler_camada(layer_gdb, path_gdb=PATH_GDB)
             
             if gdf.empty:
                 logger.warning(f"⚠️ Camada {layer_gdb} vazia.")
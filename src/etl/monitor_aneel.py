@@ -1,4 +1,3 @@
-import requests
 import json
 import os
 import sys
@@ -9,6 +8,7 @@ from datetime import datetime
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from config import DIR_DADOS, ANEEL_API_HUB_URL, DISTRIBUIDORA_ALVO
+from cliente_http import sessao_http
 
 def baixar_e_extrair(url, destino):
     print(f"\n ⬇INICIANDO DOWNLOAD...")
@@ -19,7 +19,7 @@ def baixar_e_extrair(url, destino):
     try:
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
         
-        with requests.get(url, stream=True, headers=headers, timeout=120) as r:
+        with sessao_http().get(url, stream=True, headers=headers, timeout=120) as r:
             r.raise_for_status()
             
             ct = r.headers.get('content-type', '').lower()
@@ -80,7 +80,7 @@ def verificar_aneel():
     
     try:
         params = {"q": DISTRIBUIDORA_ALVO, "limit": 30}
-        response = requests.get(ANEEL_API_HUB_URL, params=params, timeout=15)
+        response = sessao_http().get(ANEEL_API_HUB_URL, params=params, timeout=15)
         
         if response.status_code != 200:
             print(f"Erro API: {response.status_code}")
@@ -0,0 +1,294 @@
+"""
+Snapshot colunar das camadas do BDGD.
+
+Converte uma única vez as camadas usadas pelo projeto (SUB, UNTRMT, UCBT_tab,
+UGBT_tab, SSDMT) de `.gdb` para Parquet/GeoParquet, em uma pasta versionada pela
+impressão digital do GDB. Todos os módulos leem as camadas por `ler_camada`, que
+reconstrói o snapshot automaticamente quando o GDB muda.
+"""
+import geopandas as gpd
+import pandas as pd
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PATH_GDB, DIR_SNAPSHOT, CAMADAS_SNAPSHOT, CRS_PROJETADO, INTERVALO_VERIFICACAO_SNAPSHOT
+
+NOME_MANIFESTO = "manifest.json"
+
+# Cache por processo: caminho do GDB -> (impressão digital, pasta, manifesto, verificado_em).
+# A impressão digital percorre o .gdb inteiro: só é recalculada a cada INTERVALO_VERIFICACAO_SNAPSHOT s
+_SNAPSHOTS_ABERTOS = {}
+
+
+def impressao_digital_gdb(path_gdb=PATH_GDB):
+    """
+    Gera uma impressão digital barata do GDB (nome, tamanho e mtime de cada arquivo).
+    Qualquer alteração no .gdb (nova versão da ANEEL, reprocessamento) muda o valor.
+    """
+    h = hashlib.sha1(os.path.basename(os.path.normpath(path_gdb)).encode("utf-8"))
+
+    if os.path.isdir(path_gdb):
+        for raiz, _, arquivos in sorted(os.walk(path_gdb)):
+            for nome in sorted(arquivos):
+                caminho = os.path.join(raiz, nome)
+                st = os.stat(caminho)
+                rel = os.path.relpath(caminho, path_gdb)
+                h.update(f"{rel}|{st.st_size}|{st.st_mtime_ns};".encode("utf-8"))
+    else:
+        st = os.stat(path_gdb)
+        h.update(f"{st.st_size}|{st.st_mtime_ns}".encode("utf-8"))
+
+    return h.hexdigest()[:16]
+
+
+def _sufixo_crs(crs):
+    """'EPSG:31984' / 31984 -> 'EPSG_31984' (usado no nome do arquivo pré-projetado)."""
+    if isinstance(crs, int):
+        crs = f"EPSG:{crs}"
+    return str(crs).upper().replace(":", "_")
+
+
+def _arquivo_camada(dir_snapshot, layer, crs=None):
+    if crs is None:
+        return os.path.join(dir_snapshot, f"{layer}.parquet")
+    return os.path.join(dir_snapshot, f"{layer}@{_sufixo_crs(crs)}.parquet")
+
+
+def _tem_geometria(df):
+    return isinstance(df, gpd.GeoDataFrame) and 'geometry' in df.columns and df.geometry.notna().any()
+
+
+def _salvar_parquet(df, caminho):
+    if _tem_geometria(df):
+        df.to_parquet(caminho, index=False)
+    else:
+        pd.DataFrame(df).drop(columns='geometry', errors='ignore').to_parquet(caminho, index=False)
+
+
+def _salvar_parquet_atomico(df, caminho):
+    """Grava ao lado e renomeia: quem lê o arquivo em paralelo nunca vê um parquet pela metade."""
+    tmp = f"{caminho}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        _salvar_parquet(df, tmp)
+        os.replace(tmp, caminho)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def gerar_snapshot(path_gdb=PATH_GDB, camadas=None, forcar=False):
+    """
+    Converte as camadas do GDB em Parquet/GeoParquet.
+    Retorna o caminho da pasta do snapshot (dados/snapshot/<impressao_digital>).
+    """
+    if not os.path.exists(path_gdb):
+        raise FileNotFoundError(f"GDB não encontrado em: {path_gdb}")
+
+    camadas = camadas or CAMADAS_SNAPSHOT
+    digital = impressao_digital_gdb(path_gdb)
+    dir_final = os.path.join(DIR_SNAPSHOT, digital)
+
+    if not forcar and os.path.exists(os.path.join(dir_final, NOME_MANIFESTO)):
+        return dir_final
+
+    print(f"📦 Gerando snapshot colunar do GDB ({os.path.basename(path_gdb)}) -> {digital}")
+    inicio = time.time()
+
+    dir_tmp = f"{dir_final}.tmp-{os.getpid()}"
+    shutil.rmtree(dir_tmp, ignore_errors=True)
+    os.makedirs(dir_tmp, exist_ok=True)
+
+    disponiveis = gpd.list_layers(path_gdb)['name'].tolist()
+    manifesto = {
+        "gdb": os.path.basename(os.path.normpath(path_gdb)),
+        "impressao_digital": digital,
+        "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "camadas": {}
+    }
+
+    for layer in camadas:
+        if layer not in disponiveis:
+            continue
+        try:
+            t0 = time.time()
+            df = gpd.read_file(path_gdb, layer=layer, engine='pyogrio', use_arrow=True)
+            geo = _tem_geometria(df)
+            _salvar_parquet(df, _arquivo_camada(dir_tmp, layer))
+
+            projecoes = []
+            if geo and df.crs is not None:
+                _salvar_parquet(df.to_crs(CRS_PROJETADO), _arquivo_camada(dir_tmp, layer, CRS_PROJETADO))
+                projecoes.append(_sufixo_crs(CRS_PROJETADO))
+
+            manifesto["camadas"][layer] = {
+                "registros": int(len(df)),
+                "colunas": [c for c in df.columns if c != 'geometry'],
+                "geometria": geo,
+                "crs": df.crs.to_string() if geo and df.crs is not None else None,
+                "projecoes": projecoes
+            }
+            print(f"   ✅ {layer}: {len(df)} registros ({time.time() - t0:.1f}s)")
+        except Exception as e:
+            print(f"   ⚠️ Camada {layer} não convertida ({e}). Será lida direto do GDB.")
+
+    with open(os.path.join(dir_tmp, NOME_MANIFESTO), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=4, ensure_ascii=False)
+
+    _publicar(dir_tmp, dir_final, substituir=forcar)
+
+    _limpar_snapshots_antigos(digital)
+    print(f"✅ Snapshot pronto em {time.time() - inicio:.1f}s: {dir_final}")
+    return dir_final
+
+
+def _publicar(dir_tmp, dir_final, substituir=False):
+    """
+    Troca a pasta temporária pela publicada sem apagar um snapshot que outros
+    processos podem estar lendo: se outro processo já publicou esta versão, a
+    dele é mantida; com `substituir`, a antiga é renomeada de lado e só então removida.
+    """
+    if os.path.exists(os.path.join(dir_final, NOME_MANIFESTO)) and not substituir:
+        shutil.rmtree(dir_tmp, ignore_errors=True)
+        return
+    antigo = None
+    if os.path.exists(dir_final):
+        antigo = f"{dir_final}.antigo-{os.getpid()}"
+        os.replace(dir_final, antigo)
+    try:
+        os.replace(dir_tmp, dir_final)
+    except OSError:
+        # Outro processo publicou o mesmo snapshot entre as duas trocas
+        shutil.rmtree(dir_tmp, ignore_errors=True)
+    if antigo:
+        shutil.rmtree(antigo, ignore_errors=True)
+
+
+def _limpar_snapshots_antigos(digital_atual):
+    """Remove versões de snapshot de GDBs anteriores."""
+    if not os.path.isdir(DIR_SNAPSHOT):
+        return
+    for nome in os.listdir(DIR_SNAPSHOT):
+        if nome != digital_atual and '.tmp-' not in nome and '.antigo-' not in nome:
+            shutil.rmtree(os.path.join(DIR_SNAPSHOT, nome), ignore_errors=True)
+
+
+def abrir_snapshot(path_gdb=PATH_GDB):
+    """
+    Garante um snapshot atualizado para o GDB e retorna (pasta, manifesto).
+    Reconstrói automaticamente se o GDB mudou desde a última conversão.
+    """
+    aberto = _SNAPSHOTS_ABERTOS.get(path_gdb)
+    agora = time.monotonic()
+    if aberto and agora - aberto[3] < INTERVALO_VERIFICACAO_SNAPSHOT:
+        return aberto[1], aberto[2]
+
+    digital = impressao_digital_gdb(path_gdb)
+    if aberto and aberto[0] == digital:
+        _SNAPSHOTS_ABERTOS[path_gdb] = (digital, aberto[1], aberto[2], agora)
+        return aberto[1], aberto[2]
+
+    dir_snapshot = gerar_snapshot(path_gdb)
+    with open(os.path.join(dir_snapshot, NOME_MANIFESTO), 'r', encoding='utf-8') as f:
+        manifesto = json.load(f)
+
+    _SNAPSHOTS_ABERTOS[path_gdb] = (digital, dir_snapshot, manifesto, agora)
+    return dir_snapshot, manifesto
+
+
+def listar_camadas(path_gdb=PATH_GDB):
+    """Nomes das camadas disponíveis (snapshot + GDB)."""
+    try:
+        _, manifesto = abrir_snapshot(path_gdb)
+        camadas = list(manifesto["camadas"].keys())
+    except Exception:
+        camadas = []
+    extras = [l for l in gpd.list_layers(path_gdb)['name'].tolist() if l not in camadas]
+    return camadas + extras
+
+
+def listar_colunas(layer, path_gdb=PATH_GDB):
+    """Colunas (sem geometria) de uma camada, sem ler os dados."""
+    try:
+        _, manifesto = abrir_snapshot(path_gdb)
+        if layer in manifesto["camadas"]:
+            return list(manifesto["camadas"][layer]["colunas"])
+    except Exception:
+        pass
+    sample = gpd.read_file(path_gdb, layer=layer, engine='pyogrio', rows=1)
+    return [c for c in sample.columns if c != 'geometry']
+
+
+def ler_camada(layer, columns=None, crs=None, ignore_geometry=False, path_gdb=PATH_GDB):
+    """
+    Lê uma camada do BDGD a partir do snapshot colunar.
+
+    - columns: projeção de colunas (colunas inexistentes são ignoradas).
+    - crs: retorna a geometria já projetada (usa o arquivo pré-projetado quando existir).
+    - ignore_geometry: retorna DataFrame sem a coluna geometry.
+
+    Se a camada não estiver no snapshot, cai para a leitura direta do GDB (pyogrio).
+    Lança ValueError se a camada não existir, como o pyogrio.
+    """
+    try:
+        return _ler_camada_snapshot(layer, columns, crs, ignore_geometry, path_gdb)
+    except FileNotFoundError:
+        if not os.path.exists(path_gdb):
+            raise
+        # Snapshot substituído (--forcar) desde a última abertura: reabre uma vez
+        _SNAPSHOTS_ABERTOS.pop(path_gdb, None)
+        return _ler_camada_snapshot(layer, columns, crs, ignore_geometry, path_gdb)
+
+
+def _ler_camada_snapshot(layer, columns, crs, ignore_geometry, path_gdb):
+    try:
+        dir_snapshot, manifesto = abrir_snapshot(path_gdb)
+        info = manifesto["camadas"].get(layer)
+    except FileNotFoundError:
+        raise
+    except Exception as e:
+        print(f"⚠️ Snapshot indisponível ({e}). Lendo {layer} direto do GDB.")
+        info = None
+
+    if info is None:
+        return _ler_camada_gdb(layer, columns, crs, ignore_geometry, path_gdb)
+
+    cols = None
+    if columns is not None:
+        cols = [c for c in columns if c in info["colunas"]]
+
+    if not info["geometria"] or ignore_geometry:
+        return pd.read_parquet(_arquivo_camada(dir_snapshot, layer), columns=cols if cols is not None else info["colunas"])
+
+    cols_geo = None if cols is None else cols + ['geometry']
+
+    if crs is None:
+        return gpd.read_parquet(_arquivo_camada(dir_snapshot, layer), columns=cols_geo)
+
+    arquivo_proj = _arquivo_camada(dir_snapshot, layer, crs)
+    if not os.path.exists(arquivo_proj):
+        # Projeção ainda não materializada: gera uma vez e reaproveita nas próximas leituras
+        gdf = gpd.read_parquet(_arquivo_camada(dir_snapshot, layer)).to_crs(crs)
+        _salvar_parquet_atomico(gdf, arquivo_proj)
+    return gpd.read_parquet(arquivo_proj, columns=cols_geo)
+
+
+def _ler_camada_gdb(layer, columns, crs, ignore_geometry, path_gdb):
+    gdf = gpd.read_file(path_gdb, layer=layer, engine='pyogrio', columns=columns, ignore_geometry=ignore_geometry)
+    if crs is not None and isinstance(gdf, gpd.GeoDataFrame) and gdf.crs is not None:
+        gdf = gdf.to_crs(crs)
+    return gdf
+
+
+if __name__ == "__main__":
+    forcar = "--forcar" in sys.argv
+    if not os.path.exists(PATH_GDB):
+        print(f"❌ GDB não encontrado em: {PATH_GDB}")
+        sys.exit(1)
+    gerar_snapshot(PATH_GDB, forcar=forcar)
@@ -0,0 +1,183 @@
+"""
+Formatos de saída em fluxo para os endpoints de volume (negociados pelo Accept):
+
+- application/x-ndjson: um registro JSON por linha, serializado sob demanda;
+- application/vnd.apache.arrow.stream: Arrow IPC em lotes de LOTE_ARROW
+  linhas, com colunas achatadas ("metricas_rede.total_clientes") e a geometria
+  em WKB (extensão geoarrow.wkb), lido direto em pandas/geopandas sem parse
+  de JSON.
+
+O corpo nunca é montado inteiro em memória: cada lote é gerado, enviado e
+descartado.
+"""
+import json
+
+import pyarrow as pa
+import shapely
+from fastapi.responses import StreamingResponse
+from shapely.geometry import shape
+
+from cache_respostas import serializar_json
+
+MIDIA_JSON = "application/json"
+MIDIA_NDJSON = "application/x-ndjson"
+MIDIA_ARROW = "application/vnd.apache.arrow.stream"
+FORMATOS = {MIDIA_JSON: "json", MIDIA_NDJSON: "ndjson", MIDIA_ARROW: "arrow"}
+
+LOTE_NDJSON = 500
+LOTE_ARROW = 1000
+
+
+def escolher_formato(request):
+    """'json' | 'ndjson' | 'arrow' conforme o Accept (respeitando q=); JSON por padrão."""
+    melhor, melhor_q = "json", 0.0
+    for parte in request.headers.get("accept", "").split(","):
+        midia, _, params = parte.strip().partition(";")
+        formato = FORMATOS.get(midia.strip().lower())
+        if formato is None:
+            continue
+        q = 1.0
+        for p in params.split(";"):
+            nome, _, valor = p.strip().partition("=")
+            if nome == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        if q > melhor_q:
+            melhor, melhor_q = formato, q
+    return melhor
+
+
+# --- NDJSON ---
+
+def resposta_ndjson(registros, headers=None):
+    def gerar():
+        bloco = []
+        for registro in registros:
+            bloco.append(serializar_json(registro))
+            if len(bloco) >= LOTE_NDJSON:
+                yield b"\n".join(bloco) + b"\n"
+                bloco = []
+        if bloco:
+            yield b"\n".join(bloco) + b"\n"
+    return StreamingResponse(gerar(), media_type=MIDIA_NDJSON, headers=headers)
+
+
+# --- Arrow IPC ---
+
+def achatar(registro, prefixo="", saida=None):
+    """{'a': {'b': 1}} -> {'a.b': 1}; a geometria GeoJSON fica inteira em 'geometry'."""
+    saida = {} if saida is None else saida
+    for chave, valor in registro.items():
+        nome = f"{prefixo}{chave}"
+        if isinstance(valor, dict) and nome != "geometry":
+            achatar(valor, f"{nome}.", saida)
+        else:
+            saida[nome] = valor
+    return saida
+
+
+def _tipo_arrow(tipos):
+    if not tipos:
+        return pa.null()
+    if tipos == {bool}:
+        return pa.bool_()
+    if tipos == {int}:
+        return pa.int64()
+    if tipos <= {int, float}:
+        return pa.float64()
+    return pa.string()
+
+
+def _campo_geometria():
+    return pa.field("geometry", pa.binary(), metadata={b"ARROW:extension:name": b"geoarrow.wkb"})
+
+
+def esquema_arrow(registros):
+    """
+    Esquema único para todos os lotes (registros sem uma coluna recebem nulo).
+    Guarda só os tipos vistos por coluna: `registros` pode ser uma sequência sob demanda.
+    """
+    tipos = {}
+    for registro in registros:
+        for chave, valor in achatar(registro).items():
+            vistos = tipos.setdefault(chave, set())
+            if valor is not None:
+                vistos.add(type(valor))
+    campos = []
+    for chave, vistos in tipos.items():
+        if chave == "geometry":
+            campos.append(_campo_geometria())
+        else:
+            campos.append(pa.field(chave, _tipo_arrow(vistos)))
+    return pa.schema(campos)
+
+
+def _lote_arrow(linhas, esquema):
+    colunas = []
+    for campo in esquema:
+        vals = [linha.get(campo.name) for linha in linhas]
+        if campo.name == "geometry":
+            geoms = [shape(g) if g else None for g in vals]
+            colunas.append(pa.array(shapely.to_wkb(geoms), type=pa.binary()) if geoms else pa.array([], pa.binary()))
+        elif pa.types.is_string(campo.type):
+            colunas.append(pa.array([v if v is None or isinstance(v, str) else json.dumps(v) for v in vals],
+                                    type=campo.type))
+        else:
+            colunas.append(pa.array(vals, type=campo.type))
+    return pa.RecordBatch.from_arrays(colunas, schema=esquema)
+
+
+class _Buffer:
+    """Destino do escritor IPC: acumula os bytes escritos até serem drenados."""
+
+    closed = False
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drenar(self):
+        dados = b"".join(self.partes)
+        self.partes = []
+        return dados
+
+
+def _fluxo_arrow(esquema, lotes):
+    """Gera os bytes do stream IPC lote a lote (esquema, lotes..., fim)."""
+    buffer = _Buffer()
+    with pa.ipc.new_stream(buffer, esquema) as escritor:
+        yield buffer.drenar()
+        for lote in lotes:
+            escritor.write_batch(lote)
+            yield buffer.drenar()
+    yield buffer.drenar()
+
+
+def resposta_arrow_registros(registros, headers=None):
+    """`registros`: lista ou sequência sob demanda (len + índice), percorrida duas vezes (esquema, lotes)."""
+    esquema = esquema_arrow(registros)
+
+    def lotes():
+        for i in range(0, len(registros), LOTE_ARROW):
+            fim = min(i + LOTE_ARROW, len(registros))
+            yield _lote_arrow([achatar(registros[j]) for j in range(i, fim)], esquema)
+
+    return StreamingResponse(_fluxo_arrow(esquema, lotes()), media_type=MIDIA_ARROW, headers=headers)
+
+
+def resposta_arrow_tabela(tabela, headers=None):
+    return StreamingResponse(
+        _fluxo_arrow(tabela.schema, tabela.to_batches(max_chunksize=LOTE_ARROW)),
+        media_type=MIDIA_ARROW, headers=headers
+    )
@@ -0,0 +1,120 @@
+"""
+Índice de busca de subestações, montado junto com cada versão dos dados.
+
+Ordem de resolução (determinística):
+1. ID técnico exato (também extraído de rótulos "NOME (ID: 123)");
+2. nome normalizado exato (sem acento, sem caixa);
+3. prefixo do nome (o nome mais curto, depois ordem alfabética);
+4. similaridade por trigramas (coeficiente de Dice), acima de um limiar.
+"""
+import bisect
+import re
+
+from utils import normalizar_nome
+
+LIMIAR_TRIGRAMAS = 0.45
+_RE_ROTULO_ID = re.compile(r"\(ID:\s*([^)]+)\)")
+
+
+def nome_base(rotulo):
+    """'NOME (ID: 123)' -> 'NOME'"""
+    return str(rotulo).split(' (ID')[0]
+
+
+def trigramas(nome):
+    texto = f"  {nome} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceSubestacoes:
+
+    def __init__(self, registros):
+        self.por_id = {}
+        self.por_nome = {}
+        self.nomes = []
+        self._trigramas = {}
+        self._trigramas_nome = []
+
+        for pos, item in enumerate(registros):
+            id_tec = item.get('id_tecnico')
+            if id_tec is None:
+                m = _RE_ROTULO_ID.search(str(item.get('subestacao', '')))
+                id_tec = m.group(1) if m else None
+            if id_tec is not None:
+                self.por_id.setdefault(str(id_tec).strip(), pos)
+
+            nome = normalizar_nome(nome_base(item.get('subestacao', '')))
+            self.nomes.append(nome)
+            if nome:
+                self.por_nome.setdefault(nome, pos)
+
+            tri = trigramas(nome) if nome else set()
+            self._trigramas_nome.append(tri)
+            for t in tri:
+                self._trigramas.setdefault(t, []).append(pos)
+
+        # Lista ordenada (nome, posição) para busca por prefixo com bisect
+        self._ordenados = sorted((n, p) for p, n in enumerate(self.nomes) if n)
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def por_id_tecnico(self, id_tecnico):
+        return self.por_id.get(str(id_tecnico).strip())
+
+    def _por_prefixo(self, nome):
+        i = bisect.bisect_left(self._ordenados, (nome,))
+        candidatos = []
+        while i < len(self._ordenados) and self._ordenados[i][0].startswith(nome):
+            candidatos.append(self._ordenados[i])
+            i += 1
+        if not candidatos:
+            return None
+        return min(candidatos, key=lambda c: (len(c[0]), c[0], c[1]))[1]
+
+    def ranking_trigramas(self, nome, limite=5):
+        """[(score, posição)] dos nomes mais parecidos, em ordem determinística."""
+        tri = trigramas(nome)
+        comuns = {}
+        for t in tri:
+            for pos in self._trigramas.get(t, ()):
+                comuns[pos] = comuns.get(pos, 0) + 1
+        pontuados = [
+            (2.0 * n / (len(tri) + len(self._trigramas_nome[pos])), pos)
+            for pos, n in comuns.items()
+        ]
+        pontuados.sort(key=lambda x: (-x[0], len(self.nomes[x[1]]), self.nomes[x[1]], x[1]))
+        return pontuados[:limite]
+
+    def buscar(self, consulta):
+        """Retorna (posição, modo) ou (None, None)."""
+        consulta = str(consulta).strip()
+        if not consulta:
+            return None, None
+
+        pos = self.por_id_tecnico(consulta)
+        if pos is not None:
+            return pos, "id"
+
+        m = _RE_ROTULO_ID.search(consulta)
+        if m:
+            pos = self.por_id_tecnico(m.group(1))
+            if pos is not None:
+                return pos, "id"
+
+        nome = normalizar_nome(nome_base(consulta))
+        if not nome:
+            return None, None
+
+        pos = self.por_nome.get(nome)
+        if pos is not None:
+            return pos, "nome"
+
+        pos = self._por_prefixo(nome)
+        if pos is not None:
+            return pos, "prefixo"
+
+        melhores = self.ranking_trigramas(nome, limite=1)
+        if melhores and melhores[0][0] >= LIMIAR_TRIGRAMAS:
+            return melhores[0][1], "aproximado"
+        return None, None
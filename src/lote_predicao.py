@@ -0,0 +1,97 @@
+"""
+Micro-lotes de predição ("dynamic batching").
+
+Cada /predict/duck-curve avalia só 24 linhas; chamadas separadas ao modelo
+gastam quase todo o tempo em overhead fixo (validação, threads por árvore).
+Aqui as requisições concorrentes entram numa fila; um coletor por processo
+junta o que chegar em até LOTE_MAX_ESPERA_MS (ou LOTE_MAX_ITENS requisições),
+avalia tudo numa única matriz no threadpool e devolve a cada requisição as
+suas linhas. Enquanto um lote está no modelo, o próximo vai enchendo: com mais
+concorrência os lotes crescem e o custo por requisição cai.
+
+Métricas: tamanho dos lotes e espera de cada item na fila (registrar_lote).
+
+Escopo: um processo / event loop (cada worker tem o seu).
+"""
+import asyncio
+import time
+
+import pandas as pd
+from fastapi.concurrency import run_in_threadpool
+
+from config import LOTE_MAX_ITENS, LOTE_MAX_ESPERA_MS
+from metricas import medir_fase, registrar_lote
+
+
+class LotePredicao:
+
+    def __init__(self, preditor, nome="modelo", max_itens=LOTE_MAX_ITENS, max_espera_ms=LOTE_MAX_ESPERA_MS):
+        self.preditor = preditor
+        self.nome = nome
+        self.max_itens = max(1, max_itens)
+        self.max_espera = max(0.0, max_espera_ms) / 1000
+        self._fila = None
+        self._cheio = None
+        self._coletor = None
+        self.estatisticas = {"lotes": 0, "itens": 0, "maior_lote": 0}
+
+    def _iniciar(self):
+        # Criados no event loop do worker (o objeto é montado na importação, antes do loop/fork)
+        if self._fila is None:
+            self._fila = asyncio.Queue()
+            self._cheio = asyncio.Event()
+        if self._coletor is None or self._coletor.done():
+            self._coletor = asyncio.get_running_loop().create_task(self._coletar())
+
+    async def prever(self, features):
+        """Predição das linhas de `features` (DataFrame), avaliadas junto com as requisições concorrentes."""
+        self._iniciar()
+        futuro = asyncio.get_running_loop().create_future()
+        self._fila.put_nowait((features, futuro, time.perf_counter()))
+        if self._fila.qsize() >= self.max_itens - 1:
+            self._cheio.set()
+        return await futuro
+
+    async def _coletar(self):
+        while True:
+            lote = [await self._fila.get()]
+            self._cheio.clear()
+            if self.max_itens > 1 and self.max_espera > 0 and self._fila.qsize() < self.max_itens - 1:
+                try:
+                    await asyncio.wait_for(self._cheio.wait(), self.max_espera)
+                except asyncio.TimeoutError:
+                    pass
+            while len(lote) < self.max_itens and not self._fila.empty():
+                lote.append(self._fila.get_nowait())
+            try:
+                await self._avaliar(lote)
+            except Exception as e:
+                print(f"❌ Lote de predição ({self.nome}) falhou: {e}")
+
+    async def _avaliar(self, lote):
+        inicio = time.perf_counter()
+        registrar_lote(self.nome, len(lote), [inicio - entrou for _, _, entrou in lote])
+        # Requisições canceladas (cliente desconectou) saem do lote
+        vivos = [(features, futuro) for features, futuro, _ in lote if not futuro.done()]
+        if not vivos:
+            return
+
+        try:
+            X = vivos[0][0] if len(vivos) == 1 else pd.concat([f for f, _ in vivos], ignore_index=True)
+            with medir_fase("predicao_modelo"):
+                y = await run_in_threadpool(self.preditor.predict, X)
+        except Exception as e:
+            for _, futuro in vivos:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+
+        linha = 0
+        for features, futuro in vivos:
+            if not futuro.done():
+                futuro.set_result(y[linha:linha + len(features)])
+            linha += len(features)
+
+        self.estatisticas["lotes"] += 1
+        self.estatisticas["itens"] += len(vivos)
+        self.estatisticas["maior_lote"] = max(self.estatisticas["maior_lote"], len(vivos))
@@ -0,0 +1,199 @@
+"""
+Métricas no formato Prometheus para as duas APIs (prometheus_client opcional).
+
+- Middleware ASGI: latência por rota (template, ex: /simulacao/{nome_subestacao}),
+  contagem por status e requisições em andamento.
+- `medir_fase(...)`: histograma das fases internas (carga_dados, leitura_gdb,
+  predicao_modelo, clima), como decorator ou context manager.
+- `contar_cache(...)`: acertos/faltas dos caches (clima, respostas, resultados).
+- `registrar_lote(...)`: tamanho dos lotes de predição e espera de cada item na fila.
+- GET /metrics em cada app.
+
+Com vários workers (uvicorn --workers 4), defina PROMETHEUS_MULTIPROC_DIR (o
+run_all faz isso, uma pasta limpa por serviço): cada processo grava suas
+métricas em arquivos e o /metrics de qualquer worker agrega todos.
+Sem prometheus_client instalado tudo vira no-op e o /metrics responde 503.
+"""
+import functools
+import inspect
+import os
+import time
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, generate_latest, multiprocess
+except ImportError:
+    prometheus_client = None
+
+MULTIPROCESSO = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_FASE = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+BUCKETS_LOTE = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+BUCKETS_ESPERA_LOTE = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+if prometheus_client is not None:
+    REQUISICOES = Counter(
+        "gridscope_http_requisicoes_total", "Requisições HTTP por rota e status",
+        ["servico", "metodo", "rota", "status"]
+    )
+    LATENCIA = Histogram(
+        "gridscope_http_latencia_segundos", "Latência das requisições HTTP por rota",
+        ["servico", "metodo", "rota"], buckets=BUCKETS_HTTP
+    )
+    EM_ANDAMENTO = Gauge(
+        "gridscope_http_em_andamento", "Requisições HTTP em andamento",
+        ["servico"], multiprocess_mode="livesum"
+    )
+    FASES = Histogram(
+        "gridscope_fase_segundos", "Duração das fases internas (carga, GDB, modelo, clima)",
+        ["fase"], buckets=BUCKETS_FASE
+    )
+    CACHE = Counter(
+        "gridscope_cache_total", "Consultas aos caches internos",
+        ["cache", "resultado"]
+    )
+    LOTE_TAMANHO = Histogram(
+        "gridscope_lote_itens", "Requisições avaliadas juntas por lote de predição",
+        ["lote"], buckets=BUCKETS_LOTE
+    )
+    LOTE_ESPERA = Histogram(
+        "gridscope_lote_espera_segundos", "Tempo de cada requisição na fila até o lote ser avaliado",
+        ["lote"], buckets=BUCKETS_ESPERA_LOTE
+    )
+
+
+class medir_fase:
+    """Uso: `with medir_fase("clima"):` ou `@medir_fase("carga_dados")` (funções sync e async)."""
+
+    def __init__(self, fase):
+        self.fase = fase
+        self._inicio = None
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if prometheus_client is not None:
+            FASES.labels(self.fase).observe(time.perf_counter() - self._inicio)
+        return False
+
+    def __call__(self, funcao):
+        if prometheus_client is None:
+            return funcao
+        fase = self.fase
+        if inspect.iscoroutinefunction(funcao):
+            @functools.wraps(funcao)
+            async def envoltorio_async(*args, **kwargs):
+                with medir_fase(fase):
+                    return await funcao(*args, **kwargs)
+            return envoltorio_async
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            with medir_fase(fase):
+                return funcao(*args, **kwargs)
+        return envoltorio
+
+
+def contar_cache(cache, resultado, quantidade=1):
+    """resultado: 'acerto' | 'falta' (ou outro estado, ex: 'coalescida')."""
+    if prometheus_client is not None and quantidade:
+        CACHE.labels(cache, resultado).inc(quantidade)
+
+
+def registrar_lote(lote, itens, esperas):
+    """Tamanho de um lote de predição e a espera na fila de cada item dele."""
+    if prometheus_client is not None:
+        LOTE_TAMANHO.labels(lote).observe(itens)
+        for espera in esperas:
+            LOTE_ESPERA.labels(lote).observe(espera)
+
+
+class MiddlewareMetricas:
+    """ASGI puro (não interfere em StreamingResponse) registrando latência/status por rota."""
+
+    def __init__(self, app, servico):
+        self.app = app
+        self.servico = servico
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"codigo": 500}
+
+        async def send_com_status(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status["codigo"] = mensagem["status"]
+            await send(mensagem)
+
+        EM_ANDAMENTO.labels(self.servico).inc()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_com_status)
+        finally:
+            duracao = time.perf_counter() - inicio
+            EM_ANDAMENTO.labels(self.servico).dec()
+            rota = getattr(scope.get("route"), "path", "desconhecida")
+            metodo = scope["method"]
+            LATENCIA.labels(self.servico, metodo, rota).observe(duracao)
+            REQUISICOES.labels(self.servico, metodo, rota, str(status["codigo"])).inc()
+
+
+def _expor():
+    if MULTIPROCESSO:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = prometheus_client.REGISTRY
+    return generate_latest(registro)
+
+
+def instalar_metricas(app, servico):
+    """Adiciona o middleware e o GET /metrics ao app FastAPI."""
+    from fastapi import Response
+
+    if prometheus_client is None:
+        print("ℹ️ prometheus_client não instalado: métricas desativadas.")
+
+        @app.get("/metrics", include_in_schema=False)
+        def metricas_indisponiveis():
+            return Response("prometheus_client não instalado\n", status_code=503, media_type="text/plain")
+        return
+
+    app.add_middleware(MiddlewareMetricas, servico=servico)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metricas():
+        return Response(_expor(), media_type=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def memoria_processo(pid="self"):
+    """
+    RSS do processo em MB e, quando o kernel expõe smaps_rollup, quanto dele é
+    compartilhado com outros processos (ex: páginas herdadas do pai no fork).
+    """
+    memoria = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            campos = {}
+            for linha in f:
+                partes = linha.split()
+                if len(partes) >= 2 and partes[0].endswith(":") and partes[1].isdigit():
+                    campos[partes[0][:-1]] = int(partes[1])
+        memoria["rss_mb"] = round(campos.get("Rss", 0) / 1024, 1)
+        memoria["pss_mb"] = round(campos.get("Pss", 0) / 1024, 1)
+        memoria["compartilhada_mb"] = round((campos.get("Shared_Clean", 0) + campos.get("Shared_Dirty", 0)) / 1024, 1)
+        memoria["privada_mb"] = round((campos.get("Private_Clean", 0) + campos.get("Private_Dirty", 0)) / 1024, 1)
+        return memoria
+    except OSError:
+        pass
+    try:
+        import resource
+        memoria["rss_max_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:
+        pass
+    return memoria
@@ -0,0 +1,108 @@
+"""
+Vínculo de transformadores (UNTRMT) aos territórios das subestações.
+
+Uma célula de Voronoi é exatamente o conjunto de pontos mais próximos de um sítio,
+então o território de um transformador é a subestação mais próxima. Usamos um
+cKDTree sobre os mesmos pontos que geraram o Voronoi, recortando pelo limite da
+cidade. O sjoin com os polígonos fica apenas como modo de validação.
+"""
+import geopandas as gpd
+import pandas as pd
+import numpy as np
+import shapely
+from scipy.spatial import cKDTree
+
+COLS_REFERENCIA = ['COD_ID', 'NOME_SUBESTACAO', 'ID_SUBESTACAO']
+
+
+def _coordenadas(gdf):
+    geoms = gdf.geometry
+    if not (geoms.geom_type == 'Point').all():
+        geoms = geoms.representative_point()
+    return shapely.get_coordinates(geoms.values)
+
+
+def atribuir_kdtree(gdf_trafos, gdf_pontos, limite=None):
+    """
+    Vincula cada transformador à subestação mais próxima (1 linha por transformador).
+    `gdf_pontos` precisa ter COD_ID e NOM, no mesmo CRS projetado dos transformadores.
+    Transformadores fora do `limite` (geometria da cidade) são descartados.
+    """
+    trafos = gdf_trafos[gdf_trafos.geometry.notna() & ~gdf_trafos.geometry.is_empty]
+    xy = _coordenadas(trafos)
+
+    if limite is not None:
+        shapely.prepare(limite)
+        dentro = shapely.intersects_xy(limite, xy[:, 0], xy[:, 1])
+        trafos = trafos[dentro]
+        xy = xy[dentro]
+
+    arvore = cKDTree(_coordenadas(gdf_pontos))
+    _, idx = arvore.query(xy, k=1)
+
+    return pd.DataFrame({
+        'COD_ID': trafos['COD_ID'].astype(str).values,
+        'NOME_SUBESTACAO': gdf_pontos['NOM'].values[idx],
+        'ID_SUBESTACAO': gdf_pontos['COD_ID'].values[idx]
+    })
+
+
+def atribuir_sjoin(gdf_trafos, gdf_voronoi):
+    """Vínculo original por interseção com os polígonos (pode duplicar transformadores na fronteira)."""
+    trafos_join = gpd.sjoin(gdf_trafos, gdf_voronoi[['NOM', 'COD_ID', 'geometry']], predicate="intersects")
+
+    # O sjoin cria sufixos _left e _right se houver colunas iguais (COD_ID)
+    trafos_join = trafos_join.rename(columns={
+        'COD_ID_right': 'ID_SUBESTACAO',
+        'COD_ID_left': 'COD_ID',
+        'NOM': 'NOME_SUBESTACAO',
+        'NOM_right': 'NOME_SUBESTACAO'
+    })
+
+    faltando = [c for c in COLS_REFERENCIA if c not in trafos_join.columns]
+    if faltando:
+        raise KeyError(f"Colunas {faltando} não encontradas após o join. Disponíveis: {trafos_join.columns.tolist()}")
+
+    ref = trafos_join[COLS_REFERENCIA].copy()
+    ref['COD_ID'] = ref['COD_ID'].astype(str)
+    return ref.reset_index(drop=True)
+
+
+def comparar_atribuicoes(ref_kdtree, ref_sjoin):
+    """Estatísticas de divergência entre KD-tree e sjoin, por transformador."""
+    ids_sjoin = ref_sjoin.groupby('COD_ID')['ID_SUBESTACAO'].agg(lambda s: set(s.astype(str)))
+    kd = ref_kdtree.set_index('COD_ID')['ID_SUBESTACAO'].astype(str)
+
+    comuns = kd.index.intersection(ids_sjoin.index)
+    divergentes = sum(1 for cod in comuns if kd[cod] not in ids_sjoin[cod])
+
+    return {
+        "trafos_kdtree": int(len(kd)),
+        "trafos_sjoin": int(len(ids_sjoin)),
+        "duplicados_sjoin": int((ids_sjoin.map(len) > 1).sum()),
+        "so_kdtree": int(len(kd.index.difference(ids_sjoin.index))),
+        "so_sjoin": int(len(ids_sjoin.index.difference(kd.index))),
+        "divergentes": int(divergentes),
+        "pct_divergentes": round(100.0 * divergentes / len(comuns), 4) if len(comuns) else 0.0
+    }
+
+
+def atribuir_transformadores(gdf_trafos, gdf_voronoi, gdf_pontos=None, modo="kdtree"):
+    """
+    Retorna DataFrame [COD_ID, NOME_SUBESTACAO, ID_SUBESTACAO].
+    modo: "kdtree" (padrão), "sjoin" (legado) ou "validar" (KD-tree + relatório de divergência).
+    Sem os pontos das subestações, cai para o sjoin.
+    """
+    if modo == "sjoin" or gdf_pontos is None or gdf_pontos.empty:
+        if modo != "sjoin":
+            print("   ⚠️ Pontos das subestações indisponíveis. Usando sjoin com os polígonos.")
+        return atribuir_sjoin(gdf_trafos, gdf_voronoi)
+
+    limite = gdf_voronoi.geometry.union_all()
+    ref = atribuir_kdtree(gdf_trafos, gdf_pontos, limite)
+
+    if modo == "validar":
+        stats = comparar_atribuicoes(ref, atribuir_sjoin(gdf_trafos, gdf_voronoi))
+        print(f"   🔎 Validação KD-tree x sjoin: {stats}")
+
+    return ref
@@ -0,0 +1,67 @@
+"""
+Motor de territórios baseado em shapely.voronoi_polygons (GEOS).
+
+Gera as células com um envelope explícito, recorta contra o limite da cidade
+com geometria preparada (só as células que cruzam a fronteira passam por
+interseção) e devolve as células na mesma ordem dos pontos de entrada, de modo
+que os atributos das subestações são anexados sem sjoin.
+"""
+import numpy as np
+import shapely
+from shapely.errors import UnsupportedGEOSVersionError
+
+
+def _envelope(coords, limite, margem):
+    minx, miny = coords.min(axis=0)
+    maxx, maxy = coords.max(axis=0)
+    if limite is not None:
+        lminx, lminy, lmaxx, lmaxy = limite.bounds
+        minx, miny = min(minx, lminx), min(miny, lminy)
+        maxx, maxy = max(maxx, lmaxx), max(maxy, lmaxy)
+    if margem is None:
+        margem = max(maxx - minx, maxy - miny) * 0.1 or 1.0
+    return shapely.box(minx - margem, miny - margem, maxx + margem, maxy + margem)
+
+
+def _celulas_ordenadas(pontos, envelope):
+    """Células de Voronoi na ordem dos pontos (GEOS >= 3.12 ordena nativamente)."""
+    multiponto = shapely.multipoints(pontos)
+    try:
+        return shapely.get_parts(shapely.voronoi_polygons(multiponto, extend_to=envelope, ordered=True))
+    except (TypeError, UnsupportedGEOSVersionError):
+        pass
+
+    # GEOS antigo: reordena localizando, para cada ponto, a célula que o contém
+    celulas = shapely.get_parts(shapely.voronoi_polygons(multiponto, extend_to=envelope))
+    idx_ponto, idx_celula = shapely.STRtree(celulas).query(pontos, predicate="intersects")
+    ordem = np.full(len(pontos), -1)
+    ordem[idx_ponto[::-1]] = idx_celula[::-1]  # em empate (ponto na fronteira) fica a 1ª célula
+    return celulas[ordem]
+
+
+def gerar_territorios(coords, limite=None, margem=None):
+    """
+    Calcula os territórios (células de Voronoi recortadas pelo limite).
+
+    coords: array (n, 2) de coordenadas projetadas das subestações.
+    limite: geometria shapely da cidade (mesmo CRS) ou None para não recortar.
+    Retorna um array de geometrias alinhado com `coords` (pontos repetidos
+    recebem a mesma célula).
+    """
+    coords = np.asarray(coords, dtype=float)
+    unicos, inverso = np.unique(coords, axis=0, return_inverse=True)
+    inverso = inverso.reshape(-1)
+    if len(unicos) < 2:
+        raise ValueError("Voronoi requer no mínimo 2 pontos distintos.")
+
+    pontos = shapely.points(unicos)
+    celulas = _celulas_ordenadas(pontos, _envelope(unicos, limite, margem))
+
+    if limite is not None:
+        shapely.prepare(limite)
+        dentro = shapely.contains(limite, celulas)
+        fronteira = ~dentro
+        celulas = celulas.copy()
+        celulas[fronteira] = shapely.intersection(celulas[fronteira], limite)
+
+    return celulas[inverso]
@@ -1,15 +1,17 @@
 import geopandas as gpd
 import matplotlib.pyplot as plt
-import osmnx as ox
 import numpy as np
 import os
 import sys
+import shapely
 from scipy.spatial import Voronoi
 from shapely.geometry import Polygon
 from shapely.ops import unary_union
 
-from config import CIDADE_ALVO, CRS_PROJETADO, PATH_GEOJSON, DIR_RAIZ
+from config import CIDADE_ALVO, CRS_PROJETADO, PATH_GEOJSON, PATH_GEOJSON_PONTOS, DIR_RAIZ
 from etl.carregador_aneel import carregar_subestacoes
+from etl.limites_cidade import obter_limite_cidade
+from modelos.motor_voronoi import gerar_territorios
 
 def voronoi_finite_polygons_2d(vor, radius=None):
     """
@@ -63,17 +65,43 @@ def voronoi_finite_polygons_2d(vor, radius=None):
 
     return new_regions, np.asarray(new_vertices)
 
-def main():
+def gerar_territorios_legado(pontos_proj, limite_proj):
+    """
+    Pipeline original (scipy Voronoi + overlay + sjoin).
+    Mantido como referência para o benchmark do motor shapely.
+    """
+    coords = np.array([(p.x, p.y) for p in pontos_proj.geometry])
+    vor = Voronoi(coords)
+    regions, vertices = voronoi_finite_polygons_2d(vor)
+    
+    polygons_list = []
+    for region in regions:
+        polygons_list.append(Polygon(vertices[region]))
+    
+    voronoi_gdf = gpd.GeoDataFrame(geometry=polygons_list, crs=pontos_proj.crs)
+
+    try:
+        subs_logicas = gpd.overlay(voronoi_gdf, limite_proj, how='intersection')
+    except:
+        subs_logicas = gpd.clip(voronoi_gdf, limite_proj)
+
+    subs_logicas_finais = gpd.sjoin(subs_logicas, pontos_proj, how="inner", predicate="contains")
+    
+    colunas_manter = ['geometry', 'NOM', 'COD_ID']
+    cols = [c for c in colunas_manter if c in subs_logicas_finais.columns]
+    return subs_logicas_finais[cols]
+
+def main(gerar_imagem=True):
     print(f"--- INICIANDO GERAÇÃO DE TERRITÓRIOS (VORONOI) ---")
     print(f"Alvo: {CIDADE_ALVO}")
     
     subs_raw = carregar_subestacoes()
-    print(f"Baixando limites geográficos via OpenStreetMap...")
+    print(f"Obtendo limites geográficos (cache local / OpenStreetMap)...")
     try:
-        limite_cidade = ox.geocode_to_gdf(CIDADE_ALVO)
+        limite_cidade = obter_limite_cidade(CIDADE_ALVO)
     except Exception as e:
-        print(f"ERRO OSM: {e}")
-        print("Verifique sua conexão ou o nome da cidade no .env")
+        print(f"ERRO LIMITE: {e}")
+        print("Verifique sua conexão, o nome da cidade no .env ou importe o limite com src/etl/limites_cidade.py")
         sys.exit(1)
 
     if subs_raw.crs is None:
@@ -95,32 +123,23 @@ def main():
     limite_proj = limite_cidade.to_crs(CRS_PROJETADO)
 
     print("Calculando polígonos de influência...")
-    coords = np.array([(p.x, p.y) for p in pontos_proj.geometry])
-    vor = Voronoi(coords)
-    regions, vertices = voronoi_finite_polygons_2d(vor)
-    
-    polygons_list = []
-    for region in regions:
-        polygons_list.append(Polygon(vertices[region]))
-    
-    voronoi_gdf = gpd.GeoDataFrame(geometry=polygons_list, crs=CRS_PROJETADO)
-
-    print("Ajustando fronteiras...")
-    try:
-        subs_logicas = gpd.overlay(voronoi_gdf, limite_proj, how='intersection')
-    except:
-        subs_logicas = gpd.clip(voronoi_gdf, limite_proj)
-
-    subs_logicas_finais = gpd.sjoin(subs_logicas, pontos_proj, how="inner", predicate="contains")
-    
     colunas_manter = ['geometry', 'NOM', 'COD_ID']
-    cols = [c for c in colunas_manter if c in subs_logicas_finais.columns]
-    subs_logicas_finais = subs_logicas_finais[cols]
+    coords = shapely.get_coordinates(pontos_proj.geometry.values)
+    celulas = gerar_territorios(coords, limite_proj.geometry.union_all())
+
+    # As células saem na ordem dos pontos: os atributos são anexados sem sjoin
+    cols = [c for c in colunas_manter if c in pontos_proj.columns and c != 'geometry']
+    subs_logicas_finais = gpd.GeoDataFrame(pontos_proj[cols].copy(), geometry=celulas, crs=CRS_PROJETADO)
+    subs_logicas_finais = subs_logicas_finais[~subs_logicas_finais.geometry.is_empty]
 
     print(f"Salvando resultado em: {PATH_GEOJSON}")
     subs_logicas_finais.to_crs(epsg=4326).to_file(PATH_GEOJSON, driver='GeoJSON')
+    cols_pontos = [c for c in colunas_manter if c in pontos_proj.columns]
+    pontos_proj[cols_pontos].to_crs(epsg=4326).to_file(PATH_GEOJSON_PONTOS, driver='GeoJSON')
     print("✅ GeoJSON gerado com sucesso!")
 
+    if not gerar_imagem:
+        return
 
     try:
         print("Gerando mapa visual (PNG)...")
@@ -0,0 +1,87 @@
+"""
+Motor vetorizado do relatório de mercado (passo 5 de analise_mercado).
+
+Calcula todas as métricas por subestação com poucas agregações agrupadas
+(clientes, MWh anual, kW de GD, consumo/quantidade/% por classe e criticidade)
+e só então emite os registros do perfil_mercado, em vez de filtrar os
+DataFrames inteiros uma vez por subestação.
+"""
+CLASSES_RELATORIO = ['Residencial', 'Comercial', 'Industrial', 'Rural', 'Poder Público']
+
+
+def nivel_criticidade(potencia_kw):
+    nivel = "BAIXO"
+    if potencia_kw > 1000: nivel = "MEDIO"
+    if potencia_kw > 5000: nivel = "ALTO"
+    return nivel
+
+
+def _agregar(df, col_valor):
+    """
+    Retorna ({id: (soma, qtd)}, {(id, classe): (soma, qtd)}, {id: nome do 1º registro}).
+    """
+    if df is None or df.empty:
+        return {}, {}, {}
+
+    por_sub = df.groupby('ID_SUBESTACAO', sort=False)[col_valor].agg(['sum', 'size'])
+    por_classe = df.groupby(['ID_SUBESTACAO', 'TIPO'], sort=False)[col_valor].agg(['sum', 'size'])
+    primeiros = df.drop_duplicates(subset='ID_SUBESTACAO', keep='first')
+
+    totais = dict(zip(por_sub.index, zip(por_sub['sum'], por_sub['size'])))
+    classes = dict(zip(por_classe.index, zip(por_classe['sum'], por_classe['size'])))
+    nomes = dict(zip(primeiros['ID_SUBESTACAO'], primeiros['NOME_SUBESTACAO']))
+    return totais, classes, nomes
+
+
+def gerar_relatorio(df_cons_final, df_gd_final):
+    """
+    Gera a lista de registros do perfil_mercado a partir de agregações agrupadas.
+
+    "geometry" sai sempre nulo, como no relatório original: o território (em
+    EPSG:4326) é servido a partir do GeoJSON do Voronoi.
+    """
+    cons_tot, cons_cls, nomes_cons = _agregar(df_cons_final, 'CONSUMO_ANUAL')
+    gd_tot, gd_cls, nomes_gd = _agregar(df_gd_final, 'POT_INST')
+
+    ids_unicos = sorted([x for x in (set(cons_tot) | set(gd_tot)) if str(x) != 'nan'])
+
+    relatorio = []
+    for sub_id in ids_unicos:
+        consumo, qtd_clientes = cons_tot.get(sub_id, (0, 0))
+        potencia, qtd_gd = gd_tot.get(sub_id, (0, 0))
+        nome = nomes_cons.get(sub_id, nomes_gd.get(sub_id, "Desconhecido"))
+
+        stats = {
+            "subestacao": f"{nome} (ID: {sub_id})",
+            "id_tecnico": str(sub_id),
+            "metricas_rede": {
+                "total_clientes": int(qtd_clientes),
+                "consumo_anual_mwh": float(round(consumo/1000, 2)),
+                "nivel_criticidade_gd": nivel_criticidade(potencia)
+            },
+            "geracao_distribuida": {
+                "total_unidades": int(qtd_gd),
+                "potencia_total_kw": float(round(potencia, 2)),
+                "detalhe_por_classe": {}
+            },
+            "perfil_consumo": {},
+            "geometry": None
+        }
+
+        for cls in CLASSES_RELATORIO:
+            c_cls, n_cls = cons_cls.get((sub_id, cls), (0, 0))
+            if n_cls > 0:
+                stats["perfil_consumo"][cls] = {
+                    "qtd_clientes": int(n_cls),
+                    "pct": float(round((c_cls/consumo*100) if consumo > 0 else 0, 1)),
+                    "consumo_anual_mwh": float(round(c_cls/1000, 2))
+                }
+
+            p_gd, _ = gd_cls.get((sub_id, cls), (0, 0))
+            if p_gd > 0:
+                stats["geracao_distribuida"]["detalhe_por_classe"][cls] = float(round(p_gd, 2))
+
+        relatorio.append(stats)
+
+    return relatorio
+
@@ -0,0 +1,284 @@
+"""
+Repositório em memória dos dados servidos pela API principal.
+
+Carrega o GeoJSON de territórios e o JSON de mercado uma vez, pré-calcula os
+registros fundidos (floats limpos, geometria do território) e os pontos
+representativos de cada território. Com SEGMENTO_COMPARTILHADO os dados vêm de
+arquivos Arrow mapeados em memória (ver segmento_dados), as mesmas páginas para
+todos os workers do uvicorn. Quando o mtime/tamanho dos arquivos muda e
+o conteúdo (hash) também, uma nova versão é montada numa thread de fundo e
+trocada de forma atômica: as requisições seguem na versão vigente enquanto isso
+e sempre leem uma versão completa e imutável.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import geopandas as gpd
+import numpy as np
+import pyarrow as pa
+import shapely
+from shapely.geometry import mapping
+
+from config import INTERVALO_VERIFICACAO_DADOS, SEGMENTO_COMPARTILHADO
+from utils import localizar_arquivos_dados, mapa_geometrias, limpar_float
+from indice_subestacoes import IndiceSubestacoes
+from metricas import medir_fase, contar_cache
+from segmento_dados import abrir_segmento, limpar_segmentos_antigos
+
+# Respostas/estruturas derivadas guardadas por versão (LRU): consultas com
+# parâmetros (paginação, bbox...) também entram, então o total é limitado.
+MAX_RESPOSTAS_POR_VERSAO = 256
+
+
+def _assinatura(caminhos):
+    """(caminho, mtime_ns, tamanho) de cada arquivo: barato, usado a cada verificação."""
+    sig = []
+    for c in caminhos:
+        st = os.stat(c)
+        sig.append((c, st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+def _hash_conteudo(caminhos):
+    h = hashlib.sha1()
+    for c in caminhos:
+        with open(c, 'rb') as f:
+            for bloco in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloco)
+    return h.hexdigest()
+
+
+def _limpar_registro(item):
+    """Mesma normalização numérica que o /mercado/ranking fazia a cada chamada."""
+    if 'metricas_rede' in item:
+        m = item['metricas_rede']
+        if 'consumo_anual_mwh' in m:
+            m['consumo_anual_mwh'] = limpar_float(m['consumo_anual_mwh'])
+
+    if 'perfil_consumo' in item:
+        for classe, valores in item['perfil_consumo'].items():
+            raw_consumo = valores.get('consumo_anual_mwh', valores.get('consumo', 0))
+            valores['consumo_anual_mwh'] = limpar_float(raw_consumo)
+    return item
+
+
+def preparar_registros(gdf, dados_mercado):
+    """
+    Registros de mercado limpos (sem geometria), geometria do território de cada
+    um (shapely ou None) e ponto representativo (lat, lon) para clima/simulação.
+    """
+    geo_map = mapa_geometrias(gdf)
+    lista = dados_mercado if isinstance(dados_mercado, list) else dados_mercado.to_dict('records')
+
+    registros, geometrias, pontos = [], [], []
+    for item in lista:
+        sub_nome = str(item.get('subestacao', '')).split(' (ID')[0].strip().upper()
+        geom = geo_map.get(sub_nome)
+        item = _limpar_registro(dict(item))
+        item.pop('geometry', None)
+        registros.append(item)
+        geometrias.append(geom)
+        if geom is None or geom.is_empty:
+            pontos.append(None)
+        else:
+            p = shapely.point_on_surface(geom)
+            pontos.append((p.y, p.x))
+    return registros, geometrias, pontos
+
+
+class VersaoDados:
+    """
+    Uma versão imutável do conjunto de dados (não altere os registros).
+
+    Os registros não guardam a geometria: ela sai de `geometrias` sob demanda
+    (`geometria_geojson` / `registros_com_geometria`). Com `segmento`,
+    `registros` e `geometrias` são vistas sobre as colunas Arrow mapeadas
+    (decodificam a linha acessada) e o índice é montado das colunas de chaves.
+    """
+
+    def __init__(self, registros, geometrias, pontos, caminhos, hash_conteudo, gdf=None, segmento=None):
+        self.caminhos = caminhos
+        self.hash_conteudo = hash_conteudo
+        self.carregado_em = time.time()
+        self.segmento = segmento
+        self._gdf = gdf
+
+        self.registros = registros
+        self.geometrias = geometrias
+        self.pontos = pontos
+
+        # Busca por ID / nome normalizado / prefixo / trigramas
+        self.indice = IndiceSubestacoes(segmento.chaves_indice() if segmento is not None else self.registros)
+
+        # Respostas HTTP serializadas e estruturas derivadas desta versão (ver cache_respostas)
+        self._respostas = OrderedDict()
+        self._lock_respostas = threading.Lock()
+
+    @property
+    def gdf(self):
+        """GeoDataFrame dos territórios (no modo segmento, montado na primeira vez a partir do Arrow)."""
+        if self._gdf is not None:
+            return self._gdf
+        return self.resposta("territorios:gdf", lambda v: v.segmento.geodataframe())
+
+    @property
+    def tabela_territorios(self):
+        """Tabela Arrow dos territórios mapeada do segmento (None fora do modo segmento)."""
+        return self.segmento.territorios if self.segmento is not None else None
+
+    def geometrias_array(self):
+        """Todas as geometrias como array numpy de objetos (estruturas derivadas: STRtree, simplificação)."""
+        if self.segmento is not None:
+            return self.segmento.geometrias_array()
+        return np.array(self.geometrias, dtype=object)
+
+    def geometria_geojson(self, pos):
+        geom = self.geometrias[pos]
+        return mapping(geom) if geom is not None else None
+
+    def registro_completo(self, pos):
+        return dict(self.registros[pos], geometry=self.geometria_geojson(pos))
+
+    def registros_com_geometria(self):
+        """Registros no formato do /mercado/ranking (geometria GeoJSON no campo 'geometry')."""
+        return [self.registro_completo(i) for i in range(len(self.registros))]
+
+    def resposta(self, chave, montar):
+        """Resposta pré-serializada (ou estrutura derivada) desta versão, montada uma vez por chave."""
+        with self._lock_respostas:
+            pronta = self._respostas.get(chave)
+            if pronta is not None:
+                self._respostas.move_to_end(chave)
+                contar_cache("respostas", "acerto")
+                return pronta
+        contar_cache("respostas", "falta")
+        pronta = montar(self)
+        with self._lock_respostas:
+            self._respostas[chave] = pronta
+            while len(self._respostas) > MAX_RESPOSTAS_POR_VERSAO:
+                self._respostas.popitem(last=False)
+        return pronta
+
+    def resposta_compartilhada(self, chave, montar):
+        """
+        Como `resposta`, para RespostaPreparada grandes: no modo segmento os corpos
+        ficam em arquivos mapeados, os mesmos para todos os workers.
+        """
+        if self.segmento is None:
+            return self.resposta(chave, montar)
+        return self.resposta(chave, lambda v: v.segmento.resposta(chave, lambda: montar(v)))
+
+
+class RepositorioDados:
+    """Mantém a versão atual e a recarrega em segundo plano quando os arquivos de origem mudam."""
+
+    def __init__(self, intervalo_verificacao=INTERVALO_VERIFICACAO_DADOS):
+        self.intervalo_verificacao = intervalo_verificacao
+        self._versao = None
+        # (caminho, mtime, tamanho) dos arquivos de que a versão vigente foi montada
+        self._assinatura = None
+        self._ultima_verificacao = 0.0
+        self._lock = threading.Lock()  # carga/recarga em andamento
+
+    @medir_fase("carga_dados")
+    def _montar(self, caminhos, hash_conteudo):
+        path_geo, path_mercado = caminhos
+
+        def ler_arquivos():
+            gdf = gpd.read_file(path_geo)
+            with open(path_mercado, 'r', encoding='utf-8') as f:
+                dados_mercado = json.load(f)
+            return gdf, dados_mercado
+
+        if SEGMENTO_COMPARTILHADO:
+            try:
+                def preparar():
+                    gdf, dados_mercado = ler_arquivos()
+                    tabela = pa.table(gdf.to_arrow(index=False, geometry_encoding="WKB"))
+                    return preparar_registros(gdf, dados_mercado) + (tabela,)
+
+                segmento = abrir_segmento(hash_conteudo, preparar, caminhos)
+                return VersaoDados(segmento.registros(), segmento.geometrias(), segmento.pontos(),
+                                   caminhos, hash_conteudo, segmento=segmento)
+            except Exception as e:
+                print(f"⚠️ Segmento compartilhado indisponível ({e}). Carregando na memória do processo.")
+
+        gdf, dados_mercado = ler_arquivos()
+        return VersaoDados(*preparar_registros(gdf, dados_mercado), caminhos, hash_conteudo, gdf=gdf)
+
+    def _publicar(self):
+        inicio = time.time()
+        caminhos = localizar_arquivos_dados()
+        # Assinatura antes da leitura: arquivo alterado durante a carga é detectado na próxima verificação
+        assinatura = _assinatura(caminhos)
+        versao = self._montar(caminhos, _hash_conteudo(caminhos))
+        self._versao = versao
+        self._assinatura = assinatura
+        self._ultima_verificacao = time.monotonic()
+        origem = "segmento compartilhado" if versao.segmento is not None else "memória"
+        print(f"📦 Dados carregados ({origem}): {len(versao.registros)} subestações "
+              f"({time.time() - inicio:.2f}s, versão {versao.hash_conteudo[:8]})")
+        return versao
+
+    def carregar(self):
+        """Carrega (ou recarrega) imediatamente e publica a nova versão."""
+        with self._lock:
+            return self._publicar()
+
+    def _recarregar(self, caminhos, assinatura):
+        """Roda na thread de fundo, com o lock já adquirido por `_verificar`."""
+        try:
+            inicio = time.time()
+            hash_conteudo = _hash_conteudo(caminhos)
+            if hash_conteudo == self._versao.hash_conteudo:
+                # Só o mtime mudou (ex: arquivo regravado igual): nada a recarregar
+                self._assinatura = assinatura
+                return
+            nova = self._montar(caminhos, hash_conteudo)
+            self._versao = nova
+            self._assinatura = assinatura
+            print(f"🔄 Dados recarregados em segundo plano: versão {nova.hash_conteudo[:8]} "
+                  f"({len(nova.registros)} subestações, {time.time() - inicio:.2f}s)")
+            if nova.segmento is not None:
+                # Cada recarga grava uma pasta nova: sem isso DIR_SEGMENTO cresce sem limite
+                limpar_segmentos_antigos(nova.hash_conteudo)
+        except Exception as e:
+            print(f"⚠️ Falha ao recarregar dados (mantendo versão atual): {e}")
+        finally:
+            self._lock.release()
+
+    def _verificar(self):
+        self._ultima_verificacao = time.monotonic()
+        try:
+            caminhos = localizar_arquivos_dados()
+            assinatura = _assinatura(caminhos)
+        except Exception as e:
+            print(f"⚠️ Falha ao verificar arquivos de dados (mantendo versão atual): {e}")
+            return
+        if assinatura == self._assinatura:
+            return
+        if not self._lock.acquire(blocking=False):
+            return  # recarga já em andamento
+        try:
+            threading.Thread(target=self._recarregar, args=(caminhos, assinatura),
+                             name="recarga-dados", daemon=True).start()
+        except Exception:
+            self._lock.release()
+            raise
+
+    def atual(self):
+        """
+        Versão vigente. Verifica os arquivos (só stat) no máximo a cada
+        `intervalo_verificacao` segundos; a recarga não bloqueia a requisição.
+        """
+        if self._versao is None:
+            with self._lock:
+                if self._versao is None:
+                    return self._publicar()
+        if time.monotonic() - self._ultima_verificacao >= self.intervalo_verificacao:
+            self._verificar()
+        return self._versao
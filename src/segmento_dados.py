@@ -0,0 +1,311 @@
+"""
+Segmento de dados somente leitura compartilhado pelos workers da API.
+
+Para cada versão do conteúdo (hash do GeoJSON + JSON de mercado) é gravada uma
+pasta em DIR_SEGMENTO/<hash> com arquivos Arrow IPC sem compressão:
+
+- registros.arrow: registro de mercado já limpo (JSON, sem geometria), geometria
+  do território em WKB, ponto representativo (lat, lon) e as chaves do índice de
+  busca (id_tecnico, subestacao);
+- territorios.arrow: a tabela do GeoJSON com geometria WKB (servida direto no
+  /mercado/geojson em Arrow);
+- respostas/: corpos pré-serializados (identity/gzip/br) das respostas grandes,
+  gravados pelo primeiro worker que os montar.
+
+Os workers abrem tudo com memory map e não copiam o conjunto para o heap:
+registros e geometrias são vistas sobre as colunas mapeadas (`RegistrosSegmento`,
+`GeometriasSegmento`) que decodificam só a linha acessada, e o índice de busca é
+montado a partir das colunas de chaves, sem decodificar os registros. O que fica
+por worker é o índice e as estruturas derivadas montadas sob demanda (ex: STRtree
+do filtro por bbox); o corpo dos registros e das respostas grandes fica uma vez
+só no page cache, e subir um worker não exige parse de GeoJSON nem de JSON.
+O pipeline grava o segmento (python src/segmento_dados.py); se ele não existir,
+o primeiro worker grava. A troca é atômica (pasta temporária + rename). Depois
+de cada troca (pipeline ou recarga da API) os segmentos antigos que nenhum
+processo tem abertos são removidos.
+"""
+import json
+import mmap
+import os
+import shutil
+import sys
+import time
+from collections.abc import Sequence
+
+import numpy as np
+import pyarrow as pa
+import shapely
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import DIR_SEGMENTO
+from cache_respostas import RespostaPreparada, serializar_json
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import orjson
+    _ler_json = orjson.loads  # aceita memoryview direto do arquivo mapeado
+except ImportError:
+    _ler_json = lambda bruto: json.loads(bytes(bruto))
+
+NOME_MANIFESTO = "manifest.json"
+VERSAO_SEGMENTO = 2
+CODIFICACOES = ("identity", "gzip", "br")
+
+
+def pasta_segmento(hash_conteudo):
+    # A versão do formato entra no nome: segmento antigo não impede gravar o novo
+    return os.path.join(DIR_SEGMENTO, f"{hash_conteudo[:16]}-v{VERSAO_SEGMENTO}")
+
+
+def _gravar_arrow(caminho, tabela):
+    with pa.OSFile(caminho, "wb") as f, pa.ipc.new_file(f, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+
+
+def _ler_arrow(caminho):
+    """Tabela cujos buffers apontam para o arquivo mapeado (sem cópia para o heap do processo)."""
+    return pa.ipc.open_file(pa.memory_map(caminho, "r")).read_all()
+
+
+def _mapear(caminho):
+    with open(caminho, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def _gravar_atomico(caminho, dados):
+    tmp = f"{caminho}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(dados)
+    os.replace(tmp, caminho)
+
+
+def gravar_segmento(hash_conteudo, registros, geometrias, pontos, tabela_territorios, fontes):
+    """Grava o segmento da versão (se ainda não existir) e retorna a pasta."""
+    dir_final = pasta_segmento(hash_conteudo)
+    if os.path.exists(os.path.join(dir_final, NOME_MANIFESTO)):
+        return dir_final
+
+    inicio = time.time()
+    dir_tmp = f"{dir_final}.tmp-{os.getpid()}"
+    shutil.rmtree(dir_tmp, ignore_errors=True)
+    os.makedirs(os.path.join(dir_tmp, "respostas"), exist_ok=True)
+
+    tabela_registros = pa.table({
+        "registro": pa.array([serializar_json(r) for r in registros], type=pa.binary()),
+        "geometria": pa.array(shapely.to_wkb(np.array(geometrias, dtype=object)).tolist() if geometrias else [],
+                              type=pa.binary()),
+        "lat": pa.array([p[0] if p else np.nan for p in pontos], type=pa.float64()),
+        "lon": pa.array([p[1] if p else np.nan for p in pontos], type=pa.float64()),
+        "id_tecnico": pa.array([None if r.get('id_tecnico') is None else str(r['id_tecnico']) for r in registros],
+                               type=pa.string()),
+        "subestacao": pa.array([str(r.get('subestacao', '')) for r in registros], type=pa.string()),
+    })
+    _gravar_arrow(os.path.join(dir_tmp, "registros.arrow"), tabela_registros)
+    _gravar_arrow(os.path.join(dir_tmp, "territorios.arrow"), tabela_territorios)
+
+    manifesto = {
+        "versao": VERSAO_SEGMENTO,
+        "hash_conteudo": hash_conteudo,
+        "fontes": [os.path.basename(c) for c in fontes],
+        "registros": len(registros),
+        "territorios": tabela_territorios.num_rows,
+        "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(os.path.join(dir_tmp, NOME_MANIFESTO), "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=4, ensure_ascii=False)
+
+    try:
+        os.replace(dir_tmp, dir_final)
+    except OSError:
+        # Outro worker publicou o mesmo segmento primeiro
+        shutil.rmtree(dir_tmp, ignore_errors=True)
+    print(f"🧱 Segmento compartilhado gravado em {time.time() - inicio:.2f}s: {dir_final}")
+    return dir_final
+
+
+def _em_uso(diretorio):
+    """True se algum processo ainda tem o segmento aberto (trava compartilhada no manifesto)."""
+    if fcntl is None:
+        return False
+    try:
+        f = open(os.path.join(diretorio, NOME_MANIFESTO), "rb")
+    except FileNotFoundError:
+        return False
+    with f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(f, fcntl.LOCK_UN)
+        return False
+
+
+def limpar_segmentos_antigos(hash_atual):
+    """
+    Remove os segmentos de versões anteriores, exceto os que algum processo ainda
+    tem abertos (uma versão antiga em uso por requisições em andamento ou por um
+    worker que ainda não recarregou): esses saem numa limpeza seguinte.
+    """
+    if not os.path.isdir(DIR_SEGMENTO):
+        return
+    atual = os.path.basename(pasta_segmento(hash_atual))
+    for nome in os.listdir(DIR_SEGMENTO):
+        diretorio = os.path.join(DIR_SEGMENTO, nome)
+        if nome != atual and ".tmp-" not in nome and not _em_uso(diretorio):
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+
+def _array_unico(coluna):
+    """Array contíguo da coluna (sem cópia quando o arquivo tem um só bloco, como os gravados aqui)."""
+    if coluna.num_chunks == 1:
+        return coluna.chunk(0)
+    if coluna.num_chunks == 0:
+        return pa.array([], type=coluna.type)
+    return coluna.combine_chunks()
+
+
+class _LinhasBinarias:
+    """Acesso por linha a uma coluna binária mapeada: memoryview do trecho, sem copiar a coluna."""
+
+    def __init__(self, coluna):
+        arr = _array_unico(coluna)
+        self._n = len(arr)
+        _, offsets, dados = arr.buffers()
+        self._offsets = np.frombuffer(offsets, dtype=np.int32, count=self._n + 1, offset=arr.offset * 4) \
+            if self._n else np.zeros(1, dtype=np.int32)
+        self._dados = memoryview(dados) if dados is not None else memoryview(b"")
+        self._nulos = arr.is_null().to_numpy(zero_copy_only=False) if arr.null_count else None
+
+    def __len__(self):
+        return self._n
+
+    def linha(self, pos):
+        if self._nulos is not None and self._nulos[pos]:
+            return None
+        return self._dados[self._offsets[pos]:self._offsets[pos + 1]]
+
+
+class _VisaoLinhas(Sequence):
+    """Sequência somente leitura que decodifica cada linha ao ser acessada."""
+
+    def __init__(self, coluna):
+        self._linhas = _LinhasBinarias(coluna)
+
+    def __len__(self):
+        return len(self._linhas)
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self[i] for i in range(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError(pos)
+        bruto = self._linhas.linha(pos)
+        return None if bruto is None else self._decodificar(bruto)
+
+
+class RegistrosSegmento(_VisaoLinhas):
+    """Registros de mercado: um dict novo a cada acesso (a versão continua imutável)."""
+
+    @staticmethod
+    def _decodificar(bruto):
+        return _ler_json(bruto)
+
+
+class GeometriasSegmento(_VisaoLinhas):
+    """Geometrias dos territórios (shapely ou None), decodificadas do WKB mapeado."""
+
+    @staticmethod
+    def _decodificar(bruto):
+        return shapely.from_wkb(bytes(bruto))
+
+
+class SegmentoDados:
+    """Arquivos de uma versão abertos com memory map."""
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self.dir_respostas = os.path.join(diretorio, "respostas")
+        # Trava compartilhada enquanto o objeto existir: limpar_segmentos_antigos não remove o segmento
+        self._trava = open(os.path.join(diretorio, NOME_MANIFESTO), "rb")
+        if fcntl is not None:
+            fcntl.flock(self._trava, fcntl.LOCK_SH)
+        self.manifesto = json.loads(self._trava.read())
+        if self.manifesto.get("versao") != VERSAO_SEGMENTO:
+            raise ValueError(f"Segmento em formato antigo: {diretorio}")
+        self._registros = _ler_arrow(os.path.join(diretorio, "registros.arrow"))
+        self.territorios = _ler_arrow(os.path.join(diretorio, "territorios.arrow"))
+
+    def registros(self):
+        return RegistrosSegmento(self._registros.column("registro"))
+
+    def geometrias(self):
+        return GeometriasSegmento(self._registros.column("geometria"))
+
+    def geometrias_array(self):
+        """Todas as geometrias num array numpy (decodificação vetorizada, para STRtree/simplificação)."""
+        wkb = self._registros.column("geometria").to_numpy(zero_copy_only=False)
+        return shapely.from_wkb(wkb) if len(wkb) else np.empty(0, dtype=object)
+
+    def pontos(self):
+        lat = _array_unico(self._registros.column("lat")).to_numpy()
+        lon = _array_unico(self._registros.column("lon")).to_numpy()
+        return [None if np.isnan(y) else (float(y), float(x)) for y, x in zip(lat, lon)]
+
+    def chaves_indice(self):
+        """Entradas mínimas para o IndiceSubestacoes, lidas das colunas de chaves (sem decodificar registros)."""
+        ids = self._registros.column("id_tecnico").to_pylist()
+        nomes = self._registros.column("subestacao").to_pylist()
+        return ({"id_tecnico": i, "subestacao": n} for i, n in zip(ids, nomes))
+
+    def geodataframe(self):
+        import geopandas as gpd
+        return gpd.GeoDataFrame.from_arrow(self.territorios)
+
+    def resposta(self, nome, preparar, media_type="application/json"):
+        """
+        RespostaPreparada com os corpos em arquivos do segmento, mapeados em memória.
+        O primeiro processo monta com `preparar()` e grava; os demais só mapeiam.
+        """
+        base = os.path.join(self.dir_respostas, nome)
+        if not os.path.exists(f"{base}.etags"):
+            pronta = preparar()
+            for cod, corpo in pronta.variantes.items():
+                _gravar_atomico(f"{base}.{cod}", corpo)
+            # Por último (conjunto completo): uma ETag por codificação
+            _gravar_atomico(f"{base}.etags", json.dumps(pronta.etags).encode("ascii"))
+
+        with open(f"{base}.etags", "r", encoding="ascii") as f:
+            etags = json.load(f)
+        variantes = {cod: _mapear(f"{base}.{cod}") for cod in CODIFICACOES if cod in etags}
+        return RespostaPreparada.de_variantes(variantes, etags, media_type)
+
+
+def abrir_segmento(hash_conteudo, preparar, fontes):
+    """
+    Abre o segmento da versão; se não existir, monta os dados com `preparar()` ->
+    (registros, geometrias, pontos, tabela_territorios) e grava antes de abrir.
+    """
+    diretorio = pasta_segmento(hash_conteudo)
+    if not os.path.exists(os.path.join(diretorio, NOME_MANIFESTO)):
+        gravar_segmento(hash_conteudo, *preparar(), fontes)
+    return SegmentoDados(diretorio)
+
+
+if __name__ == "__main__":
+    # Etapa do pipeline: grava o segmento da versão atual dos arquivos antes de subir a API
+    from repositorio_dados import RepositorioDados
+
+    versao = RepositorioDados().carregar()
+    if versao.segmento is None:
+        print("❌ Segmento compartilhado não foi gerado (veja o aviso acima).")
+        sys.exit(1)
+    limpar_segmentos_antigos(versao.hash_conteudo)
@@ -0,0 +1,129 @@
+"""
+Servidor pré-fork para as APIs: importa o app (modelo, cubo, dados) uma vez no
+processo pai, congela o heap (gc.freeze) e só então cria os workers com fork.
+
+O `uvicorn --workers N` sobe cada worker com spawn, e cada um repete a carga
+completa. Aqui os filhos herdam as páginas do pai copy-on-write: subir mais
+workers custa CPU, não outra cópia do modelo em RAM, e um worker novo fica
+pronto na hora. Worker que morrer é recriado a partir do mesmo pai, sem recarga.
+
+Só em sistemas com fork (Linux/macOS); no Windows o run_all usa o uvicorn direto.
+
+Uso:
+    python src/servidor_prefork.py src.ai.ai_service:app --port 8001 --workers 4
+"""
+import argparse
+import gc
+import importlib
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from metricas import memoria_processo
+
+# Worker que morre antes disso após subir indica erro de inicialização: espera antes de recriar
+VIDA_MINIMA_S = 5.0
+
+
+def importar_app(alvo):
+    modulo, _, atributo = alvo.partition(":")
+    return getattr(importlib.import_module(modulo), atributo or "app")
+
+
+def abrir_socket(host, porta, backlog=2048):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, porta))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def executar_worker(app, sock, log_level):
+    # Os handlers do pai não valem aqui: o uvicorn instala os seus (shutdown gracioso)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    servidor = uvicorn.Server(uvicorn.Config(app, log_level=log_level, lifespan="on"))
+    servidor.run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("app", help="módulo:atributo, ex: src.ai.ai_service:app")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        print("❌ Sistema sem fork: use `python -m uvicorn ... --workers N`.")
+        sys.exit(1)
+
+    sys.path.insert(0, os.getcwd())
+    inicio = time.perf_counter()
+    app = importar_app(args.app)
+    # Objetos da carga vão para a geração permanente: o GC dos filhos não os toca (nem suas páginas)
+    gc.collect()
+    gc.freeze()
+    print(f"📦 {args.app} carregado no processo pai em {time.perf_counter() - inicio:.2f}s "
+          f"({memoria_processo()})", flush=True)
+
+    sock = abrir_socket(args.host, args.port)
+    filhos = {}
+    encerrando = False
+
+    def criar_worker():
+        pid = os.fork()
+        if pid == 0:
+            codigo = 0
+            try:
+                executar_worker(app, sock, args.log_level)
+            except BaseException as e:
+                print(f"❌ Worker {os.getpid()} falhou: {e}", flush=True)
+                codigo = 1
+            finally:
+                os._exit(codigo)
+        filhos[pid] = time.monotonic()
+
+    def encerrar(signum, frame):
+        nonlocal encerrando
+        encerrando = True
+        for pid in list(filhos):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, encerrar)
+    signal.signal(signal.SIGINT, encerrar)
+
+    for _ in range(args.workers):
+        criar_worker()
+    print(f"🚀 {args.workers} workers em http://{args.host}:{args.port} (pids {sorted(filhos)})", flush=True)
+
+    while filhos:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        subiu_em = filhos.pop(pid, None)
+        if encerrando or subiu_em is None:
+            continue
+        print(f"⚠️ Worker {pid} saiu (status {status}); recriando.", flush=True)
+        if time.monotonic() - subiu_em < VIDA_MINIMA_S:
+            time.sleep(VIDA_MINIMA_S)
+        criar_worker()
+
+    sock.close()
+    print("🛑 Servidor pré-fork encerrado.", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Física da simulação de geração solar (GD) vetorizada com NumPy.
+
+As mesmas regras do /simulacao original (perda térmica acima de 25 °C, fator de
+performance 0,75, classificação do impacto na rede), avaliadas de uma vez sobre
+arrays (subestação x dia). Usada pela simulação de um dia, de um período e em
+lote, para que todas produzam exatamente os mesmos números.
+"""
+from datetime import timedelta
+
+import numpy as np
+
+VARIAVEIS_DIARIAS = ["shortwave_radiation_sum", "temperature_2m_max", "weather_code"]
+
+FATOR_PERFORMANCE_BASE = 0.75
+TEMP_REFERENCIA_C = 25.0
+COEF_PERDA_TERMICA = 0.004      # por °C acima da referência
+
+IRRADIACAO_PADRAO_KWH = 5.0     # estimativa quando o clima está indisponível
+TEMP_MAX_PADRAO_C = 30.0
+MAX_DIAS_PERIODO = 366
+
+FONTES = {"archive": "Historico Real", "forecast": "Previsao Numerica"}
+FONTE_PADRAO = "Estimativa Padrao"
+
+
+def dias_do_periodo(inicio, fim):
+    return [inicio + timedelta(days=i) for i in range((fim - inicio).days + 1)]
+
+
+def descrever_tempo(codigos):
+    codigos = np.asarray(codigos, dtype=float)
+    return np.select([codigos > 50, codigos > 3], ["Chuvoso", "Nublado"], "Ceu Limpo")
+
+
+def preparar_clima(radiacao_mj, temp_max, codigos):
+    """
+    Converte os arrays diários do Open-Meteo (NaN = ausente) para a simulação.
+    Dias sem weather_code são tratados como clima indisponível (estimativa padrão),
+    como a versão escalar fazia ao cair no except.
+
+    Retorna (irradiacao_kwh_m2, temp_max_c, condicao_tempo, disponivel).
+    """
+    radiacao_mj = np.asarray(radiacao_mj, dtype=float)
+    temp_max = np.asarray(temp_max, dtype=float)
+    codigos = np.asarray(codigos, dtype=float)
+    disponivel = ~np.isnan(codigos)
+
+    irradiacao = np.nan_to_num(radiacao_mj, nan=0.0) / 3.6
+    temp = np.where(np.isnan(temp_max), TEMP_MAX_PADRAO_C, temp_max)
+    condicao = np.where(disponivel, descrever_tempo(np.nan_to_num(codigos)), "Dados Offline")
+
+    irradiacao = np.where(disponivel, irradiacao, IRRADIACAO_PADRAO_KWH)
+    temp = np.where(disponivel, temp, TEMP_MAX_PADRAO_C)
+    return irradiacao, temp, condicao, disponivel
+
+
+def simular(potencia_kw, irradiacao_kwh_m2, temp_max_c):
+    """
+    Arrays broadcastáveis: potência (subestação x 1) contra clima (subestação x dia).
+    Retorna (perda_termica [fração], geracao_mwh, impacto_na_rede).
+    """
+    potencia_kw = np.asarray(potencia_kw, dtype=float)
+    irr = np.asarray(irradiacao_kwh_m2, dtype=float)
+    temp = np.asarray(temp_max_c, dtype=float)
+
+    perda = np.where(temp > TEMP_REFERENCIA_C, (temp - TEMP_REFERENCIA_C) * COEF_PERDA_TERMICA, 0.0)
+    fator_performance = FATOR_PERFORMANCE_BASE * (1 - perda)
+    geracao_mwh = potencia_kw * irr * fator_performance / 1000
+
+    impacto = np.select(
+        [(irr > 5.5) & (temp < 30), irr > 5.0, irr < 2.0],
+        ["CRITICO: Sol forte e Temp amena. Pico de injecao!",
+         "ALTA INJECAO: Atencao ao fluxo reverso.",
+         "BAIXA GERACAO: Rede suportara carga maxima."],
+        "Normal"
+    )
+    return perda, geracao_mwh, impacto
+
+
+def linhas_simulacao(subestacao, potencia_kw, dias, fontes, irradiacao, temp, condicao, perda, geracao_mwh, impacto):
+    """Uma linha no formato SimulacaoSolar por dia (arrays 1D de uma subestação)."""
+    irr_r = np.round(irradiacao, 2).tolist()
+    temp_r = np.round(temp, 1).tolist()
+    perda_r = np.round(perda * 100, 2).tolist()
+    ger_r = np.round(geracao_mwh, 2).tolist()
+    condicao = condicao.tolist()
+    impacto = impacto.tolist()
+    return [
+        {
+            "subestacao": subestacao,
+            "data_referencia": dia.strftime("%d/%m/%Y"),
+            "fonte_dados": fontes[j],
+            "condicao_tempo": condicao[j],
+            "irradiacao_solar_kwh_m2": irr_r[j],
+            "temperatura_max_c": temp_r[j],
+            "fator_perda_termica": perda_r[j],
+            "potencia_instalada_kw": potencia_kw,
+            "geracao_estimada_mwh": ger_r[j],
+            "impacto_na_rede": impacto[j]
+        }
+        for j, dia in enumerate(dias)
+    ]
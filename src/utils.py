@@ -4,11 +4,19 @@ import geopandas as gpd
 import pandas as pd
 import sys
 import math  # ✅ ADICIONADO (necessário para tratar NaN)
+import unicodedata
 
 # Define nomes de arquivo que você está usando (baseado no seu erro)
 FILENAME_GEOJSON = "subestacoes_logicas_aracaju.geojson"
 FILENAME_JSON = "mercado.json" # Ou o nome exato do seu json de mercado
 
+# Caminhos configurados (FILE_GEOJSON / FILE_MERCADO no .env) têm prioridade sobre a busca por nome
+try:
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from config import PATH_GEOJSON, PATH_JSON_MERCADO
+except ImportError:
+    PATH_GEOJSON = PATH_JSON_MERCADO = None
+
 def encontrar_arquivo(nome_arquivo):
     """
     Procura o arquivo recursivamente a partir da raiz do projeto.
@@ -61,11 +69,24 @@ def limpar_float(val):
     except Exception:
         return 0.0
 
-def carregar_dados_cache():
-    """Carrega dados geoespaciais e de mercado de forma resiliente."""
+def normalizar_nome(valor):
+    """
+    Normaliza nomes de subestação para comparação: sem acentos, maiúsculo e
+    espaços colapsados. Ex: " São  Cristóvão " -> "SAO CRISTOVAO"
+    """
+    if valor is None:
+        return ""
+    s = unicodedata.normalize("NFKD", str(valor))
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return " ".join(s.upper().split())
+
+def localizar_arquivos_dados():
+    """Retorna (caminho do GeoJSON de territórios, caminho do JSON de mercado)."""
     
     # 1. Encontrar GeoJSON
-    path_geo = encontrar_arquivo(FILENAME_GEOJSON)
+    path_geo = PATH_GEOJSON if PATH_GEOJSON and os.path.exists(PATH_GEOJSON) else None
+    if not path_geo:
+        path_geo = encontrar_arquivo(FILENAME_GEOJSON)
     if not path_geo:
         # Tenta um nome genérico caso o específico falhe
         path_geo = encontrar_arquivo("subestacoes.geojson")
@@ -76,7 +97,9 @@ def carregar_dados_cache():
         )
 
     # 2. Encontrar JSON de Mercado
-    path_mercado = encontrar_arquivo(FILENAME_JSON)
+    path_mercado = PATH_JSON_MERCADO if PATH_JSON_MERCADO and os.path.exists(PATH_JSON_MERCADO) else None
+    if not path_mercado:
+        path_mercado = encontrar_arquivo(FILENAME_JSON)
     if not path_mercado:
         # Tenta achar json com nome parecido
         path_mercado = encontrar_arquivo("perfil_mercado_aracaju.json")
@@ -84,6 +107,12 @@ def carregar_dados_cache():
     if not path_mercado:
         raise FileNotFoundError(f"❌ ERRO CRÍTICO: JSON de mercado não encontrado.")
 
+    return path_geo, path_mercado
+
+def carregar_dados_cache():
+    """Carrega dados geoespaciais e de mercado de forma resiliente."""
+    path_geo, path_mercado = localizar_arquivos_dados()
+
     try:
         # Carrega os arquivos
         gdf = gpd.read_file(path_geo)
@@ -96,13 +125,14 @@ def carregar_dados_cache():
     except Exception as e:
         raise Exception(f"Erro ao ler arquivos ({path_geo}): {str(e)}")
 
+def mapa_geometrias(gdf):
+    """NOM normalizado (strip/upper) -> geometria. Em nomes repetidos vale o último."""
+    validos = gdf[gdf['NOM'].notna()]
+    return dict(zip(validos['NOM'].astype(str).str.strip().str.upper(), validos.geometry))
+
 def fundir_dados_geo_mercado(gdf, dados_mercado):
     """Cruza dados."""
-    geo_map = {
-        str(row['NOM']).strip().upper(): row['geometry']
-        for _, row in gdf.iterrows()
-        if pd.notnull(row['NOM'])
-    }
+    geo_map = mapa_geometrias(gdf)
     dados_finais = []
     lista = dados_mercado if isinstance(dados_mercado, list) else dados_mercado.to_dict('records')
 
@@ -18,6 +18,13 @@ except ImportError:
         except (ValueError, TypeError):
             return 0.0
 
+# Sessão HTTP com keep-alive compartilhada pelo processo do Streamlit
+try:
+    from cliente_http import sessao_http
+except ImportError:
+    def sessao_http():
+        return requests
+
 
 def consultar_simulacao(subestacao_id, data_escolhida):
     """
@@ -29,7 +36,7 @@ def consultar_simulacao(subestacao_id, data_escolhida):
     url = f"http://127.0.0.1:8000/simulacao/{id_seguro}?data={data_str}"
 
     try:
-        response = requests.get(url, timeout=5)
+        response = sessao_http().get(url, timeout=5)
         if response.status_code == 200:
             return response.json()
         return None
@@ -42,7 +49,7 @@ def consultar_ia_predict(payload):
     """
     url = "http://127.0.0.1:8001/predict/duck-curve"
     try:
-        resp = requests.post(url, json=payload, timeout=10)
+        resp = sessao_http().post(url, json=payload, timeout=10)
         
         if resp.status_code == 200:
             return resp.json(), None
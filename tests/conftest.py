@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos do projeto importam uns aos outros a partir de src/ (como nos scripts)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,84 @@
+"""
+Floresta vetorizada (src/ai/floresta_vetorizada.py): predição bit a bit igual
+ao `predict` do scikit-learn, depois de exportada e recarregada (arrays em mmap).
+"""
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+pytest.importorskip("holidays")  # matriz_ano, usada na conferência da exportação
+from sklearn.ensemble import RandomForestRegressor
+
+from ai.floresta_vetorizada import carregar_floresta, exportar_floresta
+from ai.superficie_curva import FEATURES
+
+
+def features_aleatorias(rng, n):
+    dnas = rng.dirichlet(np.ones(4), size=n)
+    dias = rng.integers(0, 7, n)
+    return pd.DataFrame({
+        "hora": rng.integers(0, 24, n), "mes": rng.integers(1, 13, n), "dia_semana": dias,
+        "eh_feriado": rng.integers(0, 2, n), "eh_fim_semana": (dias >= 5).astype(int),
+        "pct_residencial": dnas[:, 0], "pct_comercial": dnas[:, 1],
+        "pct_industrial": dnas[:, 2], "pct_rural": dnas[:, 3],
+    }, columns=FEATURES).astype(np.float64)
+
+
+def nos_limiares(modelo, base):
+    """Linhas de `base` com uma feature exatamente no limiar de um nó (e logo abaixo/acima, em float32)."""
+    linhas = []
+    for estimador in modelo.estimators_:
+        arvore = estimador.tree_
+        internos = np.flatnonzero(arvore.children_left != -1)
+        for no in internos[:40]:
+            f, limiar = arvore.feature[no], arvore.threshold[no]
+            limiar32 = np.float32(limiar)
+            for valor in (limiar, limiar32, np.nextafter(limiar32, np.float32(-np.inf)),
+                          np.nextafter(limiar32, np.float32(np.inf))):
+                linha = base.iloc[len(linhas) % len(base)].copy()
+                linha.iloc[f] = float(valor)
+                linhas.append(linha)
+    return pd.DataFrame(linhas, columns=FEATURES).reset_index(drop=True)
+
+
+@pytest.fixture(scope="module")
+def exportada(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    X = features_aleatorias(rng, 3000)
+    y = (100 + 20 * np.sin(X["hora"] * np.pi / 12) + 5 * X["mes"] + 30 * X["pct_industrial"]
+         + rng.normal(0, 3, len(X)))
+    modelo = RandomForestRegressor(n_estimators=12, max_depth=10, random_state=0).fit(X, y)
+
+    diretorio = tmp_path_factory.mktemp("floresta")
+    caminho_modelo = str(diretorio / "modelo.pkl")
+    joblib.dump(modelo, caminho_modelo)
+    resultado = exportar_floresta(modelo, str(diretorio / "arrays"), caminho_modelo, k_conferencia=1)
+    floresta = carregar_floresta(str(diretorio / "arrays"), caminho_modelo)
+    return modelo, floresta, resultado
+
+
+def test_conferencia_da_exportacao(exportada):
+    _, floresta, resultado = exportada
+    assert resultado["identica"], resultado
+    assert floresta is not None
+
+
+def test_igual_ao_sklearn_em_entradas_aleatorias(exportada):
+    modelo, floresta, _ = exportada
+    X = features_aleatorias(np.random.default_rng(1), 5000)
+    assert np.array_equal(floresta.predict(X), modelo.predict(X))
+
+
+def test_igual_ao_sklearn_nos_limiares(exportada):
+    modelo, floresta, _ = exportada
+    X = nos_limiares(modelo, features_aleatorias(np.random.default_rng(2), 100))
+    assert len(X) > 0
+    assert np.array_equal(floresta.predict(X), modelo.predict(X))
+
+
+def test_blocos_nao_mudam_o_resultado(exportada):
+    modelo, floresta, _ = exportada
+    X = features_aleatorias(np.random.default_rng(3), 1000)
+    assert np.array_equal(floresta.prever(X, linhas_por_bloco=7), modelo.predict(X))
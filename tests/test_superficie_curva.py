@@ -0,0 +1,106 @@
+"""
+Erro da superfície de resposta (src/ai/superficie_curva.py) contra o modelo.
+
+A referência é o caminho do modelo em prever_curva_ml: `predict` nas 24 linhas
+de features da data e do DNA (ai_service.preparar_curva).
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+from sklearn.ensemble import RandomForestRegressor
+
+from config import SUPERFICIE_TOLERANCIA
+from ai.superficie_curva import FEATURES, SuperficieCurva, gerar_superficie, validar, vetor_dna
+
+N_GRADE = 5
+
+
+def features_curva(mes, dia_semana, eh_feriado, dna):
+    """As 24 linhas que preparar_curva monta para o modelo."""
+    return pd.DataFrame([{
+        "hora": h, "mes": mes, "dia_semana": dia_semana, "eh_feriado": eh_feriado,
+        "eh_fim_semana": int(dia_semana >= 5),
+        "pct_residencial": dna["residencial"], "pct_comercial": dna["comercial"],
+        "pct_industrial": dna["industrial"], "pct_rural": dna["rural"],
+    } for h in range(24)], columns=FEATURES)
+
+
+def curva_sintetica(X):
+    hora, mes = X["hora"].to_numpy(), X["mes"].to_numpy()
+    forma = 1 + 0.5 * np.sin((hora - 6) * np.pi / 12)
+    sazonal = 1 + 0.1 * np.cos(2 * np.pi * mes / 12)
+    fds = np.where(X["eh_fim_semana"].to_numpy() == 1, 0.9, 1.0)
+    dna = 1 + 0.01 * (X["pct_residencial"] - X["pct_industrial"]).to_numpy() + 0.005 * X["pct_comercial"].to_numpy()
+    return forma * sazonal * fds * dna
+
+
+class ModeloLinearNoDna:
+    """Modelo linear no DNA: a interpolação no simplex tem que reproduzi-lo exatamente."""
+
+    def predict(self, X):
+        hora, mes = X["hora"].to_numpy(), X["mes"].to_numpy()
+        base = 100 + 10 * hora + mes + 3 * X["dia_semana"].to_numpy() + 7 * X["eh_feriado"].to_numpy()
+        return (base * (1 + X["pct_residencial"].to_numpy()) + 50 * X["pct_comercial"].to_numpy()
+                + 80 * X["pct_industrial"].to_numpy() * hora + 20 * X["pct_rural"].to_numpy())
+
+
+@pytest.fixture(scope="module")
+def modelo_rf():
+    rng = np.random.default_rng(0)
+    n = 6000
+    dnas = rng.dirichlet(np.ones(4), size=n)
+    dias = rng.integers(0, 7, n)
+    X = pd.DataFrame({
+        "hora": rng.integers(0, 24, n), "mes": rng.integers(1, 13, n), "dia_semana": dias,
+        "eh_feriado": rng.integers(0, 2, n), "eh_fim_semana": (dias >= 5).astype(int),
+        "pct_residencial": dnas[:, 0], "pct_comercial": dnas[:, 1],
+        "pct_industrial": dnas[:, 2], "pct_rural": dnas[:, 3],
+    }, columns=FEATURES)
+    modelo = RandomForestRegressor(n_estimators=10, max_depth=12, random_state=0)
+    return modelo.fit(X, curva_sintetica(X))
+
+
+@pytest.fixture(scope="module")
+def superficie_rf(modelo_rf):
+    return SuperficieCurva(gerar_superficie(modelo_rf, N_GRADE), N_GRADE)
+
+
+def test_interpolacao_exata_para_modelo_linear_no_dna():
+    modelo = ModeloLinearNoDna()
+    superficie = SuperficieCurva(gerar_superficie(modelo, N_GRADE), N_GRADE)
+    rng = np.random.default_rng(1)
+    for dna in rng.dirichlet(np.ones(4), size=50):
+        dna_dict = dict(zip(["residencial", "comercial", "industrial", "rural"], dna))
+        curva = superficie.prever(3, 2, 0, vetor_dna(dna_dict))
+        np.testing.assert_allclose(curva, modelo.predict(features_curva(3, 2, 0, dna_dict)), rtol=1e-5)
+
+
+def test_erro_maximo_contra_modelo_dentro_da_tolerancia(modelo_rf, superficie_rf):
+    resultado = validar(superficie_rf, modelo_rf, amostras=300)
+    assert resultado["erro_max"] <= SUPERFICIE_TOLERANCIA
+
+
+@pytest.mark.parametrize("dna", [
+    {"residencial": 1.0, "comercial": 0.0, "industrial": 0.0, "rural": 0.0},
+    {"residencial": 0.0, "comercial": 0.0, "industrial": 0.0, "rural": 1.0},
+    {"residencial": 0.4, "comercial": 0.2, "industrial": 0.4, "rural": 0.0},
+])
+def test_vertice_da_grade_igual_ao_modelo(modelo_rf, superficie_rf, dna):
+    # Nos nós da grade não há interpolação: só o arredondamento para float32
+    for mes, dia, feriado in [(1, 0, 0), (12, 6, 1)]:
+        curva = superficie_rf.prever(mes, dia, feriado, vetor_dna(dna))
+        referencia = modelo_rf.predict(features_curva(mes, dia, feriado, dna))
+        np.testing.assert_allclose(curva, referencia, rtol=1e-6)
+
+
+@pytest.mark.parametrize("dna", [
+    {"residencial": 0.6, "comercial": 0.6, "industrial": 0.0, "rural": 0.0},   # soma > 1
+    {"residencial": 0.2, "comercial": 0.1, "industrial": 0.1, "rural": 0.1},   # soma < 1
+    {"residencial": 1.2, "comercial": -0.2, "industrial": 0.0, "rural": 0.0},  # fração negativa
+    {},                                                                        # sem DNA
+])
+def test_dna_fora_do_simplex_volta_para_o_modelo(superficie_rf, dna):
+    assert superficie_rf.vertices(vetor_dna(dna)) is None
+    assert superficie_rf.prever(6, 3, 0, vetor_dna(dna)) is None